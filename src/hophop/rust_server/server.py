@@ -2,6 +2,7 @@ import os
 import subprocess
 import requests
 import json
+import re
 import tarfile
 import shutil
 import psutil
@@ -45,6 +46,8 @@ PATH_STEAM_CMD = os.path.join(PATH_ROOT, "steam_cmd")         # HopHopBuildServe
 PATH_TMP = os.path.join(PATH_ROOT, "tmp")                     # HopHopBuildServer/tmp
 PATH_SCRIPTS = os.path.join(PATH_ROOT, "src/hophop/rust_server/scripts")  # HopHopBuildServer/src/hophop/rust_server/scripts
 PATH_RUST_PLUGINS = os.path.join(PATH_RUST_SERVER, "carbon", "plugins")   # HopHopBuildServer/rust_server/carbon/plugins
+USERS_FILE = get_env_str("SERVER_USERS_FILE", os.path.join(PATH_ROOT, "users.json"))  # Owners and moderators, not tracked by git
+USERS_EXAMPLE_FILE = os.path.join(PATH_ROOT, "src/hophop/rust_server/users.example.json")  # Seeds USERS_FILE
 
 # Create runtime directories
 print(f"\nSetting up server directories in: {PATH_ROOT}")
@@ -191,6 +194,39 @@ def base_install():
     except Exception as e:
         print("Error occurred during Carbon update:", e)
 
+def write_users_cfg(file_path):
+    """Write the owners and moderators listed in USERS_FILE to the server's users.cfg"""
+    commands = {"owner": "ownerid", "moderator": "moderatorid"}
+    if not os.path.exists(USERS_FILE) and os.path.exists(USERS_EXAMPLE_FILE):
+        shutil.copyfile(USERS_EXAMPLE_FILE, USERS_FILE)
+        print(f"Created {USERS_FILE} from {os.path.basename(USERS_EXAMPLE_FILE)}")
+    try:
+        with open(USERS_FILE, "r") as f:
+            users = json.load(f).get("users", [])
+    except FileNotFoundError:
+        print(f"No users file at {USERS_FILE}, leaving users.cfg empty")
+        users = []
+    except (ValueError, AttributeError) as e:
+        print(f"Can't read {USERS_FILE} ({e}), keeping the existing users.cfg")
+        return
+
+    lines = []
+    for index, user in enumerate(users):
+        try:
+            steamid = str(user["steamid"]).strip()
+            if not re.match(r'^7656\d{13}$', steamid):
+                raise ValueError(f"invalid Steam ID '{steamid}'")
+            name = str(user.get("name") or "").replace("\\", "\\\\").replace('"', '\\"')
+            if "\n" in name or "\r" in name:
+                raise ValueError("name must be a single line")
+            lines.append(f'{commands[user.get("role", "owner")]} {steamid} "{name}"')
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            print(f"Skipping users file entry {index}: {e}")
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as file:
+        file.write("\n".join(lines))
+
 def start_rust_server():
     """Main entry point for the rust server"""
     try:
@@ -261,32 +297,8 @@ def start_rust_server():
         except Exception as e:
             print(f"Error creating doorstop_config.ini: {e}")
         
-        # Define the list of users
-        users = [
-            "ownerid 76561198183150138 \"Clayton (Rust)\"",
-            "ownerid 76561198091394287 \"Demonic\"",
-            "ownerid 76561198804286062 \"Ed\"",
-            "ownerid 76561198056409776 \"Finn\"",
-            "ownerid 76561198299291090 \"Gleb\"",
-            "ownerid 76561198017536117 \"Gringo\"",
-            "ownerid 76561198110905826 \"Jamie\"",
-            "ownerid 76561198009503041 \"Kaas\"",
-            "ownerid 76561198043994008 \"Kristian\"",
-            "ownerid 76561198072387032 \"Maze\"",
-            "ownerid 76561198398810414 \"Nora\"",
-            "ownerid 76561197996896290 \"Padzor\"",
-            "ownerid 76561198287027907 \"Pidge\"",
-            "ownerid 76561198227557712 \"Razzey\"",
-            "ownerid 76561197972768339 \"Robbin\"",
-            "ownerid 76561198215723943 \"Tom\"",
-            "ownerid 76561199003344794 \"Zapio\""
-        ]
-
-        file_path = os.path.join(PATH_RUST_SERVER, "server", "carbon", "cfg", "users.cfg")
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        with open(file_path, "w") as file:
-            file.write("\n".join(users))
+        # Owners and moderators come from users.json, which the web server edits and applies live over RCON
+        write_users_cfg(os.path.join(PATH_RUST_SERVER, "server", "carbon", "cfg", "users.cfg"))
 
         # Changing directory
         os.chdir(PATH_RUST_SERVER)
@@ -0,0 +1,155 @@
+import gzip
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, Optional
+from flask import request
+
+# Response types worth compressing; images, archives and the like are already compressed
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    codings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[name] = q
+    return codings
+
+def websocket_deflate_available() -> bool:
+    """True if the websocket server negotiates permessage-deflate with browsers that offer it.
+
+    Engine.IO's gevent driver uses simple-websocket, which accepts the extension, unless
+    gevent-websocket is installed, which doesn't support it.
+    """
+    try:
+        import geventwebsocket  # noqa: F401
+        return False
+    except ImportError:
+        return True
+
+class ResponseCompressor:
+    """Compresses Flask responses with brotli or gzip, whichever the client prefers, above a size threshold"""
+
+    def __init__(self, threshold: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.threshold = threshold  # Smaller bodies are sent as they are
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        try:
+            import brotli  # Optional, gzip is used when it isn't installed
+            self.brotli = brotli
+        except ImportError:
+            self.brotli = None
+        self.lock = threading.Lock()
+        self.counters = {coding: {'responses': 0, 'bytes_in': 0, 'bytes_out': 0}
+                         for coding in ('br', 'gzip', 'identity')}
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+
+    def encodings(self):
+        return ('br', 'gzip') if self.brotli else ('gzip',)
+
+    def choose_encoding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Pick the coding the client weights highest, preferring brotli on a tie"""
+        accepted = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for coding in self.encodings():
+            q = accepted.get(coding, accepted.get('*', 0.0))
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def accepts(self, accept_encoding: Optional[str], coding: str) -> bool:
+        accepted = parse_accept_encoding(accept_encoding)
+        return accepted.get(coding, accepted.get('*', 0.0)) > 0
+
+    def gzip_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """gzip a streamed body chunk by chunk, counting its bytes once it has been sent"""
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # 31: gzip header and trailer
+        bytes_in = bytes_out = 0
+        for chunk in chunks:
+            bytes_in += len(chunk)
+            compressed = compressor.compress(chunk)
+            if compressed:
+                bytes_out += len(compressed)
+                yield compressed
+        compressed = compressor.flush()
+        bytes_out += len(compressed)
+        yield compressed
+        self._count('gzip', bytes_in, bytes_out)
+
+    def compress(self, data: bytes, coding: str) -> bytes:
+        if coding == 'br':
+            return self.brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level)
+
+    def matching_etag(self, etag: str) -> Optional[str]:
+        """The tag in If-None-Match that is `etag`, either as it is or as compress_response suffixed it"""
+        for candidate in (etag, *(f'{etag}-{coding}' for coding in self.encodings())):
+            if request.if_none_match.contains(candidate):
+                return candidate
+        return None
+
+    def compress_response(self, response):
+        # Streams (SSE, proxied owner responses) and files are left alone
+        if response.direct_passthrough or response.is_streamed:
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response
+        if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        coding = self.choose_encoding(request.headers.get('Accept-Encoding'))
+        if coding is None or len(data) < self.threshold or request.method == 'HEAD':
+            self._count('identity', len(data), len(data))
+            return response
+
+        compressed = self.compress(data, coding)
+        if len(compressed) >= len(data):
+            self._count('identity', len(data), len(data))
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag:
+            # A different body needs a different tag
+            response.set_etag(f'{etag}-{coding}', weak)
+        self._count(coding, len(data), len(compressed))
+        return response
+
+    def _count(self, coding: str, bytes_in: int, bytes_out: int):
+        with self.lock:
+            counter = self.counters[coding]
+            counter['responses'] += 1
+            counter['bytes_in'] += bytes_in
+            counter['bytes_out'] += bytes_out
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = {coding: dict(counter) for coding, counter in self.counters.items()}
+        bytes_in = sum(counter['bytes_in'] for counter in counters.values())
+        bytes_out = sum(counter['bytes_out'] for counter in counters.values())
+        return {
+            'threshold': self.threshold,
+            'encodings': list(self.encodings()),
+            'codings': counters,
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+            'ratio': round(bytes_out / bytes_in, 3) if bytes_in else None
+        }
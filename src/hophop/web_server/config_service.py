@@ -0,0 +1,108 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Settings the running server accepts over RCON, mapped to the convar they set.
+# Everything else is only read by hophop-rust-server at startup and needs a restart.
+LIVE_KEYS = {
+    'SERVER_NAME': 'server.hostname',
+    'SERVER_MAX_PLAYERS': 'server.maxplayers'
+}
+
+def parse_env_file(path: Path) -> Dict[str, str]:
+    """Read KEY=value pairs from an env file, skipping comments and malformed lines"""
+    values = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                try:
+                    key, value = line.strip().split('=', 1)
+                    values[key.strip()] = value.strip()
+                except ValueError:
+                    continue
+    return values
+
+def write_env_file(path: Path, values: Dict[str, str]):
+    """Write an env file atomically (temp file + rename) so readers never see a partial file"""
+    tmp_path = path.with_name(f'.{path.name}.tmp')
+    with open(tmp_path, 'w') as f:
+        for key, value in values.items():
+            f.write(f"{key}={value}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def classify_key(key: str) -> str:
+    """Return 'live' for keys applied over RCON and 'restart' for the rest"""
+    return 'live' if key in LIVE_KEYS else 'restart'
+
+def rcon_quote(value: str) -> str:
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+class ConfigService:
+    """Serves .env/.env.local from a cache invalidated by file mtime"""
+
+    def __init__(self, root_dir: Path):
+        self.env_path = Path(root_dir) / '.env'
+        self.env_local_path = Path(root_dir) / '.env.local'
+        self.cache = {}  # path -> ((mtime_ns, size), values)
+        self.lock = threading.Lock()
+
+    def _read(self, path: Path) -> Optional[Dict[str, str]]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.cache.pop(path, None)
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self.cache.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        values = parse_env_file(path)
+        self.cache[path] = (signature, values)
+        return values
+
+    def get(self) -> dict:
+        """Return the current and default config"""
+        with self.lock:
+            defaults = self._read(self.env_path) or {}
+            current = self._read(self.env_local_path)
+        return {
+            'current': dict(current if current is not None else defaults),
+            'defaults': dict(defaults)
+        }
+
+    def update(self, new_config: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+        """Save a new .env.local and return the changed keys grouped by how they take effect"""
+        new_config = {str(key): str(value) for key, value in new_config.items()}
+        with self.lock:
+            previous = self._read(self.env_local_path)
+            if previous is None:
+                previous = self._read(self.env_path) or {}
+            write_env_file(self.env_local_path, new_config)
+            self.cache.pop(self.env_local_path, None)
+
+        changed = {key: value for key, value in new_config.items() if previous.get(key) != value}
+        for key, value in changed.items():
+            os.environ[key] = value
+
+        groups = {'live': [], 'restart': []}
+        for key in changed:
+            groups[classify_key(key)].append(key)
+        return changed, groups
+
+    def apply_live(self, changed: Dict[str, str], rcon_client) -> List[str]:
+        """Send live settable keys to the running server, returning the keys that were sent"""
+        if not rcon_client.connected:
+            return []
+
+        applied = []
+        for key, value in changed.items():
+            convar = LIVE_KEYS.get(key)
+            if convar:
+                rcon_client.send_command(f'{convar} {rcon_quote(value)}')
+                applied.append(key)
+        return applied
@@ -0,0 +1,56 @@
+import re
+import time
+from typing import Optional
+from .plugin_profiler import parse_carbon_line
+
+# Unity rich text tags Rust and Carbon wrap console output in
+MARKUP_PATTERN = re.compile(r'</?(?:color|b|i|size|material|quad|mark)(?:=[^>]*)?>', re.IGNORECASE)
+ANSI_PATTERN = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+# "[PluginName] message", as printed by Puts() in Carbon/Oxide plugins
+PLUGIN_PATTERN = re.compile(r'^\[(?P<plugin>[A-Za-z][\w.-]*)\]\s*')
+ERROR_PATTERN = re.compile(r'\b(?:\w+Exception|[Ee]rror|[Ff]ailed)\b')
+WARNING_PATTERN = re.compile(r'\b[Ww]arning\b')
+
+LEVELS = ('debug', 'info', 'warning', 'error')
+# WebRcon broadcast Type -> level
+RCON_LEVELS = {'Error': 'error', 'Exception': 'error', 'Assert': 'error', 'Warning': 'warning'}
+
+def level_rank(level: str) -> int:
+    """Position of a level in LEVELS, unknown levels rank as info"""
+    try:
+        return LEVELS.index(level)
+    except ValueError:
+        return LEVELS.index('info')
+
+def strip_markup(text: str) -> str:
+    return ANSI_PATTERN.sub('', MARKUP_PATTERN.sub('', text))
+
+def parse_console_line(line: str, rcon_type: Optional[str] = None,
+                       timestamp: Optional[float] = None) -> dict:
+    """Split a raw console line into timestamp, level, source plugin and plain text"""
+    text = strip_markup(line).rstrip()
+
+    level = RCON_LEVELS.get(rcon_type or '')
+    if level is None:
+        if ERROR_PATTERN.search(text):
+            level = 'error'
+        elif WARNING_PATTERN.search(text):
+            level = 'warning'
+        else:
+            level = 'info'
+
+    plugin = None
+    match = PLUGIN_PATTERN.match(text)
+    if match:
+        plugin = match.group('plugin')
+    else:
+        carbon_event = parse_carbon_line(text)
+        if carbon_event:
+            plugin = carbon_event['name']
+
+    return {
+        'timestamp': timestamp or time.time(),
+        'level': level,
+        'plugin': plugin,
+        'text': text
+    }
@@ -0,0 +1,221 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+from .console_lines import LEVELS, level_rank
+from .memory import CappedDeque
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Client regexes run on the event loop for every console line, and re can't be interrupted, so they
+# are kept simple enough that their backtracking stays small on the (truncated) lines they search
+MAX_REGEX_LENGTH = 200
+MAX_UNBOUNDED_REPEATS = 2  # Each ambiguous *, + or {n,} multiplies the worst case by the line length
+MAX_MATCH_LENGTH = 256  # Filters only look at the start of longer lines
+REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT} | (
+    {sre_parse.POSSESSIVE_REPEAT} if hasattr(sre_parse, 'POSSESSIVE_REPEAT') else set())
+
+def _has_repeat(parsed) -> bool:
+    """Whether a parsed pattern contains a quantifier that matches more than once, or an alternation"""
+    for op, av in parsed:
+        if op in REPEATS:
+            if av[1] > 1 or _has_repeat(av[2]):
+                return True
+        elif op == sre_parse.SUBPATTERN:
+            if _has_repeat(av[-1]):
+                return True
+        elif op == sre_parse.BRANCH:
+            return True
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            if _has_repeat(av[1]):
+                return True
+    return False
+
+def _repeated_chars(body) -> Optional[set]:
+    """Lowercased characters a repeated single character class can match, None if it may match anything"""
+    if len(body) != 1:
+        return None
+    op, av = body[0]
+    if op == sre_parse.LITERAL:
+        return {chr(av).lower()}
+    if op != sre_parse.IN:
+        return None
+    chars = set()
+    for item_op, item in av:
+        if item_op == sre_parse.LITERAL:
+            chars.add(chr(item).lower())
+        elif item_op == sre_parse.RANGE and item[1] - item[0] <= 256:
+            chars.update(chr(code).lower() for code in range(item[0], item[1] + 1))
+        else:
+            return None
+    return chars
+
+def _overlap(a: Optional[set], b: Optional[set]) -> bool:
+    return a is None or b is None or bool(a & b)
+
+def _check_repeats(parsed, open_repeats: list, unbounded: list) -> list:
+    """Walk a parsed pattern, raising ValueError on repeats that can backtrack badly.
+
+    open_repeats holds the characters of the repeats that could still be matching when the next item
+    starts, i.e. with nothing required in between; returns them as they are after `parsed`.
+    """
+    for op, av in parsed:
+        if op in REPEATS:
+            low, high, body = av
+            if high == sre_parse.MAXREPEAT:
+                unbounded[0] += 1
+                if unbounded[0] > MAX_UNBOUNDED_REPEATS:
+                    raise ValueError(f"At most {MAX_UNBOUNDED_REPEATS} unbounded quantifiers (*, + or {{n,}}) are allowed")
+            if high > 1:
+                if _has_repeat(body):
+                    raise ValueError('Repeated groups containing quantifiers or alternatives, like (a+)+ or (a|ab)*, are not allowed')
+                chars = _repeated_chars(body)
+                if any(_overlap(chars, other) for other in open_repeats):
+                    raise ValueError('Adjacent quantifiers that can match the same characters, like a*a*, are not allowed')
+                open_repeats = open_repeats + [chars] if low == 0 or body.getwidth()[0] == 0 else [chars]
+            else:
+                after = _check_repeats(body, open_repeats, unbounded)
+                open_repeats = open_repeats + after if low == 0 else after
+        elif op == sre_parse.SUBPATTERN:
+            open_repeats = _check_repeats(av[-1], open_repeats, unbounded)
+        elif op == sre_parse.BRANCH:
+            open_repeats = [chars for branch in av[1] for chars in _check_repeats(branch, open_repeats, unbounded)]
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _check_repeats(av[1], [], unbounded)
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            raise ValueError('Backreferences are not allowed')
+        elif op != sre_parse.AT:
+            open_repeats = []  # A required character separates what comes before from what comes after
+    return open_repeats
+
+def compile_filter_regex(regex: str) -> re.Pattern:
+    """Compile a client's regex, raising ValueError if it's invalid, too long or could backtrack badly"""
+    if not isinstance(regex, str):
+        raise ValueError('regex must be a string')
+    if len(regex) > MAX_REGEX_LENGTH:
+        raise ValueError(f"regex is longer than {MAX_REGEX_LENGTH} characters")
+    try:
+        _check_repeats(sre_parse.parse(regex, re.IGNORECASE), [], [0])
+        return re.compile(regex, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+
+class ConsoleFilter:
+    """A client's console filter, compiled once when it subscribes"""
+
+    def __init__(self, level: Optional[str] = None, plugin: Optional[str] = None,
+                 regex: Optional[str] = None):
+        if level and level not in LEVELS:
+            raise ValueError(f"Unknown level '{level}', expected one of {', '.join(LEVELS)}")
+        self.level = level or None
+        self.min_rank = level_rank(level) if level else 0
+        self.plugin = plugin or None
+        self.plugin_key = plugin.lower() if plugin else None
+        self.regex = regex or None
+        self.pattern = compile_filter_regex(regex) if regex else None
+        # Subscribers with the same filter share one evaluation per line
+        self.key = (self.min_rank, self.plugin_key, self.regex)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> 'ConsoleFilter':
+        data = data or {}
+        return cls(data.get('level'), data.get('plugin'), data.get('regex'))
+
+    def matches(self, entry: dict) -> bool:
+        # Cheapest checks first so the regex only runs on lines that pass the others
+        if self.min_rank and level_rank(entry['level']) < self.min_rank:
+            return False
+        if self.plugin_key and (entry['plugin'] or '').lower() != self.plugin_key:
+            return False
+        if self.pattern and not self.pattern.search(entry['text'], 0, MAX_MATCH_LENGTH):
+            return False
+        return True
+
+    def to_dict(self) -> dict:
+        return {'level': self.level, 'plugin': self.plugin, 'regex': self.regex}
+
+class ConsoleSubscriptions:
+    """Sends each subscribed client only the parsed console lines its filter matches, in batches"""
+
+    def __init__(self, history_size: int = 1000, batch_size: int = 200, max_clients: int = 1000):
+        self.history = CappedDeque(maxlen=history_size)  # Recent parsed lines, replayed to new subscribers
+        self.batch_size = batch_size  # Most lines sent to one client per flush, the oldest are dropped
+        self.clients: Dict[str, dict] = {}  # sid -> {'filter', 'sent', 'dropped'}, oldest first
+        self.max_clients = max_clients
+        self.clients_evicted = 0
+        self.pending: List[dict] = []
+        self.pending_dropped = 0  # Lines dropped because flush() fell behind by a whole history
+        self.lines = 0
+        self.lock = threading.Lock()
+        self.send: Optional[Callable[[str, dict], None]] = None  # send(sid, payload)
+
+    def feed(self, entry: dict):
+        """Queue a line from parse_console_line() for the next flush()"""
+        with self.lock:
+            self.history.append(entry)
+            if self.clients:
+                if len(self.pending) >= self.history.maxlen:
+                    self.pending.pop(0)
+                    self.pending_dropped += 1
+                self.pending.append(entry)
+            self.lines += 1
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+            clients = list(self.clients.items())
+        if not batch or not self.send:
+            return
+
+        matched: Dict[tuple, List[dict]] = {}
+        for sid, state in clients:
+            console_filter = state['filter']
+            if console_filter.key not in matched:
+                matched[console_filter.key] = [entry for entry in batch if console_filter.matches(entry)]
+            self._send(sid, state, matched[console_filter.key])
+
+    def _send(self, sid: str, state: dict, lines: List[dict]):
+        if not lines:
+            return
+        if len(lines) > self.batch_size:
+            state['dropped'] += len(lines) - self.batch_size
+            lines = lines[-self.batch_size:]
+        payload = {'lines': lines, 'dropped': state['dropped']}
+        state['dropped'] = 0
+        state['sent'] += len(lines)
+        try:
+            self.send(sid, payload)
+        except Exception as e:
+            print(f"Error sending console lines to {sid}: {e}")
+
+    def subscribe(self, sid: str, console_filter: ConsoleFilter, backlog: int = 100) -> dict:
+        """Start (or change) a client's subscription and replay matching recent lines"""
+        state = {'filter': console_filter, 'sent': 0, 'dropped': 0}
+        with self.lock:
+            history = list(self.history)
+            if sid not in self.clients and len(self.clients) >= self.max_clients:
+                # Most likely a client whose disconnect never reached this process
+                self.clients.pop(next(iter(self.clients)))
+                self.clients_evicted += 1
+            self.clients.pop(sid, None)
+            self.clients[sid] = state
+        if backlog:
+            replay = [entry for entry in history if console_filter.matches(entry)][-backlog:]
+            if self.send:
+                self._send(sid, state, replay)
+        return console_filter.to_dict()
+
+    def unsubscribe(self, sid: str):
+        with self.lock:
+            self.clients.pop(sid, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            clients = list(self.clients.items())
+        return {
+            'lines': self.lines,
+            'history': len(self.history),
+            'clients': {sid: dict(state['filter'].to_dict(), sent=state['sent']) for sid, state in clients}
+        }
@@ -0,0 +1,136 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+# Actions that change whether the server is running; only one of them may be active at a time
+LIFECYCLE_ACTIONS = ('start', 'stop', 'restart', 'update')
+
+class ControlJobRejected(Exception):
+    """Raised when a job can't be queued next to the ones already queued or running"""
+
+class ControlJob:
+    """One server control action, its phases and their durations"""
+
+    def __init__(self, action: str, queue: 'ControlJobQueue'):
+        self.id = uuid.uuid4().hex[:12]
+        self.action = action
+        self.queue = queue
+        self.state = 'queued'  # queued, running, succeeded, failed
+        self.phase_name: Optional[str] = None
+        self.phases: List[dict] = []  # {'name', 'duration_ms'} for every finished phase
+        self.message: Optional[str] = None
+        self.error: Optional[str] = None
+        self.merged = 0  # Duplicate submissions folded into this job
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.state in ('queued', 'running')
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a step of the job and report it to clients as it starts and ends"""
+        self.phase_name = name
+        self.queue.publish(self)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({'name': name, 'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+            self.phase_name = None
+
+    def progress(self, message: str):
+        self.message = message
+        self.queue.publish(self)
+
+    def to_dict(self) -> dict:
+        finished_at = self.finished_at or time.time()
+        return {
+            'id': self.id,
+            'action': self.action,
+            'state': self.state,
+            'phase': self.phase_name,
+            'phases': list(self.phases),
+            'message': self.message,
+            'error': self.error,
+            'merged': self.merged,
+            'created_at': self.created_at,
+            'queued_ms': round(((self.started_at or finished_at) - self.created_at) * 1000, 1),
+            'duration_ms': round((finished_at - self.started_at) * 1000, 1) if self.started_at else None
+        }
+
+class ControlJobQueue:
+    """Runs control actions on a small worker pool and keeps the recent ones for status queries"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, history_size: int = 50):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='control-job')
+        self.max_pending = max_pending  # Jobs queued or running before new ones are rejected
+        self.history_size = history_size
+        self.jobs = OrderedDict()  # id -> ControlJob, oldest first
+        self.evicted = 0
+        self.lock = threading.Lock()
+        self.on_update: Optional[Callable[[dict], None]] = None
+
+    def submit(self, action: str, run: Callable[[ControlJob], str]) -> Tuple[ControlJob, bool]:
+        """Queue `run(job)`, or return the matching active job; returns (job, merged)"""
+        with self.lock:
+            active = [job for job in self.jobs.values() if job.active]
+            for job in active:
+                if job.action == action:
+                    job.merged += 1
+                    return job, True
+            if action in LIFECYCLE_ACTIONS:
+                for job in active:
+                    if job.action in LIFECYCLE_ACTIONS:
+                        raise ControlJobRejected(f"Can't {action} while a {job.action} is {job.state}")
+            if len(active) >= self.max_pending:
+                raise ControlJobRejected('Too many control actions are queued')
+
+            job = ControlJob(action, self)
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.history_size:
+                oldest = next(iter(self.jobs.values()))
+                if oldest.active:
+                    break
+                self.jobs.popitem(last=False)
+                self.evicted += 1
+
+        self.publish(job)
+        self.executor.submit(self._run, job, run)
+        return job, False
+
+    def _run(self, job: ControlJob, run: Callable[[ControlJob], str]):
+        job.state = 'running'
+        job.started_at = time.time()
+        self.publish(job)
+        try:
+            job.message = run(job)
+            job.state = 'succeeded'
+        except Exception as e:
+            job.error = str(e)
+            job.state = 'failed'
+        job.finished_at = time.time()
+        job.done.set()
+        self.publish(job)
+
+    def publish(self, job: ControlJob):
+        if self.on_update:
+            try:
+                self.on_update(job.to_dict())
+            except Exception as e:
+                print(f"Error publishing control job {job.id}: {e}")
+
+    def get(self, job_id: str) -> Optional[ControlJob]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[dict]:
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [job.to_dict() for job in reversed(jobs)]
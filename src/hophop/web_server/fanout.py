@@ -0,0 +1,239 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+# Events where only the latest payload matters, so a lagging client just gets the newest one
+DEFAULT_COALESCE_EVENTS = ('server_status', 'screen_output', 'server_control_status')
+
+class ClientQueue:
+    """Outbound messages waiting to be sent to one Socket.IO client"""
+
+    def __init__(self, sid: str):
+        self.sid = sid
+        self.queue = deque()  # (event, data, size) tuples
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.active = True
+        self.sent = 0
+        self.bytes_sent = 0  # Encoded payload bytes, before any websocket compression
+        self.dropped = 0
+        self.drops_behind = 0  # Drops since the queue was last emptied, i.e. while it hasn't caught up
+        self.coalesced = 0
+        self.max_depth = 0
+        self.blocked_since: Optional[float] = None  # Set while the transport won't take more frames
+        self.muted = set()  # Broadcast events this client has opted out of
+        self.rooms = set()  # Rooms whose events this client gets, e.g. one game server's
+        self.connected_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            'depth': len(self.queue),
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'bytes_sent': self.bytes_sent,
+            'dropped': self.dropped,
+            'drops_behind': self.drops_behind,
+            'coalesced': self.coalesced,
+            'blocked_for': round(time.time() - self.blocked_since, 1) if self.blocked_since else 0,
+            'connected_for': round(time.time() - self.connected_at, 1)
+        }
+
+def payload_size(data) -> int:
+    """Bytes the payload takes up once encoded into a Socket.IO packet"""
+    try:
+        return len(json.dumps(data, separators=(',', ':')).encode())
+    except (TypeError, ValueError):
+        return 0
+
+class ClientFanout:
+    """Sends Socket.IO events through a bounded queue per client so one slow client can't hold up the rest"""
+
+    def __init__(self, socketio,
+                 max_queue: int = 256,
+                 transport_limit: int = 16,
+                 max_drops: int = 2000,
+                 max_blocked: float = 30.0,
+                 max_clients: int = 1000,
+                 coalesce_events: Iterable[str] = DEFAULT_COALESCE_EVENTS,
+                 namespace: str = '/'):
+        self.socketio = socketio
+        self.max_queue = max_queue  # Messages queued per client before the oldest are dropped
+        self.transport_limit = transport_limit  # Packets allowed in the transport's own queue
+        self.max_drops = max_drops  # Drops without catching up in between after which a client is disconnected
+        self.max_blocked = max_blocked  # Seconds a client may stay blocked before it is disconnected
+        self.max_clients = max_clients  # Connections this process accepts before turning new ones away
+        self.coalesce_events = set(coalesce_events)
+        self.namespace = namespace
+        self.clients = {}  # sid -> ClientQueue
+        self.disconnected_slow = 0
+        self.rejected = 0  # Connections turned away because max_clients were already connected
+        self.dropped = 0  # Across every client, including ones that have since disconnected
+        self.bytes_sent = 0  # Across every client, including ones that have since disconnected
+        self.remote = False  # True when other workers' clients are reachable through a message queue
+        self.lock = threading.Lock()
+
+    def register(self, sid: str) -> bool:
+        """Start a sender for a newly connected client; False if there are already max_clients"""
+        client = ClientQueue(sid)
+        with self.lock:
+            old = self.clients.get(sid)
+            if old is None and len(self.clients) >= self.max_clients:
+                self.rejected += 1
+                return False
+            self.clients[sid] = client
+        if old:
+            old.active = False
+            old.wakeup.set()
+        threading.Thread(target=self._drain, args=(client,), daemon=True).start()
+        return True
+
+    def unregister(self, sid: str):
+        with self.lock:
+            client = self.clients.pop(sid, None)
+        if client:
+            client.active = False
+            client.wakeup.set()
+
+    def mute(self, sid: str, event: str):
+        """Stop sending broadcasts of `event` to a client, e.g. when it gets a filtered stream instead"""
+        client = self.clients.get(sid)
+        if client:
+            client.muted.add(event)
+
+    def unmute(self, sid: str, event: str):
+        client = self.clients.get(sid)
+        if client:
+            client.muted.discard(event)
+
+    def join(self, sid: str, room: str):
+        client = self.clients.get(sid)
+        if client:
+            client.rooms.add(room)
+
+    def leave(self, sid: str, room: str):
+        client = self.clients.get(sid)
+        if client:
+            client.rooms.discard(room)
+
+    def rooms(self, sid: str) -> set:
+        client = self.clients.get(sid)
+        return set(client.rooms) if client else set()
+
+    def emit(self, event: str, data=None, to: Optional[str] = None, room: Optional[str] = None):
+        """Queue an event for one client (`to`), the clients in a room, or every connected client"""
+        if room is not None:
+            with self.lock:
+                targets = [client for client in self.clients.values() if room in client.rooms]
+                local = list(self.clients)
+            if self.remote:
+                # Members connected to other workers joined the Socket.IO room there
+                self.socketio.emit(event, data, to=room, skip_sid=local, namespace=self.namespace)
+        elif to is not None:
+            client = self.clients.get(to)
+            if client is None and self.remote:
+                # Connected to another worker, let the message queue deliver it
+                self.socketio.emit(event, data, to=to, namespace=self.namespace)
+                return
+            targets = [client] if client else []
+        else:
+            with self.lock:
+                targets = [client for client in self.clients.values() if event not in client.muted]
+        if not targets:
+            return
+
+        size = payload_size(data)  # Measured once, however many clients get it
+        for client in targets:
+            self._enqueue(client, event, data, size)
+
+    def _enqueue(self, client: ClientQueue, event: str, data, size: int):
+        with client.lock:
+            if event in self.coalesce_events:
+                # Replace a queued frame of the same kind instead of adding another one
+                for index, (queued_event, _, _) in enumerate(client.queue):
+                    if queued_event == event:
+                        client.queue[index] = (event, data, size)
+                        client.coalesced += 1
+                        return
+
+            if len(client.queue) >= self.max_queue:
+                client.queue.popleft()
+                client.dropped += 1
+                client.drops_behind += 1
+                self.dropped += 1
+            client.queue.append((event, data, size))
+            client.max_depth = max(client.max_depth, len(client.queue))
+            too_many_drops = client.drops_behind > self.max_drops
+
+        client.wakeup.set()
+        if too_many_drops:
+            self._disconnect(client, f"dropped {client.drops_behind} messages without catching up")
+
+    def _transport_backlog(self, sid: str) -> int:
+        """Number of packets waiting in the Engine.IO socket's own send queue"""
+        try:
+            server = self.socketio.server
+            eio_sid = server.manager.eio_sid_from_sid(sid, self.namespace)
+            return server.eio.sockets[eio_sid].queue.qsize()
+        except Exception:
+            return 0
+
+    def _drain(self, client: ClientQueue):
+        while client.active:
+            client.wakeup.wait(timeout=1)
+            client.wakeup.clear()
+
+            while client.active and client.queue:
+                if self._transport_backlog(client.sid) > self.transport_limit:
+                    client.blocked_since = client.blocked_since or time.time()
+                    if time.time() - client.blocked_since > self.max_blocked:
+                        self._disconnect(client, f"blocked for over {self.max_blocked}s")
+                        return
+                    time.sleep(0.05)
+                    continue
+                client.blocked_since = None
+
+                with client.lock:
+                    if not client.queue:
+                        break
+                    event, data, size = client.queue.popleft()
+                    if not client.queue:
+                        client.drops_behind = 0  # Caught up; earlier drops were a burst, not a stuck client
+                try:
+                    self.socketio.emit(event, data, to=client.sid, namespace=self.namespace)
+                    client.sent += 1
+                    client.bytes_sent += size
+                    self.bytes_sent += size
+                except Exception as e:
+                    print(f"Error sending {event} to {client.sid}: {e}")
+
+    def _disconnect(self, client: ClientQueue, reason: str):
+        """Drop a client that can't keep up"""
+        if not client.active:
+            return
+        print(f"Disconnecting slow client {client.sid}: {reason}")
+        self.disconnected_slow += 1
+        self.unregister(client.sid)
+        try:
+            self.socketio.server.disconnect(client.sid, namespace=self.namespace)
+        except Exception as e:
+            print(f"Error disconnecting client {client.sid}: {e}")
+
+    def queued(self) -> int:
+        """Messages waiting across every client's queue"""
+        with self.lock:
+            clients = list(self.clients.values())
+        return sum(len(client.queue) for client in clients)
+
+    def stats(self) -> dict:
+        with self.lock:
+            clients = list(self.clients.values())
+        return {
+            'clients': {client.sid: client.stats() for client in clients},
+            'bytes_sent': self.bytes_sent,
+            'dropped': self.dropped,
+            'disconnected_slow': self.disconnected_slow,
+            'rejected': self.rejected,
+            'max_queue': self.max_queue
+        }
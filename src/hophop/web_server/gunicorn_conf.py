@@ -0,0 +1,17 @@
+"""
+Gunicorn settings for `hophop-web-server` in production mode.
+"""
+
+worker_class = 'gevent'
+# Socket.IO websockets stay open for as long as the page is, give them time to close on reload
+graceful_timeout = 10
+
+def post_worker_init(worker):
+    """Join the owner election once the worker has loaded the app"""
+    from hophop.web_server.server import start_worker
+    start_worker()
+
+def worker_exit(server, worker):
+    """Stop the background services so journalctl and the RCON socket are closed cleanly"""
+    from hophop.web_server.server import stop_background_services
+    stop_background_services()
@@ -0,0 +1,286 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+import gevent
+
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *'
+}
+
+def parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """Expand one cron field (`*`, `*/n`, `a-b`, `a-b/n`, `a,b`) into the values it matches"""
+    values = set()
+    for part in field.split(','):
+        part, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Invalid cron field '{field}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronSchedule:
+    """A five field cron expression: minute hour day-of-month month day-of-week"""
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = CRON_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        self.minutes = parse_cron_field(fields[0], 0, 59)
+        self.hours = parse_cron_field(fields[1], 0, 23)
+        self.days = parse_cron_field(fields[2], 1, 31)
+        self.months = parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in parse_cron_field(fields[4], 0, 7)}  # 0 and 7 are Sunday
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, t: datetime) -> bool:
+        day = t.day in self.days
+        weekday = (t.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday  # Cron matches either when both are restricted
+
+    def next_after(self, after: datetime) -> datetime:
+        """Return the first matching minute after `after`"""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 4)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+class Job:
+    """A periodic or cron scheduled piece of work and its run statistics"""
+
+    def __init__(self, name: str, action: Callable[[], None],
+                 interval: Optional[float] = None,
+                 cron: Optional[CronSchedule] = None,
+                 jitter: float = 0.0,
+                 blocking: bool = False,
+                 native: bool = False,
+                 wait_for_empty: bool = False,
+                 max_wait: Optional[float] = None,
+                 spec: Optional[dict] = None):
+        if (interval is None) == (cron is None):
+            raise ValueError("A job needs exactly one of interval or cron")
+        self.name = name
+        self.action = action
+        self.interval = interval
+        self.cron = cron
+        self.jitter = jitter  # Fraction of the interval added at random to spread jobs out
+        self.blocking = blocking  # Run on its own thread instead of the scheduler's
+        # Under monkey patching that thread is a greenlet, which still stalls the hub on work that blocks
+        # in C (SQLite); native jobs run on gevent's pool of real OS threads instead
+        self.native = native
+        self.wait_for_empty = wait_for_empty  # Hold the run until no players are online
+        self.max_wait = max_wait  # ...but no longer than this many seconds
+        self.spec = spec  # The user's definition, for jobs created through the API
+        self.due: float = 0.0  # Monotonic time the current run is scheduled for (before jitter)
+        self.generation = 0  # Bumped on removal so stale heap entries are skipped
+        self.running = False
+        self.waiting_since: Optional[float] = None
+        self.runs = 0
+        self.missed = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[float] = None  # Wall clock time of the next run
+
+    def stats(self) -> dict:
+        stats = {
+            'name': self.name,
+            'schedule': self.cron.expression if self.cron else f'every {self.interval}s',
+            'runs': self.runs,
+            'missed': self.missed,
+            'failures': self.failures,
+            'running': self.running,
+            'waiting_for_players': self.waiting_since is not None,
+            'last_run': self.last_run,
+            'last_duration_ms': self.last_duration_ms,
+            'last_error': self.last_error,
+            'next_run': self.next_run
+        }
+        if self.spec:
+            stats['job'] = self.spec
+        return stats
+
+class JobScheduler:
+    """Runs every periodic and scheduled job from one timer heap on a single thread"""
+
+    def __init__(self, player_count: Optional[Callable[[], Optional[int]]] = None,
+                 empty_check_interval: float = 30.0):
+        self.player_count = player_count  # Returns the online player count, or None if unknown
+        self.empty_check_interval = empty_check_interval
+        self.jobs: Dict[str, Job] = {}
+        self.heap = []  # (fire at, seq, generation, job)
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.heartbeat: Optional[float] = None
+
+    def add_periodic(self, name: str, action: Callable[[], None], interval: float,
+                     jitter: float = 0.1, blocking: bool = False, native: bool = False) -> Job:
+        job = Job(name, action, interval=interval, jitter=jitter, blocking=blocking or native, native=native)
+        self._add(job, time.monotonic())
+        return job
+
+    def add_cron(self, name: str, expression: str, action: Callable[[], None],
+                 wait_for_empty: bool = False, max_wait: Optional[float] = None,
+                 blocking: bool = True, native: bool = False, spec: Optional[dict] = None) -> Job:
+        job = Job(name, action, cron=CronSchedule(expression), blocking=blocking or native, native=native,
+                  wait_for_empty=wait_for_empty, max_wait=max_wait, spec=spec)
+        self._add(job, self._next_cron(job))
+        return job
+
+    def remove(self, name: str) -> Optional[Job]:
+        with self.lock:
+            job = self.jobs.pop(name, None)
+            if job:
+                job.generation += 1
+        return job
+
+    def _add(self, job: Job, due: float):
+        self.remove(job.name)
+        with self.lock:
+            self.jobs[job.name] = job
+        self._schedule(job, due)
+
+    def _next_cron(self, job: Job) -> float:
+        now = datetime.now()
+        return time.monotonic() + (job.cron.next_after(now) - now).total_seconds()
+
+    def _schedule(self, job: Job, due: float, delay: float = 0.0):
+        """Queue the job's next run at `due` (plus jitter), or after `delay` for a retry"""
+        job.due = due
+        fire_at = due + delay
+        if job.interval and job.jitter and not delay:
+            fire_at += random.uniform(0, job.jitter * job.interval)
+        job.next_run = time.time() + (fire_at - time.monotonic())
+        with self.lock:
+            heapq.heappush(self.heap, (fire_at, next(self.seq), job.generation, job))
+        self.wakeup.set()
+
+    def start(self):
+        if self.running:
+            return
+        # Jobs added before the scheduler started run from now on, not from when they were added
+        with self.lock:
+            jobs = list(self.jobs.values())
+            self.heap = []
+        now = time.monotonic()
+        for job in jobs:
+            self._schedule(job, now if job.interval else self._next_cron(job))
+        self.running = True
+        threading.Thread(target=self._loop, name='job-scheduler', daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def healthy(self) -> bool:
+        return self.running and self.heartbeat is not None and time.monotonic() - self.heartbeat < 10
+
+    def _loop(self):
+        while self.running:
+            self.heartbeat = time.monotonic()
+            with self.lock:
+                while self.heap and self.heap[0][2] != self.heap[0][3].generation:
+                    heapq.heappop(self.heap)  # Removed or replaced job
+                if self.heap and self.heap[0][0] <= time.monotonic():
+                    _, _, _, job = heapq.heappop(self.heap)
+                else:
+                    job = None
+                    timeout = self.heap[0][0] - time.monotonic() if self.heap else 5.0
+            if job is None:
+                self.wakeup.wait(timeout=min(max(timeout, 0), 5.0))
+                self.wakeup.clear()
+                continue
+            self._fire(job)
+
+    def _players_online(self) -> bool:
+        if not self.player_count:
+            return False
+        count = self.player_count()
+        return count is None or count > 0
+
+    def _fire(self, job: Job):
+        now = time.monotonic()
+
+        if job.wait_for_empty and self._players_online():
+            job.waiting_since = job.waiting_since or now
+            if job.max_wait is None or now - job.waiting_since < job.max_wait:
+                self._schedule(job, job.due, delay=now - job.due + self.empty_check_interval)
+                return
+        job.waiting_since = None
+
+        self._reschedule(job, now)
+        if job.running:
+            # The previous run of a blocking job is still going, skip this one
+            job.missed += 1
+            return
+
+        job.running = True
+        if job.native:
+            gevent.get_hub().threadpool.spawn(self._run, job)
+        elif job.blocking:
+            threading.Thread(target=self._run, args=(job,), name=f'job-{job.name}', daemon=True).start()
+        else:
+            self._run(job)
+
+    def _reschedule(self, job: Job, now: float):
+        """Schedule the run after this one, collapsing runs we were too late for into one"""
+        if job.interval:
+            lag = now - job.due
+            if lag > job.interval:
+                job.missed += int(lag // job.interval)
+                self._schedule(job, now + job.interval)
+            else:
+                self._schedule(job, job.due + job.interval)
+        else:
+            self._schedule(job, self._next_cron(job))
+
+    def _run(self, job: Job):
+        started = time.perf_counter()
+        job.last_run = time.time()
+        try:
+            job.action()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"Error in scheduled job {job.name}: {e}")
+        finally:
+            job.running = False
+            job.runs += 1
+            job.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def stats(self) -> List[dict]:
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [job.stats() for job in jobs]
@@ -0,0 +1,218 @@
+import json
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional
+from .memory import CappedDeque
+
+def parse_journal_entry(raw: str) -> Optional[dict]:
+    """Parse one line of `journalctl -o json` output"""
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+    message = data.get('MESSAGE', '')
+    if isinstance(message, list):  # journald sends non-UTF-8 messages as a byte array
+        message = bytes(message).decode('utf-8', errors='replace')
+    elif message is None:
+        message = ''
+
+    try:
+        timestamp = int(data.get('__REALTIME_TIMESTAMP', 0)) / 1_000_000
+    except (TypeError, ValueError):
+        timestamp = time.time()
+
+    return {
+        'cursor': data.get('__CURSOR'),
+        'timestamp': timestamp,
+        'message': message.rstrip()
+    }
+
+class JournalStreamer:
+    """Follows a unit's journal and hands out lines in batches with per client rate limits"""
+
+    def __init__(self, unit: str,
+                 batch_interval: float = 0.25,
+                 batch_size: int = 200,
+                 history_size: int = 1000,
+                 client_rate: float = 200.0,
+                 client_burst: int = 500,
+                 max_clients: int = 1000):
+        self.unit = unit
+        self.batch_interval = batch_interval  # Longest a line waits before its batch is sent
+        self.batch_size = batch_size  # A batch is sent early once it holds this many lines
+        self.history = CappedDeque(maxlen=history_size)  # Recent entries, for status and resuming clients
+        self.client_rate = client_rate  # Lines per second each client may receive
+        self.client_burst = client_burst  # Lines a client may receive at once after being idle
+        self.clients = {}  # sid -> rate limit state, oldest subscription first
+        self.max_clients = max_clients
+        self.clients_evicted = 0
+        self.pending: List[dict] = []
+        self.cursor: Optional[str] = None  # Cursor of the last entry read from journald
+        self.seq = 0  # Local sequence number of the last entry read
+        self.restarts = 0
+        self.lock = threading.Lock()
+        self.process: Optional[subprocess.Popen] = None
+        self.running = False
+        self.send: Optional[Callable[[str, dict], None]] = None  # send(sid, payload)
+        self.on_entry: Optional[Callable[[dict], None]] = None  # Called with every new entry
+
+    def start(self, flush_in_background: bool = True):
+        """Start following the journal, and flushing batches unless the caller calls flush() itself"""
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        if flush_in_background:
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def _command(self) -> List[str]:
+        cmd = ['journalctl', '-u', self.unit, '-f', '-o', 'json', '--no-pager']
+        if self.cursor:
+            # Pick up exactly where the previous journalctl stopped
+            cmd.append(f'--after-cursor={self.cursor}')
+        else:
+            cmd.extend(['-n', str(min(50, self.history.maxlen))])
+        return cmd
+
+    def _read_loop(self):
+        """Run journalctl, restarting it with a growing delay whenever it exits"""
+        delay = 1
+        while self.running:
+            started = time.time()
+            try:
+                self.process = subprocess.Popen(
+                    self._command(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    universal_newlines=True
+                )
+                for raw in self.process.stdout:
+                    entry = parse_journal_entry(raw)
+                    if entry:
+                        self._add(entry)
+                self.process.wait()
+            except Exception as e:
+                print(f"Error monitoring journal: {e}")
+
+            if not self.running:
+                break
+            # Reset the delay if journalctl ran for a while before exiting
+            delay = 1 if time.time() - started > 30 else min(delay * 2, 30)
+            self.restarts += 1
+            print(f"journalctl exited, restarting in {delay} seconds")
+            time.sleep(delay)
+
+    def _add(self, entry: dict):
+        with self.lock:
+            if entry['cursor']:
+                self.cursor = entry['cursor']
+            self.seq += 1
+            entry['seq'] = self.seq
+            self.history.append(entry)
+            self.pending.append(entry)
+            full = len(self.pending) >= self.batch_size
+        if self.on_entry:
+            self.on_entry(entry)
+        if full:
+            self.flush()
+
+    def _flush_loop(self):
+        while self.running:
+            time.sleep(self.batch_interval)
+            self.flush()
+
+    def flush(self):
+        """Send pending lines to every subscribed client within its rate limit"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+            clients = list(self.clients.items())
+        if not batch or not self.send:
+            return
+
+        now = time.time()
+        for sid, state in clients:
+            # Skip entries the client already got when it subscribed
+            entries = [entry for entry in batch if entry['seq'] > state['seq']]
+            if not entries:
+                continue
+            state['tokens'] = min(self.client_burst,
+                                  state['tokens'] + (now - state['refilled_at']) * self.client_rate)
+            state['refilled_at'] = now
+
+            state['seq'] = entries[-1]['seq']
+
+            allowed = int(state['tokens'])
+            if allowed <= 0:
+                state['dropped'] += len(entries)
+                continue
+            # Over the limit: keep the newest lines and count the rest as dropped
+            lines = entries[-allowed:]
+            state['dropped'] += len(entries) - len(lines)
+            state['tokens'] -= len(lines)
+            self._send(sid, lines, state)
+
+    def _send(self, sid: str, entries: List[dict], state: dict):
+        payload = {
+            'logs': [entry['message'] for entry in entries],
+            'cursor': entries[-1]['cursor'] if entries else self.cursor,
+            'dropped': state['dropped']
+        }
+        state['dropped'] = 0
+        try:
+            self.send(sid, payload)
+        except Exception as e:
+            print(f"Error sending journal batch to {sid}: {e}")
+
+    def subscribe(self, sid: str, cursor: Optional[str] = None, backlog: int = 50):
+        """Subscribe a client, replaying history after `cursor` (or the last `backlog` lines)"""
+        state = {'tokens': float(self.client_burst), 'refilled_at': time.time(), 'dropped': 0}
+        with self.lock:
+            history = list(self.history)
+            state['seq'] = self.seq
+            if sid not in self.clients and len(self.clients) >= self.max_clients:
+                # Most likely a client whose disconnect never reached this process
+                self.clients.pop(next(iter(self.clients)))
+                self.clients_evicted += 1
+            self.clients.pop(sid, None)
+            self.clients[sid] = state
+
+        replay = None
+        if cursor:
+            for index, entry in enumerate(history):
+                if entry['cursor'] == cursor:
+                    replay = history[index + 1:]
+                    break
+        if replay is None:
+            replay = history[-backlog:] if backlog else []
+
+        replay = replay[-self.client_burst:]
+        state['tokens'] -= len(replay)
+        if self.send:
+            self._send(sid, replay, state)
+
+    def unsubscribe(self, sid: str):
+        with self.lock:
+            self.clients.pop(sid, None)
+
+    def recent(self, count: int = 50) -> List[str]:
+        """Return the messages of the last `count` journal entries"""
+        with self.lock:
+            return [entry['message'] for entry in list(self.history)[-count:]]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'running': self.running,
+                'cursor': self.cursor,
+                'restarts': self.restarts,
+                'history': len(self.history),
+                'clients': {sid: {'dropped': state['dropped'], 'tokens': int(state['tokens'])}
+                            for sid, state in self.clients.items()}
+            }
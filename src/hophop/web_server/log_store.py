@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+from .console_lines import LEVELS, level_rank
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    plugin TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_ts ON lines (ts);
+CREATE INDEX IF NOT EXISTS lines_plugin_ts ON lines (plugin, ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5 (text, content='lines', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+    INSERT INTO lines_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+    INSERT INTO lines_fts (lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+def fts_query(terms: str) -> str:
+    """Quote each word so user input can't inject FTS syntax; words are ANDed"""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in terms.split())
+
+class ConsoleLogStore:
+    """Append-only SQLite store of parsed console lines with a full-text index"""
+
+    def __init__(self, path: Path, retention_days: float = 30.0, max_buffer: int = 10000):
+        self.path = Path(path)
+        self.retention_days = retention_days
+        self.max_buffer = max_buffer  # Lines held in memory between flushes before the oldest are dropped
+        self.buffer = deque(maxlen=max_buffer)
+        self.dropped = 0
+        self.written = 0
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()  # Guards the connection
+        self.buffer_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use so importing the app doesn't touch the disk"""
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self.conn = conn
+        return self.conn
+
+    def append(self, entry: dict):
+        """Queue a parsed line; it's written on the next flush()"""
+        with self.buffer_lock:
+            if len(self.buffer) == self.max_buffer:
+                self.dropped += 1  # The append below pushes out the oldest line
+            self.buffer.append(entry)
+
+    def flush(self):
+        """Write queued lines in one transaction (indexing them through the insert trigger)"""
+        with self.buffer_lock:
+            batch, self.buffer = self.buffer, deque(maxlen=self.max_buffer)
+        if not batch:
+            return
+        rows = [(e['timestamp'], e['level'], e['plugin'], e['text']) for e in batch]
+        with self.lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany('INSERT INTO lines (ts, level, plugin, text) VALUES (?, ?, ?, ?)', rows)
+        self.written += len(rows)
+
+    def prune(self):
+        """Delete lines older than the retention period"""
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        with self.lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM lines WHERE ts < ?', (cutoff,))
+
+    def search(self, terms: Optional[str] = None, level: Optional[str] = None,
+               plugin: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None, before_id: Optional[int] = None,
+               limit: int = 100) -> dict:
+        """Newest matching lines first; pass the last id back as before_id for the next page"""
+        started = time.perf_counter()
+        limit = max(1, min(limit, 1000))
+        sql = 'SELECT lines.id, lines.ts, lines.level, lines.plugin, lines.text FROM lines'
+        where, params = [], []
+        if terms and terms.strip():
+            sql += ' JOIN lines_fts ON lines_fts.rowid = lines.id'
+            where.append('lines_fts MATCH ?')
+            params.append(fts_query(terms))
+        if level:
+            levels = [name for name in LEVELS if level_rank(name) >= level_rank(level)]
+            where.append(f"lines.level IN ({','.join('?' * len(levels))})")
+            params.extend(levels)
+        if plugin:
+            where.append('lines.plugin = ?')
+            params.append(plugin)
+        if since is not None:
+            where.append('lines.ts >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('lines.ts <= ?')
+            params.append(until)
+        if before_id is not None:
+            where.append('lines.id < ?')
+            params.append(before_id)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY lines.id DESC LIMIT ?'
+        params.append(limit)
+
+        self.flush()  # Include lines that arrived since the last flush
+        with self.lock:
+            rows = self._connection().execute(sql, params).fetchall()
+
+        lines = [{'id': row[0], 'timestamp': row[1], 'level': row[2], 'plugin': row[3], 'text': row[4]}
+                 for row in rows]
+        return {
+            'lines': lines,
+            'next_before_id': lines[-1]['id'] if len(lines) == limit else None,
+            'took_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def stats(self) -> dict:
+        with self.lock:
+            count, oldest, newest = self._connection().execute(
+                'SELECT COUNT(*), MIN(ts), MAX(ts) FROM lines').fetchone()
+        try:
+            size = sum(os.path.getsize(f'{self.path}{suffix}') for suffix in ('', '-wal')
+                       if os.path.exists(f'{self.path}{suffix}'))
+        except OSError:
+            size = None
+        return {
+            'lines': count,
+            'oldest': oldest,
+            'newest': newest,
+            'size_bytes': size,
+            'buffered': len(self.buffer),
+            'written': self.written,
+            'dropped': self.dropped,
+            'retention_days': self.retention_days
+        }
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
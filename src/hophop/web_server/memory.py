@@ -0,0 +1,196 @@
+import gc
+import itertools
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+# How tracemalloc statistics can be grouped
+STAT_KEYS = ('lineno', 'filename', 'traceback')
+
+def check_key(key: str):
+    if key not in STAT_KEYS:
+        raise ValueError(f"key must be one of {', '.join(STAT_KEYS)}")
+
+class CappedDeque(deque):
+    """deque with a required maxlen that counts the items it pushes out"""
+
+    def __init__(self, iterable=(), maxlen: int = 1000):
+        super().__init__(iterable, maxlen)
+        self.evicted = 0
+
+    def append(self, item):
+        if len(self) == self.maxlen:
+            self.evicted += 1
+        super().append(item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+def buffer_stats(buffer, cap: Optional[int] = None, evicted: Optional[int] = None) -> dict:
+    """Size, cap and eviction count of an internal container"""
+    return {
+        'size': len(buffer),
+        'cap': cap if cap is not None else getattr(buffer, 'maxlen', None),
+        'evicted': evicted if evicted is not None else getattr(buffer, 'evicted', 0)
+    }
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Linux reports KiB
+
+class MemoryMonitor:
+    """RSS history, internal buffer sizes and on-demand tracemalloc snapshots for one process"""
+
+    def __init__(self, buffers: Callable[[], Dict[str, dict]],
+                 history_size: int = 1440,
+                 hourly_size: int = 24 * 42,
+                 max_snapshots: int = 5,
+                 trace_frames: int = 10):
+        self.buffers = buffers  # Returns {name: buffer_stats(...)}
+        self.history = CappedDeque(maxlen=history_size)  # One sample per sampling interval
+        self.hourly = CappedDeque(maxlen=hourly_size)  # Highest sample of each hour, for multi-week trends
+        self.hour: Optional[dict] = None
+        self.max_snapshots = max_snapshots  # Each one holds every traced allocation, so keep few
+        self.trace_frames = trace_frames
+        self.snapshots: 'OrderedDict[int, dict]' = OrderedDict()  # id -> {'snapshot', 'taken_at'}
+        self.snapshot_ids = itertools.count(1)
+        self.snapshots_evicted = 0
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+
+    def buffer_sizes(self) -> Dict[str, dict]:
+        try:
+            return self.buffers()
+        except Exception as e:
+            print(f"Error measuring internal buffers: {e}")
+            return {}
+
+    def sample(self):
+        """Record RSS and the total number of buffered items"""
+        now = time.time()
+        sizes = self.buffer_sizes()
+        sample = {
+            'at': round(now),
+            'rss': current_rss(),
+            'buffered': sum(stats['size'] for stats in sizes.values()),
+            'evicted': sum(stats['evicted'] for stats in sizes.values())
+        }
+        with self.lock:
+            self.history.append(sample)
+            hour = int(now // 3600)
+            if self.hour is None or self.hour['hour'] != hour:
+                self.hour = dict(sample, hour=hour)
+                self.hourly.append(self.hour)
+            elif (sample['rss'] or 0) > (self.hour['rss'] or 0):
+                self.hour.update(sample, hour=hour)
+
+    def stats(self) -> dict:
+        with self.lock:
+            history = list(self.history)
+            hourly = [{key: value for key, value in sample.items() if key != 'hour'} for sample in self.hourly]
+        rss_values = [sample['rss'] for sample in history if sample['rss']]
+        return {
+            'rss': current_rss(),
+            'peak_rss': peak_rss(),
+            'uptime': round(time.time() - self.started_at),
+            'rss_growth': rss_values[-1] - rss_values[0] if len(rss_values) > 1 else 0,
+            'buffers': self.buffer_sizes(),
+            'gc': {'counts': gc.get_count(), 'objects': len(gc.get_objects()), 'garbage': len(gc.garbage)},
+            'tracemalloc': self.tracing_stats(),
+            'history': history,
+            'hourly': hourly
+        }
+
+    def tracing_stats(self) -> dict:
+        if not tracemalloc.is_tracing():
+            return {'tracing': False}
+        current, peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            snapshots = [{'id': snapshot_id, 'taken_at': entry['taken_at'], 'traced': entry['traced']}
+                         for snapshot_id, entry in self.snapshots.items()]
+        return {
+            'tracing': True,
+            'frames': tracemalloc.get_traceback_limit(),
+            'traced': current,
+            'traced_peak': peak,
+            'overhead': tracemalloc.get_tracemalloc_memory(),
+            'snapshots': snapshots,
+            'snapshots_evicted': self.snapshots_evicted
+        }
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>')
+        ))
+
+    def snapshot(self, frames: Optional[int] = None) -> dict:
+        """Start tracing if needed and keep a snapshot of every live traced allocation"""
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(frames or self.trace_frames)
+            print(f"Tracing memory allocations with {tracemalloc.get_traceback_limit()} frames")
+        snapshot = self._take()
+        entry = {'snapshot': snapshot, 'taken_at': time.time(),
+                 'traced': sum(stat.size for stat in snapshot.statistics('filename'))}
+        with self.lock:
+            snapshot_id = next(self.snapshot_ids)
+            self.snapshots[snapshot_id] = entry
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+                self.snapshots_evicted += 1
+        return {'id': snapshot_id, 'taken_at': entry['taken_at'], 'traced': entry['traced'],
+                'tracing_started': started}
+
+    def top(self, snapshot_id: int, key: str = 'lineno', limit: int = 25) -> List[dict]:
+        """Largest allocation sites in a snapshot; raises KeyError if it's gone"""
+        check_key(key)
+        with self.lock:
+            snapshot = self.snapshots[snapshot_id]['snapshot']
+        return [{'where': self._where(stat.traceback, key), 'size': stat.size, 'count': stat.count}
+                for stat in snapshot.statistics(key)[:limit]]
+
+    def diff(self, from_id: int, to_id: Optional[int] = None, key: str = 'lineno', limit: int = 25) -> dict:
+        """Allocation sites that grew the most between two snapshots, or between one and now"""
+        check_key(key)
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('Memory allocations are not being traced, take a snapshot first')
+        with self.lock:
+            old = self.snapshots[from_id]['snapshot']
+            new = self.snapshots[to_id]['snapshot'] if to_id is not None else None
+        if new is None:
+            new = self._take()
+        stats = new.compare_to(old, key)
+        return {
+            'from': from_id,
+            'to': to_id,
+            'size_diff': sum(stat.size_diff for stat in stats),
+            'count_diff': sum(stat.count_diff for stat in stats),
+            'top': [{'where': self._where(stat.traceback, key), 'size_diff': stat.size_diff, 'size': stat.size,
+                     'count_diff': stat.count_diff, 'count': stat.count} for stat in stats[:limit]]
+        }
+
+    def stop_tracing(self):
+        with self.lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+
+    @staticmethod
+    def _where(traceback: tracemalloc.Traceback, key: str):
+        if key == 'traceback':
+            return traceback.format()
+        frame = traceback[0]
+        return frame.filename if key == 'filename' else f'{frame.filename}:{frame.lineno}'
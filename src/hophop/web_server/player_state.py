@@ -0,0 +1,172 @@
+import json
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# "1.2.3.4:56789/76561198000000000/Name joined [windows/76561198000000000]"
+JOIN_PATTERN = re.compile(r'^(?:(?P<address>[\d.]+:\d+)/)?(?P<steamid>\d{17})/(?P<name>.+?) joined \[')
+# "1.2.3.4:56789/76561198000000000/Name disconnecting: closing"
+LEAVE_PATTERN = re.compile(r'^(?:(?P<address>[\d.]+:\d+)/)?(?P<steamid>\d{17})/(?P<name>.+?) disconnecting: (?P<reason>.*)$')
+# "Name[76561198000000000] was killed by Other[76561198000000001]" or "... was killed by wolf (Wolf)"
+KILL_PATTERN = re.compile(r'^(?P<name>.+?)\[(?P<steamid>\d{17})\] was killed by (?P<killer>.+?)(?:\[(?P<killer_id>\d{17})\])?(?: at \(.*\))?$')
+# "Name[76561198000000000] died (Fall)"
+DEATH_PATTERN = re.compile(r'^(?P<name>.+?)\[(?P<steamid>\d{17})\] died \((?P<cause>[^)]*)\)')
+
+class PlayerState:
+    """Online players indexed by SteamID, kept current from console events and checked against playerlist"""
+
+    def __init__(self):
+        self.players: Dict[str, dict] = {}  # steamid -> player
+        self.version = 0  # Bumped with every delta so clients can spot a gap and reload
+        self.lock = threading.Lock()
+        self.reconciled_at: Optional[float] = None
+        self.corrections = 0  # Players added, removed or renamed by reconciliation
+        self.on_delta: Optional[Callable[[dict], None]] = None
+
+    def _player(self, steamid: str, name: str) -> dict:
+        return {
+            'steamid': steamid,
+            'name': name,
+            'address': None,
+            'connected_at': time.time(),
+            'ping': None,
+            'health': None,
+            'kills': 0,
+            'deaths': 0,
+            'last_chat': None
+        }
+
+    def _publish(self, op: str, steamid: str, player: Optional[dict] = None, **extra):
+        """Record a change and hand it to on_delta; call with the lock held"""
+        self.version += 1
+        delta = {'op': op, 'steamid': steamid, 'version': self.version, **extra}
+        if player is not None:
+            delta['player'] = dict(player)
+        if self.on_delta:
+            self.on_delta(delta)
+
+    def handle_console_line(self, line: str):
+        line = line.strip()
+        match = JOIN_PATTERN.search(line)
+        if match:
+            self.join(match.group('steamid'), match.group('name'), match.group('address'))
+            return
+        match = LEAVE_PATTERN.search(line)
+        if match:
+            self.leave(match.group('steamid'), match.group('reason'))
+            return
+        match = KILL_PATTERN.search(line) or DEATH_PATTERN.search(line)
+        if match:
+            self.death(match.group('steamid'), match.groupdict().get('killer_id'))
+
+    def handle_chat(self, message: str):
+        """Handle the JSON body of a WebRcon Chat broadcast"""
+        try:
+            chat = json.loads(message)
+        except (TypeError, json.JSONDecodeError):
+            return
+        steamid = str(chat.get('UserId', ''))
+        with self.lock:
+            player = self.players.get(steamid)
+            if not player:
+                return
+            player['last_chat'] = {'message': chat.get('Message', ''), 'time': time.time()}
+            self._publish('update', steamid, fields={'last_chat': player['last_chat']})
+
+    def join(self, steamid: str, name: str, address: Optional[str] = None):
+        with self.lock:
+            player = self.players.get(steamid) or self._player(steamid, name)
+            player['name'] = name
+            player['address'] = address or player['address']
+            self.players[steamid] = player
+            self._publish('join', steamid, player)
+
+    def leave(self, steamid: str, reason: Optional[str] = None):
+        with self.lock:
+            if self.players.pop(steamid, None) is not None:
+                self._publish('leave', steamid, reason=reason)
+
+    def death(self, steamid: str, killer_id: Optional[str] = None):
+        with self.lock:
+            player = self.players.get(steamid)
+            if player:
+                player['deaths'] += 1
+                self._publish('update', steamid, fields={'deaths': player['deaths']})
+            killer = self.players.get(killer_id) if killer_id and killer_id != steamid else None
+            if killer:
+                killer['kills'] += 1
+                self._publish('update', killer_id, fields={'kills': killer['kills']})
+
+    def reconcile(self, response: str):
+        """Correct drift against the output of the `playerlist` RCON command"""
+        try:
+            entries = json.loads(response)
+        except (TypeError, json.JSONDecodeError):
+            return
+        if not isinstance(entries, list):
+            return
+
+        now = time.time()
+        listed = {}
+        for entry in entries:
+            steamid = str(entry.get('SteamID', ''))
+            if steamid:
+                listed[steamid] = entry
+
+        with self.lock:
+            for steamid in [steamid for steamid in self.players if steamid not in listed]:
+                del self.players[steamid]
+                self.corrections += 1
+                self._publish('leave', steamid, reason='not in playerlist')
+
+            for steamid, entry in listed.items():
+                player = self.players.get(steamid)
+                name = entry.get('DisplayName', '')
+                if player is None or player['name'] != name:
+                    player = player or self._player(steamid, name)
+                    player['name'] = name
+                    player['connected_at'] = now - float(entry.get('ConnectedSeconds', 0) or 0)
+                    player['address'] = entry.get('Address') or player['address']
+                    player['ping'] = entry.get('Ping')
+                    player['health'] = entry.get('Health')
+                    self.players[steamid] = player
+                    self.corrections += 1
+                    self._publish('join', steamid, player)
+                    continue
+
+                fields = {'ping': entry.get('Ping'), 'health': entry.get('Health')}
+                changed = {key: value for key, value in fields.items() if player[key] != value}
+                if changed:
+                    player.update(changed)
+                    self._publish('update', steamid, fields=changed)
+
+            self.reconciled_at = now
+
+    def clear(self):
+        """Forget everyone, e.g. when the server goes offline"""
+        with self.lock:
+            for steamid in list(self.players):
+                del self.players[steamid]
+                self._publish('leave', steamid, reason='server offline')
+            self.reconciled_at = None
+
+    def get(self, steamid: str) -> Optional[dict]:
+        player = self.players.get(steamid)
+        return dict(player) if player else None
+
+    def count(self) -> Optional[int]:
+        """Players online, or None until a playerlist has confirmed the model"""
+        return len(self.players) if self.reconciled_at is not None else None
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            players: List[dict] = [dict(player) for player in self.players.values()]
+            version = self.version
+        return {
+            'players': sorted(players, key=lambda player: player['name'].lower()),
+            'count': len(players),
+            'version': version,
+            'reconciled_at': self.reconciled_at,
+            'corrections': self.corrections
+        }
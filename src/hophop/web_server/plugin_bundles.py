@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from werkzeug.utils import secure_filename
+from .plugin_files import iter_file
+from .plugin_reload import PluginReloader, file_hash
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+BULK_ACTIONS = ('activate', 'deactivate', 'delete')
+
+class BundleError(Exception):
+    """A bundle or bulk request that can't be applied; nothing has been changed"""
+
+def parse_manifest(data: bytes) -> dict:
+    """Decode a bundle's manifest, raising BundleError unless it has the shape install() relies on"""
+    try:
+        manifest = json.loads(data.decode('utf-8'))
+    except ValueError as e:  # Includes JSONDecodeError and UnicodeDecodeError
+        raise BundleError(f"{MANIFEST_NAME} isn't valid JSON: {e}")
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('plugins', {}), dict):
+        raise BundleError(f"{MANIFEST_NAME} must be an object with a 'plugins' object")
+    for name, plugin in manifest.get('plugins', {}).items():
+        if not isinstance(plugin, dict) or not isinstance(plugin.get('files', {}), dict):
+            raise BundleError(f"{MANIFEST_NAME}: plugin {name} must be an object with a 'files' object")
+        if not all(isinstance(digest, str) for digest in plugin.get('files', {}).values()):
+            raise BundleError(f"{MANIFEST_NAME}: plugin {name} has a file hash that isn't a string")
+    return manifest
+
+class ChunkWriter:
+    """Write-only file object that collects bytes for a generator to hand out"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.offset = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+class PluginBundles:
+    """Bulk plugin changes and zip/tar bundles of plugin code, configs, data and lang files.
+
+    A bundle holds `plugins/<Name>.cs`, `configs/<Name>.json`, `data/<Name>.json`,
+    `lang/<code>/<Name>.json` and a `manifest.json` recording each plugin's files, their
+    sha256 and whether it was active. Bare `.cs` files at the top level are read as plugins.
+    """
+
+    def __init__(self, scripts_dir: str, carbon_dir: str, reloader: PluginReloader,
+                 max_bytes: int = 256 * 1024 * 1024, max_files: int = 2000):
+        self.scripts_dir = scripts_dir
+        self.carbon_dir = carbon_dir
+        self.plugins_dir = reloader.target_dir
+        self.reloader = reloader
+        self.max_bytes = max_bytes  # Upload size, and total unpacked size, a bundle may have
+        self.max_files = max_files
+        # deploy(plugin_names) -> names copied; replaced in workers that hand deploys to the owner
+        self.deploy: Callable[[List[str]], List[str]] = reloader.deploy
+
+    def is_active(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.plugins_dir, f'{name}.cs'))
+
+    def plugin_files(self, name: str) -> Dict[str, str]:
+        """Bundle path -> file path of every file belonging to a plugin"""
+        files = {}
+        candidates = [
+            (f'plugins/{name}.cs', os.path.join(self.scripts_dir, f'{name}.cs')),
+            (f'configs/{name}.json', os.path.join(self.carbon_dir, 'configs', f'{name}.json')),
+            (f'data/{name}.json', os.path.join(self.carbon_dir, 'data', f'{name}.json'))
+        ]
+        lang_dir = os.path.join(self.carbon_dir, 'lang')
+        if os.path.isdir(lang_dir):
+            for code in sorted(os.listdir(lang_dir)):
+                candidates.append((f'lang/{code}/{name}.json', os.path.join(lang_dir, code, f'{name}.json')))
+        for bundle_path, path in candidates:
+            if os.path.isfile(path):
+                files[bundle_path] = path
+        return files
+
+    def target_path(self, bundle_path: str) -> Optional[Tuple[str, str]]:
+        """Map a path inside a bundle to (plugin name, file path), or None if it isn't a plugin file"""
+        parts = bundle_path.replace('\\', '/').strip('/').split('/')
+        if any(part != secure_filename(part) or not part for part in parts):
+            return None
+        filename = parts[-1]
+        name, ext = os.path.splitext(filename)
+        if len(parts) == 1 or parts[0] == 'plugins' and len(parts) == 2:
+            return (name, os.path.join(self.scripts_dir, filename)) if ext == '.cs' else None
+        if ext != '.json':
+            return None
+        if parts[0] in ('configs', 'data') and len(parts) == 2:
+            return name, os.path.join(self.carbon_dir, parts[0], filename)
+        if parts[0] == 'lang' and len(parts) == 3:
+            return name, os.path.join(self.carbon_dir, 'lang', parts[1], filename)
+        return None
+
+    def apply(self, actions: Iterable[dict]) -> dict:
+        """Activate, deactivate and delete plugins, deploying all activations as one batch"""
+        changes: Dict[str, str] = {}
+        for item in actions:
+            name, action = item.get('name'), item.get('action')
+            if not name or name != secure_filename(name):
+                raise BundleError(f"Invalid plugin name '{name}'")
+            if action not in BULK_ACTIONS:
+                raise BundleError(f"Unknown action '{action}' for {name}, expected one of {', '.join(BULK_ACTIONS)}")
+            if name in changes:
+                raise BundleError(f"{name} is listed more than once")
+            if action == 'activate' and not os.path.exists(os.path.join(self.scripts_dir, f'{name}.cs')):
+                raise BundleError(f"Plugin {name} not found")
+            changes[name] = action
+
+        results = {}
+        for name, action in changes.items():
+            if action == 'activate':
+                continue
+            paths = [os.path.join(self.plugins_dir, f'{name}.cs')]
+            if action == 'delete':
+                paths.extend(self.plugin_files(name).values())
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            results[name] = 'deactivated' if action == 'deactivate' else 'deleted'
+
+        activate = [name for name, action in changes.items() if action == 'activate']
+        deployed = set(self.deploy(activate)) if activate else set()
+        for name in activate:
+            results[name] = 'activated' if name in deployed else 'unchanged'
+        return {'results': results, 'deployed': sorted(deployed)}
+
+    def receive(self, stream, chunk_size: int = 65536):
+        """Spool an upload to a temp file while hashing it, without holding it in memory"""
+        spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            size += len(chunk)
+            if size > self.max_bytes:
+                spool.close()
+                raise BundleError(f"Bundle is larger than {self.max_bytes // (1024 * 1024)} MB")
+            digest.update(chunk)
+            spool.write(chunk)
+        spool.seek(0)
+        return spool, digest.hexdigest(), size
+
+    def _members(self, spool) -> Iterator[Tuple[str, int, Callable]]:
+        """(path, size, open) for each regular file in a zip or tar archive"""
+        if zipfile.is_zipfile(spool):
+            spool.seek(0)
+            archive = zipfile.ZipFile(spool)
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, lambda info=info: archive.open(info)
+            return
+        spool.seek(0)
+        try:
+            archive = tarfile.open(fileobj=spool, mode='r:*')
+        except tarfile.TarError:
+            raise BundleError('Not a zip or tar archive')
+        for member in archive.getmembers():
+            if member.isfile():
+                yield member.name, member.size, lambda member=member: archive.extractfile(member)
+
+    def install(self, stream, activate: str = 'manifest') -> dict:
+        """Unpack a bundle upload and deploy its plugins in one batch.
+
+        `activate` is 'manifest' (plugins the manifest marks active), 'all' or 'none'; plugins
+        that are already active are redeployed whenever their code changed.
+        """
+        spool, bundle_hash, size = self.receive(stream)
+        staged: List[Tuple[str, str]] = []  # (temp path, target path)
+        try:
+            manifest = {}
+            members = []
+            for path, member_size, opener in self._members(spool):
+                if path.replace('\\', '/').strip('/') == MANIFEST_NAME:
+                    with opener() as f:
+                        manifest = parse_manifest(f.read())
+                else:
+                    members.append((path, member_size, opener))
+            if len(members) > self.max_files:
+                raise BundleError(f"Bundle has more than {self.max_files} files")
+            expected = {bundle_path: digest
+                        for plugin in manifest.get('plugins', {}).values()
+                        for bundle_path, digest in plugin.get('files', {}).items()}
+
+            files, skipped, names = [], [], set()
+            targets: Dict[str, str] = {}  # target path -> bundle path that unpacks there
+            unpacked = 0
+            for path, member_size, opener in members:
+                target = self.target_path(path)
+                if target is None:
+                    skipped.append(path)
+                    continue
+                name, target_path = target
+                bundle_path = path.replace('\\', '/').strip('/')
+                if target_path in targets:
+                    # e.g. Foo.cs and plugins/Foo.cs, or the same zip entry twice
+                    raise BundleError(f"{targets[target_path]} and {bundle_path} would both be written to "
+                                      f"{os.path.basename(target_path)}")
+                targets[target_path] = bundle_path
+                unpacked += member_size
+                if unpacked > self.max_bytes:
+                    raise BundleError(f"Bundle unpacks to more than {self.max_bytes // (1024 * 1024)} MB")
+
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                # Not ending in .cs, or Carbon would try to compile it
+                fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(target_path)}.', suffix='.tmp',
+                                                dir=os.path.dirname(target_path))
+                staged.append((tmp_path, target_path))
+                os.chmod(tmp_path, 0o644)  # mkstemp creates it 0600
+                digest = hashlib.sha256()
+                with opener() as src, os.fdopen(fd, 'wb') as dst:
+                    for chunk in iter(lambda: src.read(65536), b''):
+                        digest.update(chunk)
+                        dst.write(chunk)
+                digest = digest.hexdigest()
+                if bundle_path in expected and expected[bundle_path] != digest:
+                    raise BundleError(f"{bundle_path} doesn't match the hash in the manifest")
+                status = 'unchanged' if file_hash(target_path) == digest else 'written'
+                files.append({'path': bundle_path, 'plugin': name, 'sha256': digest, 'status': status})
+                names.add(name)
+
+            # Everything checked out, move it all into place
+            for tmp_path, target_path in staged:
+                os.replace(tmp_path, target_path)
+            staged = []
+        finally:
+            for tmp_path, _ in staged:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            spool.close()
+
+        manifest_plugins = manifest.get('plugins', {})
+        to_deploy = sorted(name for name in names
+                           if self.is_active(name)
+                           or activate == 'all'
+                           or activate == 'manifest' and manifest_plugins.get(name, {}).get('active'))
+        deployed = self.deploy(to_deploy) if to_deploy else []
+        return {
+            'sha256': bundle_hash,
+            'bytes': size,
+            'plugins': sorted(names),
+            'files': files,
+            'skipped': skipped,
+            'deployed': deployed
+        }
+
+    def manifest(self, names: Iterable[str], include_data: bool = True) -> Tuple[dict, Dict[str, str]]:
+        """The manifest for a bundle of these plugins, and bundle path -> file path"""
+        plugins, files = {}, {}
+        for name in names:
+            plugin_files = {bundle_path: path for bundle_path, path in self.plugin_files(name).items()
+                            if include_data or not bundle_path.startswith('data/')}
+            if not plugin_files:
+                continue
+            plugins[name] = {
+                'active': self.is_active(name),
+                'files': {bundle_path: file_hash(path) for bundle_path, path in plugin_files.items()}
+            }
+            files.update(plugin_files)
+        return {'format': BUNDLE_FORMAT, 'created_at': time.time(), 'plugins': plugins}, files
+
+    @staticmethod
+    def _snapshot(manifest: dict, files: Dict[str, str]) -> Dict[str, Tuple[float, tempfile.SpooledTemporaryFile]]:
+        """Copy every file before any is streamed, so one Carbon rewrites meanwhile can't change size under
+        its tar header or stop matching the manifest; the manifest gets the hashes of the copies.
+
+        Returns bundle path -> (mtime, copy), each copy rewound.
+        """
+        copies, hashes = {}, {}
+        try:
+            for bundle_path, path in files.items():
+                mtime = os.path.getmtime(path)
+                copy = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+                copies[bundle_path] = (mtime, copy)
+                digest = hashlib.sha256()
+                for chunk in iter_file(path):
+                    digest.update(chunk)
+                    copy.write(chunk)
+                copy.seek(0)
+                hashes[bundle_path] = digest.hexdigest()
+        except BaseException:
+            for _, copy in copies.values():
+                copy.close()
+            raise
+        for plugin in manifest['plugins'].values():
+            plugin['files'] = {bundle_path: hashes[bundle_path] for bundle_path in plugin['files']}
+        return copies
+
+    def export_zip(self, names: Iterable[str], include_data: bool = True) -> Iterator[bytes]:
+        """Stream a zip bundle, a chunk at a time"""
+        manifest, files = self.manifest(names, include_data)
+        copies = self._snapshot(manifest, files)
+        try:
+            writer = ChunkWriter()
+            with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+                for bundle_path, (mtime, copy) in copies.items():
+                    info = zipfile.ZipInfo(bundle_path, time.localtime(mtime)[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    with archive.open(info, 'w') as dst:
+                        for chunk in iter(lambda: copy.read(65536), b''):
+                            dst.write(chunk)
+                            yield writer.drain()
+            yield writer.drain()
+        finally:
+            for _, copy in copies.values():
+                copy.close()
+
+    def export_tar(self, names: Iterable[str], include_data: bool = True) -> Iterator[bytes]:
+        """Stream a gzipped tar bundle, a chunk at a time"""
+        manifest, files = self.manifest(names, include_data)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+        def member(bundle_path: str, size: int, mtime: float, chunks: Iterable[bytes]) -> Iterator[bytes]:
+            info = tarfile.TarInfo(bundle_path)
+            info.size, info.mtime, info.mode = size, int(mtime), 0o644
+            yield compressor.compress(info.tobuf(format=tarfile.PAX_FORMAT))
+            for chunk in chunks:
+                yield compressor.compress(chunk)
+            yield compressor.compress(b'\0' * (-size % tarfile.BLOCKSIZE))
+
+        copies = self._snapshot(manifest, files)
+        try:
+            manifest_bytes = json.dumps(manifest, indent=2).encode()
+            yield from member(MANIFEST_NAME, len(manifest_bytes), time.time(), [manifest_bytes])
+            for bundle_path, (mtime, copy) in copies.items():
+                size = copy.seek(0, os.SEEK_END)
+                copy.seek(0)
+                yield from member(bundle_path, size, mtime, iter(lambda: copy.read(65536), b''))
+            yield compressor.compress(b'\0' * tarfile.BLOCKSIZE * 2)
+            yield compressor.flush()
+        finally:
+            for _, copy in copies.values():
+                copy.close()
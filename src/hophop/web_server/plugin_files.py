@@ -0,0 +1,274 @@
+import codecs
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+JSON_WHITESPACE = ' \t\r\n'
+# Skips to the next bracket outside a string; a lone quote means a string runs past the buffer
+BRACKET_PATTERN = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}"])')
+
+def iter_file(path: str, chunk_size: int = 65536) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """(mtime_ns, size) of a file, which changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def page_etag(signature: Tuple[int, int], offset: int, limit: int, keys: Tuple[str, ...]) -> str:
+    """ETag for one page of one version of a file, the same in every worker"""
+    mtime_ns, size = signature
+    return f'{mtime_ns:x}-{size:x}-{offset}-{limit}-{zlib.crc32(chr(0).join(keys).encode()):x}'
+
+class JsonEntryReader:
+    """Reads the entries of a JSON object or array from a file one at a time.
+
+    Only the current entry and a read-ahead chunk are held in memory. `offset()` is the byte
+    position in the file, so a later reader can seek straight back to it.
+    """
+
+    def __init__(self, f, chunk_size: int = 65536):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.mark_pos = 0  # Position in buf whose byte offset in the file is mark_bytes
+        self.mark_bytes = f.tell()
+        self.pin: Optional[int] = None  # Start of a value being captured as text, kept when reading more
+
+    def offset(self) -> int:
+        self.mark_bytes += len(self.buf[self.mark_pos:self.pos].encode('utf-8'))
+        self.mark_pos = self.pos
+        return self.mark_bytes
+
+    def _read_more(self, size: Optional[int] = None) -> bool:
+        if self.eof:
+            return False
+        # Drop what's been consumed, keeping the byte offset in step
+        keep = self.pos if self.pin is None else self.pin
+        if keep >= self.mark_pos:
+            self.mark_bytes += len(self.buf[self.mark_pos:keep].encode('utf-8'))
+        else:
+            self.mark_bytes -= len(self.buf[keep:self.mark_pos].encode('utf-8'))
+        self.buf = self.buf[keep:]
+        self.pos -= keep
+        self.mark_pos = 0
+        if self.pin is not None:
+            self.pin = 0
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buf += self.text_decoder.decode(b'', final=True)
+            return False
+        self.buf += self.text_decoder.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, reading more of the file if needed"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read_more():
+                raise ValueError('Unexpected end of file')
+
+    def _expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at byte {self.offset()}")
+        self.pos += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number running to the end of the buffer may carry on in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"Invalid JSON: {e.msg}")
+            # Grow reads with the value so a huge entry isn't re-parsed once per chunk
+            self._read_more(max(self.chunk_size, len(self.buf) - self.pos))
+
+    def skip_value(self, capture: int = 0) -> Optional[str]:
+        """Move past the next value, scanning containers for their closing bracket instead of building them.
+
+        With `capture`, a container of up to that many characters is returned as text.
+        """
+        if self.peek() not in '{[':
+            self.read_value()
+            return None
+        if capture:
+            self.pin = self.pos
+        try:
+            self._skip_container(capture)
+            return self.buf[self.pin:self.pos] if self.pin is not None else None
+        finally:
+            self.pin = None
+
+    def _skip_container(self, capture: int):
+        depth = 0
+        while True:
+            if self.pin is not None and self.pos - self.pin > capture:
+                self.pin = None  # Too big to keep
+            match = BRACKET_PATTERN.match(self.buf, self.pos)
+            if match is None or match.group(1) == '"':
+                # Nothing but complete strings and scalars left, or a string carries on in the next chunk
+                self.pos = match.start(1) if match else len(self.buf)
+                if not self._read_more(max(self.chunk_size, len(self.buf) - self.pos)):
+                    raise ValueError('Unexpected end of file')
+                continue
+            self.pos = match.end()
+            depth += 1 if match.group(1) in '{[' else -1
+            if depth == 0:
+                return
+
+    def open_container(self) -> str:
+        char = self.peek()
+        if char not in '{[':
+            raise ValueError('Not a JSON object or array')
+        self.pos += 1
+        return 'object' if char == '{' else 'array'
+
+    def entries(self, kind: str, first: bool = True) -> Iterator[Optional[str]]:
+        """Yield each entry's key (None in arrays) with the reader at its value, which the caller must read or skip.
+
+        `first` is False when resuming from an offset after an entry, where a comma comes next.
+        """
+        closing = '}' if kind == 'object' else ']'
+        while True:
+            if self.peek() == closing:
+                self.pos += 1
+                return
+            if not first:
+                self._expect(',')
+            first = False
+            key = None
+            if kind == 'object':
+                key = self.read_value()
+                if not isinstance(key, str):
+                    raise ValueError('Object keys must be strings')
+                self._expect(':')
+            yield key
+
+class JsonEntryIndex:
+    """Byte offsets of every Nth entry of one container in one version of a file"""
+
+    def __init__(self, signature: Tuple[int, int], kind: str):
+        self.signature = signature
+        self.kind = kind
+        self.checkpoints: Dict[int, int] = {}  # entry number -> byte offset just after the entry before it
+        self.total: Optional[int] = None  # Known once a page has reached the end
+
+class JsonPager:
+    """Pages through the entries of large JSON files, remembering where pages start so later ones seek instead of parse"""
+
+    def __init__(self, every: int = 100, max_indexes: int = 32, max_value_chars: int = 1024 * 1024):
+        self.every = every  # Entries between checkpoints
+        self.max_value_chars = max_value_chars  # Bigger objects and arrays are listed, not sent, and can be paged into
+        self.max_indexes = max_indexes
+        self.indexes: 'OrderedDict[tuple, JsonEntryIndex]' = OrderedDict()  # (path, keys) -> index
+        self.lock = threading.Lock()
+
+    def _cached_index(self, path: str, keys: Tuple[str, ...], signature: Tuple[int, int]) -> Optional[JsonEntryIndex]:
+        with self.lock:
+            index = self.indexes.get((path, keys))
+            if index is None or index.signature != signature:
+                return None
+            self.indexes.move_to_end((path, keys))
+            return index
+
+    def _store_index(self, path: str, keys: Tuple[str, ...], index: JsonEntryIndex):
+        with self.lock:
+            self.indexes[(path, keys)] = index
+            self.indexes.move_to_end((path, keys))
+            while len(self.indexes) > self.max_indexes:
+                self.indexes.popitem(last=False)
+
+    def _descend(self, reader: JsonEntryReader, keys: Tuple[str, ...]) -> str:
+        """Walk down from the top of the file to the container at `keys` and open it"""
+        kind = reader.open_container()
+        for key in keys:
+            for number, entry_key in enumerate(reader.entries(kind)):
+                if (entry_key if kind == 'object' else str(number)) == key:
+                    break
+                reader.skip_value()
+            else:
+                raise KeyError(key)
+            kind = reader.open_container()
+        return kind
+
+    def _entry_value(self, reader: JsonEntryReader) -> dict:
+        char = reader.peek()
+        if char not in '{[':
+            return {'value': reader.read_value()}
+        start = reader.offset()
+        text = reader.skip_value(capture=self.max_value_chars)
+        if text is not None:
+            return {'value': json.loads(text)}
+        return {'value': None, 'truncated': True, 'type': 'object' if char == '{' else 'array',
+                'bytes': reader.offset() - start}
+
+    def page(self, path: str, offset: int = 0, limit: int = 100, keys: Tuple[str, ...] = ()) -> dict:
+        """Entries [offset, offset + limit) of the object or array at `keys` (the top level by default)"""
+        keys = tuple(keys)
+        signature = file_signature(path)
+        index = self._cached_index(path, keys, signature)
+
+        with open(path, 'rb') as f:
+            start = max((number for number in (index.checkpoints if index else ()) if number <= offset), default=0)
+            if start:
+                f.seek(index.checkpoints[start])
+                reader = JsonEntryReader(f)
+            else:
+                if f.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+                    f.seek(0)
+                reader = JsonEntryReader(f)
+                kind = self._descend(reader, keys)
+                if index is None:
+                    index = JsonEntryIndex(signature, kind)
+                    self._store_index(path, keys, index)
+
+            entries: List[dict] = []
+            number = start
+            more = False
+            for key in reader.entries(index.kind, first=start == 0):
+                if number >= offset + limit:
+                    more = True
+                    break
+                if number >= offset:
+                    entry = {'key': key} if index.kind == 'object' else {'index': number}
+                    entry.update(self._entry_value(reader))
+                    entries.append(entry)
+                else:
+                    reader.skip_value()
+                number += 1
+                if number % self.every == 0 and number not in index.checkpoints:
+                    index.checkpoints[number] = reader.offset()
+            if not more:
+                index.total = number
+
+        return {
+            'type': index.kind,
+            'keys': list(keys),
+            'offset': offset,
+            'entries': entries,
+            'next_offset': offset + len(entries) if more else None,
+            'total': index.total,
+            'size': signature[1]
+        }
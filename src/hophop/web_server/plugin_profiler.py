@@ -0,0 +1,122 @@
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Carbon console messages about plugin compiles, loads and unloads
+CARBON_PATTERNS = [
+    ('failed', re.compile(r"[Ff]ailed (?:compiling|to compile|to load)\s+'?(?P<name>[\w-]+)")),
+    ('compiled', re.compile(r"[Cc]ompiled\s+'?(?P<name>[\w-]+?)(?:\.cs)?'?(?:\s+in)?\s+\[?(?P<ms>\d+(?:\.\d+)?)\s*ms")),
+    ('unloaded', re.compile(r'[Uu]nloaded plugin (?P<name>[\w.-]+)')),
+    ('loaded', re.compile(r'(?:Re)?[Ll]oaded plugin (?P<name>[\w.-]+).*?(?:\[(?P<ms>\d+(?:\.\d+)?)\s*ms\])?\s*$')),
+]
+
+# Any "<number>ms" value, used to pick hook times out of profiling command output
+MS_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*ms')
+
+SORT_FIELDS = ['name', 'last_compile_ms', 'last_load_ms', 'compile_count', 'load_count',
+               'unload_count', 'error_count', 'hook_time_ms', 'last_event_at']
+
+def parse_carbon_line(line: str) -> Optional[dict]:
+    """Turn a Carbon console line into a plugin event, or None if it isn't one"""
+    for event, pattern in CARBON_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            ms = match.groupdict().get('ms')
+            return {
+                'event': event,
+                'name': match.group('name'),
+                'ms': float(ms) if ms else None,
+                'line': line.strip()
+            }
+    return None
+
+class PluginProfiler:
+    """Aggregates Carbon compile/load/unload events per plugin"""
+
+    def __init__(self, profile_commands: Optional[List[str]] = None, profile_interval: int = 60):
+        self.plugins: Dict[str, dict] = {}
+        self.profile_commands = profile_commands or []  # Optional RCON commands to sample periodically
+        self.profile_interval = profile_interval
+        self.profile_output = {}  # command -> {'timestamp', 'output'} of the last run
+        self.lock = threading.Lock()
+
+    def _entry(self, name: str) -> dict:
+        entry = self.plugins.get(name)
+        if entry is None:
+            entry = self.plugins[name] = {
+                'name': name,
+                'last_compile_ms': None,
+                'last_load_ms': None,
+                'compile_count': 0,
+                'load_count': 0,
+                'unload_count': 0,
+                'error_count': 0,
+                'last_error': None,
+                'hook_time_ms': None,
+                'last_event_at': None
+            }
+        return entry
+
+    def handle_console_line(self, line: str) -> Optional[dict]:
+        """Record a console line if it is a Carbon plugin event"""
+        event = parse_carbon_line(line)
+        if not event:
+            return None
+
+        with self.lock:
+            entry = self._entry(event['name'])
+            entry['last_event_at'] = time.time()
+            if event['event'] == 'compiled':
+                entry['compile_count'] += 1
+                entry['last_compile_ms'] = event['ms']
+            elif event['event'] == 'loaded':
+                entry['load_count'] += 1
+                if event['ms'] is not None:
+                    entry['last_load_ms'] = event['ms']
+            elif event['event'] == 'unloaded':
+                entry['unload_count'] += 1
+            elif event['event'] == 'failed':
+                entry['error_count'] += 1
+                entry['last_error'] = event['line']
+        return event
+
+    def handle_profile_output(self, command: str, output: str):
+        """Store the output of a profiling command and pick hook times out of it"""
+        self.profile_output[command] = {'timestamp': time.time(), 'output': output}
+        if not output:
+            return
+
+        with self.lock:
+            for line in output.splitlines():
+                for name, entry in self.plugins.items():
+                    if re.search(rf'\b{re.escape(name)}\b', line):
+                        match = MS_PATTERN.search(line)
+                        if match:
+                            entry['hook_time_ms'] = float(match.group(1))
+                        break
+
+    def run_profile_commands(self, rcon_client):
+        """Send each configured profiling command over RCON"""
+        for command in self.profile_commands:
+            rcon_client.send_command(
+                command,
+                lambda response, command=command: self.handle_profile_output(command, response)
+            )
+
+    def table(self, sort: str = 'last_compile_ms', descending: bool = True) -> List[dict]:
+        """Return the per plugin table sorted by one of SORT_FIELDS (missing values last)"""
+        if sort not in SORT_FIELDS:
+            sort = 'last_compile_ms'
+        with self.lock:
+            rows = [dict(entry) for entry in self.plugins.values()]
+        present = [row for row in rows if row[sort] is not None]
+        missing = [row for row in rows if row[sort] is None]
+        present.sort(key=lambda row: row[sort], reverse=descending)
+        return present + sorted(missing, key=lambda row: row['name'])
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self.lock:
+            self.plugins.clear()
+        self.profile_output.clear()
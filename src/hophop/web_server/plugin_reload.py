@@ -0,0 +1,213 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from .plugin_profiler import parse_carbon_line
+
+def file_hash(path: str) -> Optional[str]:
+    """Return the sha256 of a file, or None if it doesn't exist"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def atomic_copy(source_path: str, target_path: str):
+    """Copy a file by writing a temp file next to the target and renaming it into place"""
+    # The temp name must not end in .cs or Carbon will try to compile it
+    tmp_path = os.path.join(os.path.dirname(target_path), f".{os.path.basename(target_path)}.tmp")
+    with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for chunk in iter(lambda: src.read(65536), b''):
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    stat = os.stat(source_path)
+    os.utime(tmp_path, (stat.st_atime, stat.st_mtime))
+    os.replace(tmp_path, target_path)
+
+class PluginReloader:
+    """Debounces file events per plugin and deploys the plugins whose saves have settled in batches"""
+
+    def __init__(self, source_dir: str, target_dir: str,
+                 debounce: float = 0.5, max_wait: float = 5.0, confirm_timeout: float = 60.0):
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.debounce = debounce  # Quiet period a plugin needs before it is deployed
+        self.max_wait = max_wait  # A plugin that keeps changing is deployed this long after its first event
+        self.confirm_timeout = confirm_timeout  # How long to wait for Carbon to report a load
+        self.pending = {}  # plugin name -> time of its first event since it was last deployed
+        self.timers: Dict[str, threading.Timer] = {}  # plugin name -> its debounce timer
+        self.due: Dict[str, float] = {}  # plugin name -> time its debounce window ends
+        self.awaiting = {}  # plugin name -> reload record waiting for console confirmation
+        self.deployed_hashes = {}  # plugin name -> hash of the last file we deployed
+        self.timings = {}  # plugin name -> last completed reload record
+        self.lock = threading.Lock()
+        self.on_deployed: Optional[Callable[[List[str]], None]] = None
+        self.on_reloaded: Optional[Callable[[dict], None]] = None
+
+    def schedule(self, plugin_name: str):
+        """Queue a plugin for deployment, restarting its own debounce window"""
+        with self.lock:
+            now = time.time()
+            first_event = self.pending.setdefault(plugin_name, now)
+            timer = self.timers.get(plugin_name)
+            if timer:
+                timer.cancel()
+            self.due[plugin_name] = min(now + self.debounce, first_event + self.max_wait)
+            timer = threading.Timer(max(self.due[plugin_name] - now, 0), self.flush, args=(plugin_name,))
+            timer.daemon = True
+            self.timers[plugin_name] = timer
+            timer.start()
+
+    def flush(self, plugin_name: Optional[str] = None):
+        """Deploy every plugin whose debounce window has (nearly) ended as one batch, or all pending ones.
+
+        Plugins due within half a debounce period go along, so files written together, e.g. by a git
+        checkout, are deployed together.
+        """
+        with self.lock:
+            if plugin_name is not None and plugin_name not in self.pending:
+                return
+            cutoff = time.time() + self.debounce / 2
+            names = [name for name in self.pending
+                     if plugin_name is None or name == plugin_name or self.due[name] <= cutoff]
+            pending = {name: self.pending.pop(name) for name in names}
+            timers = [self.timers.pop(name) for name in names if name in self.timers]
+            for name in names:
+                self.due.pop(name, None)
+        for timer in timers:
+            timer.cancel()
+        if pending:
+            self.deploy(pending.keys(), pending)
+
+    def deploy(self, plugin_names: Iterable[str], saved_at: Optional[Dict[str, float]] = None) -> List[str]:
+        """Copy changed plugins into the active plugins directory, skipping unchanged content"""
+        saved_at = saved_at or {}
+        deployed = []
+        for name in plugin_names:
+            source_path = os.path.join(self.source_dir, f'{name}.cs')
+            target_path = os.path.join(self.target_dir, f'{name}.cs')
+            try:
+                source_hash = file_hash(source_path)
+                if source_hash is None:
+                    continue
+
+                if not os.path.exists(target_path):
+                    self.deployed_hashes.pop(name, None)  # Deactivated since it was last deployed
+                last_hash = self.deployed_hashes.get(name) or file_hash(target_path)
+                if source_hash == last_hash:
+                    print(f"Plugin {name} unchanged, skipping reload")
+                    self.deployed_hashes[name] = source_hash
+                    continue
+
+                atomic_copy(source_path, target_path)
+                self.deployed_hashes[name] = source_hash
+                now = time.time()
+                with self.lock:
+                    self.awaiting[name] = {
+                        'name': name,
+                        'hash': source_hash,
+                        'saved_at': saved_at.get(name, now),
+                        'deployed_at': now
+                    }
+                deployed.append(name)
+            except Exception as e:
+                print(f"Error deploying plugin {name}: {e}")
+
+        if deployed:
+            print(f"Deployed {len(deployed)} plugin(s): {', '.join(deployed)}")
+            expiry = threading.Timer(self.confirm_timeout + 1, self.expire)
+            expiry.daemon = True
+            expiry.start()
+            if self.on_deployed:
+                self.on_deployed(deployed)
+        return deployed
+
+    def handle_console_line(self, line: str):
+        """Match a console line against plugins waiting for a load confirmation"""
+        if not self.awaiting:
+            return
+
+        event = parse_carbon_line(line)
+        if not event or event['event'] not in ('loaded', 'failed'):
+            return
+
+        with self.lock:
+            record = self.awaiting.pop(event['name'], None)
+        if record:
+            self._complete(record, event['event'])
+
+    def expire(self):
+        """Give up on plugins that were never confirmed by the console"""
+        now = time.time()
+        with self.lock:
+            expired = [name for name, record in self.awaiting.items()
+                       if now - record['deployed_at'] > self.confirm_timeout]
+            records = [self.awaiting.pop(name) for name in expired]
+        for record in records:
+            self._complete(record, 'timeout')
+
+    def _complete(self, record: dict, status: str):
+        """Record the outcome and timing of a reload"""
+        now = time.time()
+        record['status'] = status
+        record['loaded_at'] = now
+        record['deploy_to_loaded_ms'] = round((now - record['deployed_at']) * 1000)
+        record['save_to_loaded_ms'] = round((now - record['saved_at']) * 1000)
+        self.timings[record['name']] = record
+        print(f"Plugin {record['name']} {status} {record['save_to_loaded_ms']}ms after save")
+        if self.on_reloaded:
+            self.on_reloaded(record)
+
+class PluginWatcher:
+    """Watches the plugin source directory and schedules auto refreshed plugins for deployment"""
+
+    def __init__(self, reloader: PluginReloader, should_reload: Callable[[str], bool]):
+        self.reloader = reloader
+        self.should_reload = should_reload  # Called with a plugin name for every change
+        self.observer = None
+
+    def start(self):
+        # watchdog is imported here so importing the web server stays cheap
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        watcher = self
+
+        class PluginFileHandler(FileSystemEventHandler):
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher.handle_change(event.src_path)
+
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher.handle_change(event.src_path)
+
+            def on_moved(self, event):
+                # Editors and git often save by writing a temp file and renaming it over the original
+                if not event.is_directory:
+                    watcher.handle_change(event.dest_path)
+
+        self.observer = Observer()
+        self.observer.schedule(PluginFileHandler(), path=self.reloader.source_dir, recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer = None
+
+    def is_alive(self) -> bool:
+        return self.observer is not None and self.observer.is_alive()
+
+    def handle_change(self, path: str):
+        if not path.endswith('.cs'):
+            return
+        plugin_name = os.path.basename(path)[:-3]  # Remove .cs extension
+        if self.should_reload(plugin_name):
+            self.reloader.schedule(plugin_name)
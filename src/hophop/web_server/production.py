@@ -0,0 +1,169 @@
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+class OwnerElection:
+    """Elects one worker process as owner of the background services with an exclusive file lock"""
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = Path(lock_path)
+        self.fd: Optional[int] = None
+
+    @property
+    def is_owner(self) -> bool:
+        return self.fd is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if no other process holds it. The OS releases it if the owner dies."""
+        if self.fd is not None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+class SharedState:
+    """Small JSON documents shared between worker processes through a directory"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.cache = {}  # name -> ((mtime_ns, size), data)
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f'{name}.json'
+
+    def publish(self, name: str, data):
+        """Replace a document atomically so readers never see a partial write"""
+        path = self._path(name)
+        tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def signature(self, name: str):
+        try:
+            stat = self._path(name).stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read(self, name: str):
+        """Return a document, parsing it again only if the file changed"""
+        signature = self.signature(name)
+        if signature is None:
+            return None
+        cached = self.cache.get(name)
+        if cached and cached[0] == signature:
+            return cached[1]
+        try:
+            with open(self._path(name), 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cached[1] if cached else None
+        self.cache[name] = (signature, data)
+        return data
+
+class SharedStateRelay:
+    """Re-emits snapshots published by the owner to the clients of this worker"""
+
+    def __init__(self, shared_state: SharedState, names, emit: Callable[[str, dict], None],
+                 interval: float = 0.5):
+        self.shared_state = shared_state
+        self.names = list(names)  # Documents holding {'event': ..., 'data': ...}
+        self.emit = emit
+        self.interval = interval
+        self.signatures: Dict[str, tuple] = {}
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def _loop(self):
+        while self.running:
+            for name in self.names:
+                signature = self.shared_state.signature(name)
+                if signature is None or signature == self.signatures.get(name):
+                    continue
+                self.signatures[name] = signature
+                snapshot = self.shared_state.read(name)
+                if snapshot:
+                    self.emit(snapshot['event'], snapshot['data'])
+            time.sleep(self.interval)
+
+class OwnerProxy:
+    """Forwards requests from other workers to the owner's loopback-only HTTP server"""
+
+    TOKEN_HEADER = 'X-HopHop-Internal'
+
+    def __init__(self, shared_state: SharedState, token: str, timeout: float = 330.0):
+        self.shared_state = shared_state
+        self.token = token
+        self.timeout = timeout
+
+    def owner_url(self) -> Optional[str]:
+        owner = self.shared_state.read('owner')
+        if not owner:
+            return None
+        return f"http://127.0.0.1:{owner['port']}"
+
+    def open(self, path: str, method: str = 'GET', body: Optional[bytes] = None,
+             content_type: Optional[str] = None, accept_encoding: Optional[str] = None):
+        """Send a request to the owner and return the raw urllib response"""
+        base = self.owner_url()
+        if not base:
+            raise ConnectionError('No owner process is running')
+        headers = {self.TOKEN_HEADER: self.token}
+        if content_type:
+            headers['Content-Type'] = content_type
+        if accept_encoding:
+            # Let the owner compress, the body is relayed to the client as it is
+            headers['Accept-Encoding'] = accept_encoding
+        request = urllib.request.Request(base + path, data=body, method=method, headers=headers)
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            return e  # Error responses are passed through unchanged
+
+    def call(self, path: str, payload: dict) -> dict:
+        response = self.open(path, 'POST', json.dumps(payload).encode(), 'application/json')
+        with response:
+            return json.loads(response.read() or b'{}')
+
+def run_gunicorn(app_path: str, bind: str, workers: int, timeout: int):
+    """Replace this process with gunicorn serving `app_path` on gevent workers"""
+    argv = [
+        sys.executable, '-m', 'gunicorn',
+        # Loaded by path so the gunicorn master doesn't import (and monkey patch) the app
+        '--config', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn_conf.py'),
+        '--bind', bind,
+        '--workers', str(workers),
+        '--timeout', str(timeout),
+        app_path
+    ]
+    os.execv(sys.executable, argv)
@@ -0,0 +1,241 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional
+import gevent
+from gevent import monkey
+from flask import request, Response
+
+# Real OS threads and sleeps, which keep running while the gevent hub is blocked
+start_native_thread = monkey.get_original('_thread', 'start_new_thread')
+native_sleep = monkey.get_original('time', 'sleep')
+native_get_ident = monkey.get_original('_thread', 'get_ident')
+
+def frame_label(filename: str, name: str, line: int) -> str:
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ',')
+
+def frame_stack(frame, limit: int = 128) -> List[str]:
+    """Labels of a frame and its callers, outermost first"""
+    stack = []
+    while frame is not None and len(stack) < limit:
+        code = frame.f_code
+        stack.append(frame_label(code.co_filename, code.co_name, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def collapsed(counts: Dict[str, int]) -> str:
+    """Folded stacks, one `a;b;c count` line each, as read by flamegraph.pl, speedscope and inferno"""
+    return ''.join(f"{stack} {count}\n" for stack, count in sorted(counts.items()) if count > 0)
+
+class HubBlockMonitor:
+    """Notices when the gevent hub stops switching for longer than a threshold and records where it was stuck.
+
+    A greenlet bumps a heartbeat; a native thread checks it and, once it's stale, captures the stack
+    of the hub's thread (whatever greenlet is running without yielding) and times the stall.
+    """
+
+    def __init__(self, threshold: float = 0.1, history_size: int = 100):
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.recent = deque(maxlen=history_size)  # Most recent stalls, with their stacks
+        self.sites: Dict[tuple, dict] = {}  # stack -> {'count', 'total_ms', 'max_ms'}
+        self.max_sites = 200
+        self.blocks = 0
+        self.blocked_ms = 0.0
+        self.beat = time.perf_counter()
+        self.hub_ident: Optional[int] = None
+        self.running = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.hub_ident = native_get_ident()
+        self.beat = time.perf_counter()
+        gevent.spawn(self._heartbeat)
+        start_native_thread(self._watch, ())
+
+    def stop(self):
+        self.running = False
+
+    def _heartbeat(self):
+        while self.running:
+            self.beat = time.perf_counter()
+            gevent.sleep(self.interval)
+
+    def _watch(self):
+        stalled_since = None
+        stack = None
+        while self.running:
+            native_sleep(self.interval)
+            beat = self.beat
+            stale = time.perf_counter() - beat
+            if stalled_since is not None and beat != stalled_since:
+                # The hub got going again; the stall lasted from the last beat before it to this one
+                self._record(stack, (beat - stalled_since - self.interval) * 1000)
+                stalled_since, stack = None, None
+            if stalled_since is None and stale > self.threshold + self.interval:
+                frame = sys._current_frames().get(self.hub_ident)
+                stalled_since, stack = beat, frame_stack(frame) if frame else []
+
+    def _record(self, stack: List[str], duration_ms: float):
+        duration_ms = round(max(duration_ms, self.threshold * 1000), 1)
+        key = tuple(stack)
+        with self.lock:
+            self.blocks += 1
+            self.blocked_ms += duration_ms
+            self.recent.append({'at': time.time(), 'duration_ms': duration_ms, 'stack': stack})
+            site = self.sites.get(key)
+            if site is None:
+                if len(self.sites) >= self.max_sites:
+                    return
+                site = self.sites[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            site['count'] += 1
+            site['total_ms'] += duration_ms
+            site['max_ms'] = max(site['max_ms'], duration_ms)
+        print(f"Event loop blocked for {duration_ms:.0f}ms in {stack[-1] if stack else 'unknown'}")
+
+    def stats(self, top: int = 20) -> dict:
+        with self.lock:
+            sites = sorted(self.sites.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]
+            recent = list(self.recent)
+            blocks, blocked_ms = self.blocks, self.blocked_ms
+        return {
+            'running': self.running,
+            'threshold_ms': self.threshold * 1000,
+            'blocks': blocks,
+            'blocked_ms': round(blocked_ms, 1),
+            'sites': [dict(site, total_ms=round(site['total_ms'], 1), stack=list(stack)) for stack, site in sites],
+            'recent': recent[::-1]
+        }
+
+    def collapsed(self) -> str:
+        """Stall time (ms) by stack, for a flame graph of what blocked the hub"""
+        with self.lock:
+            return collapsed({';'.join(stack) or 'unknown': round(site['total_ms'])
+                              for stack, site in self.sites.items()})
+
+class SamplingProfiler:
+    """Time-boxed statistical CPU profile: a native thread samples the hub thread's stack every few ms"""
+
+    def __init__(self, max_seconds: float = 60.0):
+        self.max_seconds = max_seconds
+        self.lock = threading.Lock()  # One profile at a time
+
+    def profile(self, seconds: float, interval: float = 0.005, all_threads: bool = False) -> dict:
+        """Sample for `seconds`, returning folded stacks with sample counts; raises RuntimeError if one is running"""
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError('A profile is already running')
+        try:
+            seconds = min(max(seconds, 0.1), self.max_seconds)
+            hub_ident = native_get_ident()
+            result = {'counts': Counter(), 'samples': 0, 'done': False}
+
+            def sample():
+                deadline = time.perf_counter() + seconds
+                try:
+                    while time.perf_counter() < deadline:
+                        for ident, frame in sys._current_frames().items():
+                            if ident == hub_ident or (all_threads and ident != native_get_ident()):
+                                prefix = 'hub' if ident == hub_ident else f'thread-{ident}'
+                                result['counts'][';'.join([prefix] + frame_stack(frame))] += 1
+                        result['samples'] += 1
+                        native_sleep(interval)
+                finally:
+                    result['done'] = True
+
+            started = time.perf_counter()
+            start_native_thread(sample, ())
+            while not result['done']:
+                gevent.sleep(0.05)  # Lets the hub run, which is what's being sampled
+            return {
+                'seconds': round(time.perf_counter() - started, 2),
+                'interval_ms': interval * 1000,
+                'samples': result['samples'],
+                'counts': dict(result['counts'])
+            }
+        finally:
+            self.lock.release()
+
+def cprofile_collapsed(stats: pstats.Stats) -> Dict[str, int]:
+    """Approximate folded stacks (microseconds of own time) from cProfile's caller graph.
+
+    cProfile only records caller -> callee edges, so a function's time is split between the
+    paths leading to it in proportion to the time each edge accounts for.
+    """
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+    labels = {func: frame_label(func[0], func[2], func[1]) for func in stats.stats}  # (file, line, name)
+    counts = Counter()
+
+    def walk(func, path: List[str], share: float):
+        _, _, own, total, _ = stats.stats[func]
+        path = path + [labels[func]]
+        counts[';'.join(path)] += int(own * share * 1_000_000)
+        if len(path) >= 128:
+            return
+        for callee, edge_total in callees[func].items():
+            callee_total = stats.stats[callee][3]
+            if callee_total and labels[callee] not in path:
+                walk(callee, path, share * edge_total / callee_total)
+
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            walk(func, [], 1.0)
+    return {stack: count for stack, count in counts.items() if count > 0}
+
+class RequestProfiler:
+    """Profiles a single request with cProfile when it carries ?_profile=pstats or ?_profile=collapsed.
+
+    The profile replaces the response body. Under gevent it covers everything the hub ran while the
+    request was being handled, not just the request's own greenlet.
+    """
+
+    FORMATS = ('pstats', 'collapsed')
+
+    def __init__(self):
+        self.lock = threading.Lock()  # cProfile can only profile one request per thread at a time
+
+    def init_app(self, app):
+        app.before_request(self.start)
+        app.after_request(self.finish)
+
+    def start(self):
+        if request.args.get('_profile') not in self.FORMATS:
+            return None
+        if not self.lock.acquire(blocking=False):
+            return Response('Another request is being profiled\n', status=409, mimetype='text/plain')
+        profiler = cProfile.Profile()
+        request.environ['hophop.profiler'] = (profiler, time.perf_counter())
+        profiler.enable()
+        return None
+
+    def finish(self, response):
+        profiled = request.environ.pop('hophop.profiler', None)
+        if profiled is None:
+            return response
+        profiler, started = profiled
+        profiler.disable()
+        self.lock.release()
+
+        stats = pstats.Stats(profiler)
+        if request.args.get('_profile') == 'collapsed':
+            body = collapsed(cprofile_collapsed(stats))
+        else:
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(60)
+            body = out.getvalue()
+        profile = Response(body, mimetype='text/plain')
+        profile.headers['X-Profiled-Status'] = str(response.status_code)
+        profile.headers['X-Profiled-Ms'] = f'{(time.perf_counter() - started) * 1000:.1f}'
+        return profile
@@ -1,8 +1,50 @@
 import websocket
 import json
+import random
+import re
+import socket
 import threading
 import time
-from typing import Optional, Callable
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Callable, List
+from .memory import CappedDeque
+
+# Console lines after which the RCON port should be accepting connections
+RCON_READY_PATTERN = re.compile(r'RCon Started|Server startup complete', re.IGNORECASE)
+
+def probe_port(host: str, port: int, timeout: float = 1.0) -> str:
+    """'open' if the port accepts TCP connections, 'refused' if the host is up but nothing listens, else 'unreachable'"""
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+        return 'open'
+    except ConnectionRefusedError:
+        return 'refused'
+    except OSError:
+        return 'unreachable'
+
+class CommandTimeout(FutureTimeoutError):
+    """Raised by a command's future when it was given up before its response arrived"""
+
+class ExpiredResponse(str):
+    """Passed to a callback instead of a response when its command is given up.
+
+    It's empty, so callbacks that treat "" as no answer keep working, but it can be told apart
+    from a real empty response with `response is EXPIRED`.
+    """
+
+EXPIRED = ExpiredResponse()
+
+def resolve_future(future: Future, command: str):
+    """Callback that resolves `future` with the response, or fails it with CommandTimeout on EXPIRED"""
+    def resolve(response):
+        if future.done():
+            return
+        if response is EXPIRED:
+            future.set_exception(CommandTimeout(f"No response to '{command}' in time"))
+        else:
+            future.set_result(response)
+    return resolve
 
 class RustRCON:
     def __init__(self, host: str, port: int, password: str):
@@ -12,77 +54,212 @@ class RustRCON:
         self.ws: Optional[websocket.WebSocketApp] = None
         self.connected = False
         self.message_id = 0
-        self.callbacks = {}
-        self.reconnect_delay = 30  # Initial delay of 30 seconds
-        self.max_reconnect_delay = 300  # Maximum delay of 5 minutes
+        self.callbacks = OrderedDict()  # message id -> (callback, give up at), oldest first
+        self.max_callbacks = 1000  # Unanswered commands kept before the oldest are given up
+        # Default seconds an unanswered command waits before it's given up, for callers that don't pass
+        # a timeout; as long as the longest endpoint deadline (/api/rcon/stream)
+        self.callback_timeout = 300.0
+        self.callbacks_evicted = 0
+        self.expired_ids = CappedDeque(maxlen=100)  # Given up commands, whose late responses are dropped
+        # Retry delays by what a TCP probe of the RCON port says
+        self.open_delay = 0.5  # Port open, the websocket should come up any moment
+        # ...unless it keeps failing on an open port (wrong password, handshake rejected): then back off,
+        # doubling up to max_rejected_delay, so we don't hammer the server and flood its log
+        self.open_attempts_before_backoff = 3
+        self.rejected_delay = 5.0
+        self.max_rejected_delay = 300.0
+        self.failed_open_attempts = 0  # Consecutive failed attempts while the port was open
+        self.boot_delay = 1.0  # Refused while the server boots, grows to max_boot_delay
+        self.max_boot_delay = 5.0
+        self.stopped_delay = 30.0  # Refused and the process isn't running; woken early when it starts
+        self.reconnect_delay = 5.0  # Host unreachable, doubles up to max_reconnect_delay
+        self.max_reconnect_delay = 300.0
+        self.probe_timeout = 1.0
         self.should_reconnect = True
-        self.last_attempt = 0
+        self.connecting = False
+        self.wakeup = threading.Event()
         websocket.enableTrace(False)  # Disable verbose logging
         self.on_state_change = None  # Callback for connection state changes
-        
+        self.message_listeners = []  # Called with unsolicited (broadcast) messages
+        # Returns True/False if the game server process is/isn't running, None if unknown
+        self.process_alive: Optional[Callable[[], Optional[bool]]] = None
+        self.phase = 'connecting'
+        self.attempts = 0
+        self.probes = 0
+        self.port_open_at: Optional[float] = None  # When a probe first found the port open during this outage
+        self.disconnected_at: Optional[float] = None
+        self.port_to_connect_ms = CappedDeque(maxlen=50)  # Port open -> connected, per reconnect
+        self.downtime_ms = CappedDeque(maxlen=50)  # Disconnected -> connected, per reconnect
+
     def connect(self):
-        """Connect to the Rust RCON WebSocket"""
-        while self.should_reconnect:
-            current_time = time.time()
-            # Ensure we wait at least reconnect_delay seconds between attempts
-            if current_time - self.last_attempt < self.reconnect_delay:
-                time.sleep(1)
-                continue
-                
-            self.last_attempt = current_time
-            try:
-                if self.ws:
-                    self.ws.close()
-                
-                self.ws = websocket.WebSocketApp(
-                    f"ws://{self.host}:{self.port}/{self.password}",
-                    on_open=self._on_open,
-                    on_message=self._on_message,
-                    on_error=self._on_error,
-                    on_close=self._on_close
-                )
-                
-                # Start WebSocket connection in a separate thread
-                self.ws_thread = threading.Thread(target=self.ws.run_forever)
-                self.ws_thread.daemon = True
-                self.ws_thread.start()
-                
-                # Wait for connection or error
-                timeout = time.time() + 10  # 10 second timeout
-                while not self.connected and time.time() < timeout:
-                    time.sleep(0.5)  # Increased sleep time
-                
-                if self.connected:
-                    self.reconnect_delay = 30  # Reset delay on successful connection
-                    break
-                
-            except Exception as e:
-                print(f"Failed to connect to RCON: {e}")
-            
-            # If we get here, connection failed
-            print(f"Will retry RCON connection in {self.reconnect_delay} seconds")
-            time.sleep(self.reconnect_delay)
-            # Increase delay for next attempt, up to max_reconnect_delay
+        """Connect to the Rust RCON WebSocket, probing the port to decide how soon to retry"""
+        if self.connecting:
+            return
+        self.connecting = True
+        try:
+            while self.should_reconnect and not self.connected:
+                state = probe_port(self.host, self.port, self.probe_timeout)
+                self.probes += 1
+                if state == 'open':
+                    if self.port_open_at is None:
+                        self.port_open_at = time.monotonic()
+                    if self._attempt():
+                        break
+                self._sleep(*self._next_delay(state))
+        finally:
+            self.connecting = False
+
+    def _attempt(self) -> bool:
+        """Open the websocket and wait for it to connect or fail"""
+        self.attempts += 1
+        try:
+            if self.ws:
+                self.ws.close()
+
+            self.ws = websocket.WebSocketApp(
+                f"ws://{self.host}:{self.port}/{self.password}",
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+
+            # Start WebSocket connection in a separate thread
+            self.ws_thread = threading.Thread(target=self.ws.run_forever)
+            self.ws_thread.daemon = True
+            self.ws_thread.start()
+
+            # Wait for connection, giving up early if the socket thread has already failed
+            timeout = time.time() + 10
+            while not self.connected and time.time() < timeout and self.ws_thread.is_alive():
+                time.sleep(0.1)
+        except Exception as e:
+            print(f"Failed to connect to RCON: {e}")
+        return self.connected
+
+    def _next_delay(self, state: str):
+        """(phase, seconds to wait) after a failed probe or attempt"""
+        alive = self.process_alive() if self.process_alive else None
+        if state != 'unreachable':
+            self.reconnect_delay = 5.0
+        if state != 'refused':
+            self.boot_delay = 1.0
+        if state == 'open':
+            self.failed_open_attempts += 1
+        else:
+            self.failed_open_attempts = 0
+            self.rejected_delay = 5.0
+
+        if state == 'open' and self.failed_open_attempts > self.open_attempts_before_backoff:
+            phase, delay = 'rejected', self.rejected_delay
+            self.rejected_delay = min(self.rejected_delay * 2, self.max_rejected_delay)
+        elif state == 'open':
+            phase, delay = 'port_open', self.open_delay
+        elif state == 'refused' and alive is False:
+            phase, delay = 'stopped', self.stopped_delay
+        elif state == 'refused':
+            phase, delay = 'booting', self.boot_delay
+            self.boot_delay = min(self.boot_delay * 1.5, self.max_boot_delay)
+        else:
+            phase, delay = 'unreachable', self.reconnect_delay
             self.reconnect_delay = min(self.reconnect_delay * 2, self.max_reconnect_delay)
-    
+
+        if phase != self.phase:
+            print(f"RCON {self.host}:{self.port} is {phase.replace('_', ' ')}, retrying every {delay:.0f}s or so")
+        self.phase = phase
+        return phase, delay * random.uniform(0.75, 1.25)  # Jitter so several clients don't retry in step
+
+    def _sleep(self, phase: str, delay: float):
+        """Wait before the next probe, cut short by wake() or by a stopped server process starting"""
+        deadline = time.monotonic() + delay
+        while self.should_reconnect:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.wakeup.wait(timeout=min(remaining, 1.0)):
+                self.wakeup.clear()
+                return
+            if phase == 'stopped' and self.process_alive and self.process_alive():
+                return
+
+    def wake(self):
+        """Probe again now instead of waiting out the current delay"""
+        self.boot_delay = 1.0
+        self.wakeup.set()
+
+    def handle_console_line(self, line: str):
+        """Watch the server's own console (e.g. the journal) for signs RCON is about to accept connections"""
+        if not self.connected and RCON_READY_PATTERN.search(line):
+            self.wake()
+
     def _on_open(self, ws):
         """Called when connection is established"""
+        now = time.monotonic()
+        if self.port_open_at is not None:
+            self.port_to_connect_ms.append(round((now - self.port_open_at) * 1000, 1))
+        if self.disconnected_at is not None:
+            self.downtime_ms.append(round((now - self.disconnected_at) * 1000, 1))
+        self.port_open_at = None
+        self.disconnected_at = None
+        self.boot_delay = 1.0
+        self.reconnect_delay = 5.0
+        self.rejected_delay = 5.0
+        self.failed_open_attempts = 0
+        self.phase = 'connected'
         self.connected = True
         if self.on_state_change:
             self.on_state_change()
+
+    def stats(self) -> dict:
+        port_to_connect = list(self.port_to_connect_ms)
+        return {
+            'phase': self.phase,
+            'connected': self.connected,
+            'attempts': self.attempts,
+            'probes': self.probes,
+            'failed_open_attempts': self.failed_open_attempts,
+            'port_open_for': round(time.monotonic() - self.port_open_at, 1) if self.port_open_at else None,
+            'disconnected_for': round(time.monotonic() - self.disconnected_at, 1) if self.disconnected_at else None,
+            'port_to_connect_ms': {
+                'last': port_to_connect[-1] if port_to_connect else None,
+                'avg': round(sum(port_to_connect) / len(port_to_connect), 1) if port_to_connect else None,
+                'max': max(port_to_connect, default=None),
+                'recent': port_to_connect
+            },
+            'downtime_ms': list(self.downtime_ms)
+        }
     
     def _on_message(self, ws, message):
         """Handle incoming messages"""
         try:
             data = json.loads(message)
             if 'Message' in data and 'Identifier' in data:
-                callback = self.callbacks.get(data['Identifier'])
-                if callback:
-                    callback(data['Message'])
-                    del self.callbacks[data['Identifier']]
+                pending = self.callbacks.pop(data['Identifier'], None)
+                if pending:
+                    pending[0](data['Message'])
+                elif data['Identifier'] in self.expired_ids:
+                    pass  # A late response to a command we gave up on, not a console line
+                else:
+                    self._notify_listeners(data)
         except json.JSONDecodeError:
             print(f"Invalid JSON received: {message}")
     
+    def add_message_listener(self, listener: Callable[[dict], None]):
+        """Register a listener for console lines broadcast by the server"""
+        self.message_listeners.append(listener)
+
+    def remove_message_listener(self, listener: Callable[[dict], None]):
+        if listener in self.message_listeners:
+            self.message_listeners.remove(listener)
+
+    def _notify_listeners(self, data: dict):
+        """Pass a broadcast message to every registered listener"""
+        for listener in list(self.message_listeners):
+            try:
+                listener(data)
+            except Exception as e:
+                print(f"Error in RCON message listener: {e}")
+
     def _on_error(self, ws, error):
         """Handle WebSocket errors"""
         error_str = str(error)
@@ -98,6 +275,9 @@ class RustRCON:
             print("Server appears to be offline")
             was_connected = self.connected
             self.connected = False
+            if was_connected:
+                self.disconnected_at = time.monotonic()
+                self._fail_callbacks()
             if was_connected and self.on_state_change:
                 self.on_state_change()
     
@@ -108,21 +288,20 @@ class RustRCON:
         
         # Only notify of state change if we were previously connected
         if was_connected:
+            self.disconnected_at = time.monotonic()
+            self._fail_callbacks()
             if self.on_state_change:
                 self.on_state_change()
         
-        # Only attempt reconnection if:
-        # 1. We should reconnect
-        # 2. We were previously connected (avoid reconnect loops)
-        # 3. The close wasn't initiated by us (close_status_code would be 1000)
-        if (self.should_reconnect and 
-            was_connected and 
-            close_status_code != 1000):
-            print(f"Will retry RCON connection in {self.reconnect_delay} seconds")
+        # Reconnect after losing a connection (possibly already marked lost by _on_error). Closes of
+        # failed attempts are left to the connect() loop that made them, and disconnect() stops this.
+        if self.should_reconnect and self.disconnected_at is not None and not self.connecting:
+            print("RCON connection lost, reconnecting")
             threading.Thread(target=self.connect, daemon=True).start()
     
-    def send_command(self, command: str, callback: Callable[[str], None] = None):
-        """Send a command to the server"""
+    def send_command(self, command: str, callback: Callable[[str], None] = None,
+                     timeout: Optional[float] = None):
+        """Send a command; the callback gets the response, "" if it wasn't sent, or EXPIRED after `timeout`"""
         if not self.connected or not self.ws:
             print("Not connected to RCON - command not sent")
             if callback:
@@ -138,7 +317,8 @@ class RustRCON:
             }
             
             if callback:
-                self.callbacks[self.message_id] = callback
+                self._expire_callbacks()
+                self.callbacks[self.message_id] = (callback, time.monotonic() + (timeout or self.callback_timeout))
             
             self.ws.send(json.dumps(message))
             return self.message_id
@@ -147,8 +327,60 @@ class RustRCON:
             if callback:
                 callback("")
     
+    def send_command_future(self, command: str, timeout: Optional[float] = None) -> Future:
+        """Send a command and return a Future resolved with its response, or failed with CommandTimeout"""
+        future = Future()
+        resolve = resolve_future(future, command)
+        future.message_id = self.send_command(command, resolve, timeout)
+        if not future.done() and future.message_id is None:
+            resolve("")  # send_command failed without calling back
+        return future
+
+    def send_batch(self, commands: List[str], timeout: Optional[float] = None) -> List[Future]:
+        """Send several commands back to back over the socket without waiting between them"""
+        return [self.send_command_future(command, timeout) for command in commands]
+
+    def forget(self, message_id: Optional[int]):
+        """Drop the callback of a command whose response we no longer want"""
+        if message_id is not None:
+            self.callbacks.pop(message_id, None)
+
+    def expire(self, message_id: Optional[int]):
+        """Give up on a command, answering its callback with EXPIRED and dropping any late response"""
+        pending = self.callbacks.pop(message_id, None) if message_id is not None else None
+        if pending:
+            self.expired_ids.append(message_id)
+            self._call(pending[0], EXPIRED)
+
+    def _expire_callbacks(self):
+        """Give up on commands past their timeout, and on the oldest ones beyond max_callbacks"""
+        now = time.monotonic()
+        expired = [message_id for message_id, (_, give_up_at) in list(self.callbacks.items()) if give_up_at <= now]
+        overflow = len(self.callbacks) - len(expired) - (self.max_callbacks - 1)
+        if overflow > 0:
+            timed_out = set(expired)
+            expired += [message_id for message_id in list(self.callbacks) if message_id not in timed_out][:overflow]
+        self.callbacks_evicted += len(expired)
+        for message_id in expired:
+            self.expire(message_id)
+
+    def _fail_callbacks(self):
+        """Answer every pending command with EXPIRED once the connection it was sent on is gone"""
+        pending = list(self.callbacks)
+        self.callbacks_evicted += len(pending)
+        for message_id in pending:
+            self.expire(message_id)
+
+    @staticmethod
+    def _call(callback: Callable[[str], None], response: str):
+        try:
+            callback(response)
+        except Exception as e:
+            print(f"Error in RCON callback: {e}")
+
     def disconnect(self):
         """Cleanly disconnect from the RCON server"""
         self.should_reconnect = False
+        self.wakeup.set()
         if self.ws:
             self.ws.close() 
\ No newline at end of file
@@ -0,0 +1,234 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError, wait
+from typing import Callable, Dict, Iterable, List, Optional
+from .console_lines import parse_console_line
+from .memory import CappedDeque
+from .rcon_client import RustRCON
+from .rcon_scheduler import RconScheduler, INTERACTIVE, TELEMETRY
+
+def server_room(name: str) -> str:
+    """Socket.IO room of the clients watching one game server"""
+    return f'server:{name}'
+
+class RconBackend:
+    """One game server's RCON connection with its own scheduler, status sampler and console buffer"""
+
+    def __init__(self, name: str, rcon_client: RustRCON, scheduler: RconScheduler,
+                 console_size: int = 500, managed: bool = True):
+        self.name = name
+        self.rcon = rcon_client
+        self.scheduler = scheduler
+        # Managed backends are connected, sampled and parsed by the hub; the primary server's
+        # connection belongs to the rest of the web server, which feeds its lines and status in
+        self.managed = managed
+        self.console = CappedDeque(maxlen=console_size)  # Recent parsed console lines
+        self.pending: List[dict] = []  # Lines not yet pushed to clients
+        self.pending_dropped = 0  # Lines dropped because flush() fell behind by a whole console buffer
+        self.status = {'status': 'offline', 'players': None, 'max_players': None, 'fps': None,
+                       'entities': None, 'sampled_at': None}
+        self.lock = threading.Lock()
+        self.on_status: Optional[Callable[['RconBackend'], None]] = None
+
+    @classmethod
+    def create(cls, name: str, host: str, port: int, password: str, **kwargs) -> 'RconBackend':
+        rcon_client = RustRCON(host, port, password)
+        return cls(name, rcon_client, RconScheduler(rcon_client), **kwargs)
+
+    @property
+    def connected(self) -> bool:
+        return self.rcon.connected
+
+    def start(self):
+        if not self.managed:
+            return
+        self.rcon.on_state_change = self._state_changed
+        self.rcon.add_message_listener(self.handle_broadcast)
+        self.rcon.should_reconnect = True
+        threading.Thread(target=self.rcon.connect, daemon=True).start()
+        self.scheduler.start()
+
+    def stop(self):
+        if not self.managed:
+            return
+        self.rcon.remove_message_listener(self.handle_broadcast)
+        self.rcon.disconnect()
+        self.scheduler.stop()
+
+    def _state_changed(self):
+        self.record_status({} if self.connected else None)
+        if self.connected:
+            self.sample()
+
+    def handle_broadcast(self, data: dict):
+        message = data.get('Message')
+        if data.get('Type') != 'Chat' and isinstance(message, str):
+            for line in message.splitlines():
+                self.feed(parse_console_line(line, data.get('Type')))
+
+    def feed(self, entry: dict):
+        with self.lock:
+            self.console.append(entry)
+            if len(self.pending) >= self.console.maxlen:
+                self.pending.pop(0)
+                self.pending_dropped += 1
+            self.pending.append(entry)
+
+    def take_pending(self) -> List[dict]:
+        with self.lock:
+            lines, self.pending = self.pending, []
+        return lines
+
+    def recent(self, limit: int = 100) -> List[dict]:
+        with self.lock:
+            return list(self.console)[-limit:] if limit > 0 else []
+
+    def sample(self):
+        """Ask for serverinfo; the answer updates the status and is pushed to the server's room"""
+        if self.connected:
+            self.scheduler.send_command('serverinfo', self._handle_serverinfo, TELEMETRY)
+        elif self.status['status'] != 'offline':
+            self.record_status(None)
+
+    def _handle_serverinfo(self, response: str):
+        try:
+            data = json.loads(response) if response else {}
+        except ValueError:
+            data = {}
+        self.record_status(data)
+
+    def record_status(self, serverinfo: Optional[dict]):
+        """Update the status from a serverinfo response, or mark the server offline with None"""
+        if serverinfo is None:
+            status = {'status': 'offline', 'players': None, 'max_players': None, 'fps': None, 'entities': None}
+        else:
+            status = {'status': 'online'}
+            if serverinfo:
+                status.update({
+                    'players': serverinfo.get('Players'),
+                    'max_players': serverinfo.get('MaxPlayers'),
+                    'fps': serverinfo.get('Framerate'),
+                    'entities': serverinfo.get('EntityCount')
+                })
+                self.scheduler.report_fps(serverinfo.get('Framerate'))
+        with self.lock:
+            self.status.update(status)
+            self.status['sampled_at'] = time.time()
+        if self.on_status:
+            self.on_status(self)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            status = dict(self.status)
+        return dict(status, name=self.name, host=self.rcon.host, port=self.rcon.port,
+                    connected=self.connected, phase=self.rcon.phase, primary=not self.managed,
+                    latency_ms=self.scheduler.stats()['latency_ms'])
+
+class RconHub:
+    """Registry of the game servers this web server talks to, all sharing one event loop"""
+
+    def __init__(self, command_timeout: float = 5.0):
+        self.backends: 'OrderedDict[str, RconBackend]' = OrderedDict()
+        self.command_timeout = command_timeout  # Default deadline for run_all()
+        self.lock = threading.Lock()
+        self.running = False
+        self.on_status: Optional[Callable[[RconBackend], None]] = None
+        self.on_console: Optional[Callable[[RconBackend, List[dict]], None]] = None
+
+    def add(self, backend: RconBackend):
+        with self.lock:
+            if backend.name in self.backends:
+                raise ValueError(f"Server '{backend.name}' already exists")
+            self.backends[backend.name] = backend
+        backend.on_status = lambda b: self.on_status(b) if self.on_status else None
+        if self.running:
+            backend.start()
+
+    def remove(self, name: str) -> Optional[RconBackend]:
+        with self.lock:
+            backend = self.backends.get(name)
+            if backend is None or not backend.managed:
+                return None
+            del self.backends[name]
+        backend.stop()
+        return backend
+
+    def get(self, name: str) -> Optional[RconBackend]:
+        return self.backends.get(name)
+
+    def list(self) -> List[RconBackend]:
+        with self.lock:
+            return list(self.backends.values())
+
+    def start(self):
+        self.running = True
+        for backend in self.list():
+            backend.start()
+
+    def stop(self):
+        self.running = False
+        for backend in self.list():
+            backend.stop()
+
+    def sample_all(self):
+        for backend in self.list():
+            if backend.managed:
+                backend.sample()
+
+    def flush(self):
+        """Push the console lines each server produced since the last flush to its room"""
+        for backend in self.list():
+            lines = backend.take_pending()
+            if lines and self.on_console:
+                try:
+                    self.on_console(backend, lines)
+                except Exception as e:
+                    print(f"Error sending console lines for {backend.name}: {e}")
+
+    def run_all(self, command: str, names: Optional[Iterable[str]] = None,
+                timeout: Optional[float] = None) -> dict:
+        """Run one command on every server (or those named) at once, returning what came back before the deadline"""
+        started = time.monotonic()
+        timeout = self.command_timeout if timeout is None else timeout
+        names = [backend.name for backend in self.list()] if names is None else list(names)
+        # Captured now, so a server removed while we wait doesn't break the results
+        backends = {name: self.backends.get(name) for name in names}
+
+        results: Dict[str, dict] = {}
+        futures = {}
+        for name, backend in backends.items():
+            if backend is None:
+                results[name] = {'error': 'No such server'}
+                continue
+            if not backend.connected:
+                results[name] = {'error': 'RCON not connected'}
+                continue
+            future = backend.scheduler.send_command_future(command, INTERACTIVE, timeout)
+            future.add_done_callback(
+                lambda f, name=name: results.setdefault(
+                    name, {'ms': round((time.monotonic() - started) * 1000, 1)}))
+            futures[name] = future
+
+        wait(futures.values(), timeout=timeout)
+        for name, future in futures.items():
+            if not future.done():
+                backends[name].scheduler.forget(future)
+                results[name] = {'error': 'Command timed out'}
+            elif future.cancelled():
+                results[name] = {'error': 'Command cancelled'}
+            elif isinstance(future.exception(), FutureTimeoutError):
+                results[name] = {'error': 'Command timed out'}
+            elif future.exception() is not None:
+                results[name] = {'error': str(future.exception()) or type(future.exception()).__name__}
+            else:
+                results.setdefault(name, {})['response'] = future.result()
+        return {
+            'command': command,
+            'results': {name: results[name] for name in backends},
+            'took_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+
+    def stats(self) -> dict:
+        return {backend.name: backend.scheduler.stats() for backend in self.list()}
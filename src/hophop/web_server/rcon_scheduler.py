@@ -0,0 +1,319 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+from .rcon_client import EXPIRED, resolve_future
+
+# Priority classes, lower runs first
+INTERACTIVE = 0  # Commands typed by an admin
+CONTROL = 1  # Plugin reloads, config changes, shutdown
+TELEMETRY = 2  # Console and status polling
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', CONTROL: 'control', TELEMETRY: 'telemetry'}
+
+def chain_callbacks(first: Optional[Callable[[str], None]], second: Callable[[str], None]) -> Callable[[str], None]:
+    """One callback that passes the response to both"""
+    if first is None:
+        return second
+
+    def both(response):
+        first(response)
+        second(response)
+    return both
+
+class TokenBucket:
+    """Allows `rate` operations per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> bool:
+        self._refill()
+        return self.tokens >= 1
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class RconScheduler:
+    """Queues RCON commands by priority, rate limits each class and caps commands in flight"""
+
+    def __init__(self, rcon_client,
+                 max_in_flight: int = 4,
+                 rates: Optional[dict] = None,
+                 command_timeout: float = 10.0,
+                 max_latency_ms: float = 500.0,
+                 min_fps: float = 20.0,
+                 max_queue: int = 1000):
+        self.rcon = rcon_client
+        self.max_in_flight = max_in_flight
+        rates = rates or {INTERACTIVE: (20, 40), CONTROL: (10, 20), TELEMETRY: (3, 5)}
+        self.buckets = {priority: TokenBucket(*rate) for priority, rate in rates.items()}
+        self.command_timeout = command_timeout  # Default wait for a response before an in flight command is given up
+        self.max_latency_ms = max_latency_ms  # Telemetry is shed above this smoothed latency...
+        self.min_fps = min_fps  # ...or below this server framerate
+        self.queue = []  # heap of (priority, seq, command, callback, timeout)
+        self.max_queue = max_queue  # Queued commands before the least urgent are dropped
+        self.dropped = 0
+        self.seq = itertools.count()
+        self.in_flight = {}  # message id -> (sent at, priority, timeout)
+        self.latency_ms: Optional[float] = None  # Exponentially weighted response latency
+        self.fps: Optional[float] = None
+        self.probe_interval = 5.0  # While degraded, one telemetry command per interval still runs
+        self.last_probe = 0.0
+        self.sent = {priority: 0 for priority in PRIORITY_NAMES}
+        self.shed = 0
+        self.timed_out = 0
+        self.cancelled = 0  # Queued commands given up before they were sent
+        self.deduplicated = 0  # Telemetry commands answered by an identical one that was already queued
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+
+    @property
+    def connected(self) -> bool:
+        return self.rcon.connected
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def send_command(self, command: str, callback: Callable[[str], None] = None,
+                     priority: int = TELEMETRY, timeout: Optional[float] = None) -> Optional[int]:
+        """Queue a command and return its sequence number.
+
+        The callback gets the response, "" if it was shed or not sent, or EXPIRED if it was dropped
+        from a full queue or no response came within `timeout` seconds of sending it (command_timeout
+        by default). Returns None if this command was the one dropped.
+        """
+        if priority == TELEMETRY:
+            with self.lock:
+                # A telemetry poll that's already waiting will produce the same answer, so it answers both
+                for index, (queued_priority, seq, queued_command, queued_callback, queued_timeout) in enumerate(self.queue):
+                    if queued_priority == TELEMETRY and queued_command == command:
+                        if callback:
+                            # Same priority and seq, so the heap order is unchanged
+                            self.queue[index] = (queued_priority, seq, queued_command,
+                                                 chain_callbacks(queued_callback, callback), queued_timeout)
+                        self.deduplicated += 1
+                        return seq
+
+        item = (priority, next(self.seq), command, callback, timeout)
+        dropped = None
+        with self.lock:
+            if len(self.queue) >= self.max_queue:
+                # The newest of the least urgent commands makes way, which may be this one
+                dropped = max(max(self.queue), item)
+                if dropped is not item:
+                    self.queue.remove(dropped)
+                    heapq.heapify(self.queue)
+                self.dropped += 1
+            if dropped is not item:
+                heapq.heappush(self.queue, item)
+        if dropped is not None and dropped[3]:
+            dropped[3](EXPIRED)
+        if dropped is item:
+            return None
+        if not self.running:
+            self.start()
+        self.wakeup.set()
+        return item[1]
+
+    def send_command_future(self, command: str, priority: int = INTERACTIVE,
+                            timeout: Optional[float] = None) -> Future:
+        """Queue a command and return a Future resolved with its response, or failed with CommandTimeout"""
+        future = Future()
+        future.seq = self.send_command(command, resolve_future(future, command), priority, timeout)
+        return future
+
+    def send_batch(self, commands: List[str], priority: int = INTERACTIVE,
+                   timeout: Optional[float] = None) -> List[Future]:
+        return [self.send_command_future(command, priority, timeout) for command in commands]
+
+    def for_priority(self, priority: int) -> 'ScheduledRcon':
+        """Return an RCON client-like view that sends everything at one priority"""
+        return ScheduledRcon(self, priority)
+
+    def report_fps(self, fps):
+        """Record the server framerate reported by serverinfo"""
+        try:
+            self.fps = float(fps)
+        except (TypeError, ValueError):
+            pass
+
+    def degraded(self) -> bool:
+        """True while latency or framerate say the server is struggling"""
+        if self.latency_ms is not None and self.latency_ms > self.max_latency_ms:
+            return True
+        if self.fps is not None and self.fps < self.min_fps:
+            return True
+        return False
+
+    def _next(self):
+        """Pop the highest priority command whose class has a token, if any"""
+        with self.lock:
+            if len(self.in_flight) >= self.max_in_flight:
+                return None
+            blocked = set()
+            for item in sorted(self.queue):
+                priority = item[0]
+                if priority in blocked:
+                    continue
+                if self.buckets[priority].available():
+                    self.queue.remove(item)
+                    heapq.heapify(self.queue)
+                    self.buckets[priority].take()
+                    return item
+                blocked.add(priority)
+            return None
+
+    def _dispatch_loop(self):
+        while self.running:
+            self._reap()
+            item = self._next()
+            if item is None:
+                # Sleeps until a command is queued or answered, a token is due or an in flight command times out
+                self.wakeup.wait(timeout=self._idle_timeout())
+                self.wakeup.clear()
+                continue
+            self._send(*item)
+
+    def _idle_timeout(self) -> Optional[float]:
+        """Seconds until the dispatch loop has something to do without being woken, None if never"""
+        now = time.monotonic()
+        with self.lock:
+            waits = [sent_at + timeout - now for sent_at, _, timeout in self.in_flight.values()]
+            if len(self.in_flight) < self.max_in_flight:
+                waits += [self.buckets[priority].wait_time() for priority in {item[0] for item in self.queue}]
+        if not waits:
+            return None
+        return max(min(waits), 0.01)
+
+    def _should_shed(self) -> bool:
+        """Shed telemetry while degraded, letting one through now and then to re-measure"""
+        if not self.degraded():
+            return False
+        now = time.monotonic()
+        if now - self.last_probe > self.probe_interval:
+            self.last_probe = now
+            return False
+        return True
+
+    def _send(self, priority: int, seq: int, command: str, callback, timeout: Optional[float]):
+        if priority == TELEMETRY and self._should_shed():
+            self.shed += 1
+            if callback:
+                callback("")
+            return
+
+        sent_at = time.monotonic()
+        state = {'message_id': None, 'answered': False}
+
+        def on_response(response):
+            state['answered'] = True
+            with self.lock:
+                self.in_flight.pop(state['message_id'], None)
+            if response:
+                latency = (time.monotonic() - sent_at) * 1000
+                self.latency_ms = latency if self.latency_ms is None else self.latency_ms * 0.8 + latency * 0.2
+            self.wakeup.set()
+            if callback:
+                callback(response)
+
+        timeout = timeout or self.command_timeout
+        message_id = self.rcon.send_command(command, on_response, timeout)
+        state['message_id'] = message_id
+        if message_id is not None and not state['answered']:
+            with self.lock:
+                self.in_flight[message_id] = (sent_at, priority, timeout)
+        self.sent[priority] += 1
+
+    def _reap(self):
+        """Give up on in flight commands past their timeout, answering their callbacks with EXPIRED"""
+        now = time.monotonic()
+        with self.lock:
+            expired = [message_id for message_id, (sent_at, _, timeout) in self.in_flight.items()
+                       if now - sent_at > timeout]
+            for message_id in expired:
+                self.in_flight.pop(message_id)
+        for message_id in expired:
+            self.rcon.expire(message_id)
+            self.timed_out += 1
+
+    def forget(self, future: Future):
+        """Give up on a command queued with send_command_future, taking it off the queue if it hasn't been sent"""
+        seq = getattr(future, 'seq', None)
+        if seq is not None:
+            with self.lock:
+                queued = [item for item in self.queue if item[1] == seq]
+                for item in queued:
+                    self.queue.remove(item)
+                if queued:
+                    heapq.heapify(self.queue)
+                    self.cancelled += 1
+        future.cancel()
+
+    def stats(self) -> dict:
+        with self.lock:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _, _, _ in self.queue:
+                queued[PRIORITY_NAMES[priority]] += 1
+            in_flight = len(self.in_flight)
+        return {
+            'queued': queued,
+            'in_flight': in_flight,
+            'max_in_flight': self.max_in_flight,
+            'sent': {PRIORITY_NAMES[priority]: count for priority, count in self.sent.items()},
+            'latency_ms': round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            'fps': self.fps,
+            'degraded': self.degraded(),
+            'shed': self.shed,
+            'timed_out': self.timed_out,
+            'cancelled': self.cancelled,
+            'deduplicated': self.deduplicated,
+            'dropped': self.dropped
+        }
+
+class ScheduledRcon:
+    """Exposes the RustRCON command methods, routed through a scheduler at a fixed priority"""
+
+    def __init__(self, scheduler: RconScheduler, priority: int):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    @property
+    def connected(self) -> bool:
+        return self.scheduler.connected
+
+    def send_command(self, command: str, callback: Callable[[str], None] = None, timeout: Optional[float] = None):
+        self.scheduler.send_command(command, callback, self.priority, timeout)
+
+    def send_command_future(self, command: str, timeout: Optional[float] = None) -> Future:
+        return self.scheduler.send_command_future(command, self.priority, timeout)
+
+    def send_batch(self, commands: List[str], timeout: Optional[float] = None) -> List[Future]:
+        return self.scheduler.send_batch(commands, self.priority, timeout)
+
+    def forget(self, future: Future):
+        self.scheduler.forget(future)
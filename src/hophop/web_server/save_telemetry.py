@@ -0,0 +1,113 @@
+import math
+import re
+import threading
+import time
+from typing import Callable, List, Optional
+from .memory import CappedDeque
+
+# "Saved 39,011 ents, cache(0.08), write(0.02), disk(0.01)." with timings in seconds
+SAVE_PATTERN = re.compile(r'\bSaved (?P<entities>[\d,]+) ents\b(?P<timings>.*)')
+TIMING_PATTERN = re.compile(r'(\w+)\((\d+(?:\.\d+)?)\)')
+
+def parse_save_line(line: str) -> Optional[dict]:
+    """Turn a Rust save summary line into a save record, or None if it isn't one"""
+    match = SAVE_PATTERN.search(line)
+    if not match:
+        return None
+    timings = {name: round(float(seconds) * 1000, 1) for name, seconds in TIMING_PATTERN.findall(match.group('timings'))}
+    return {
+        'timestamp': time.time(),
+        'entities': int(match.group('entities').replace(',', '')),
+        'timings_ms': timings,
+        'total_ms': round(sum(timings.values()), 1)
+    }
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def correlation(xs: List[float], ys: List[float]) -> Optional[float]:
+    """Pearson correlation coefficient, None if either series doesn't vary"""
+    if len(xs) < 2:
+        return None
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if not var_x or not var_y:
+        return None
+    return cov / math.sqrt(var_x * var_y)
+
+class SaveTelemetry:
+    """Keeps recent world saves parsed from the console and warns about slow ones"""
+
+    def __init__(self, history_size: int = 500, warn_ms: float = 1000.0):
+        self.history = CappedDeque(maxlen=history_size)
+        self.warn_ms = warn_ms  # Saves taking longer than this are reported through on_slow_save
+        self.slow_saves = 0
+        self.lock = threading.Lock()
+        self.on_slow_save: Optional[Callable[[dict], None]] = None
+
+    def handle_console_line(self, line: str):
+        record = parse_save_line(line)
+        if not record:
+            return
+        with self.lock:
+            self.history.append(record)
+        if self.warn_ms and record['total_ms'] > self.warn_ms:
+            self.slow_saves += 1
+            if self.on_slow_save:
+                self.on_slow_save(dict(record, threshold_ms=self.warn_ms))
+
+    def stats(self, recent: int = 50) -> dict:
+        with self.lock:
+            records = list(self.history)
+
+        def summary(values):
+            return {
+                'p50': percentile(values, 50),
+                'p90': percentile(values, 90),
+                'p99': percentile(values, 99),
+                'max': max(values) if values else None
+            }
+
+        totals = [record['total_ms'] for record in records]
+        entities = [record['entities'] for record in records]
+        components = sorted({name for record in records for name in record['timings_ms']})
+
+        # Least squares slope of save time against entity count, per thousand entities
+        ms_per_1k = None
+        if len(records) >= 2:
+            mean_e = sum(entities) / len(entities)
+            var_e = sum((e - mean_e) ** 2 for e in entities)
+            if var_e:
+                mean_t = sum(totals) / len(totals)
+                slope = sum((e - mean_e) * (t - mean_t) for e, t in zip(entities, totals)) / var_e
+                ms_per_1k = round(slope * 1000, 3)
+
+        r = correlation(entities, totals)
+        return {
+            'count': len(records),
+            'slow_saves': self.slow_saves,
+            'warn_ms': self.warn_ms,
+            'total_ms': summary(totals),
+            'timings_ms': {name: summary([record['timings_ms'][name] for record in records
+                                          if name in record['timings_ms']])
+                           for name in components},
+            'entities': {
+                'last': entities[-1] if entities else None,
+                'correlation': round(r, 3) if r is not None else None,
+                'ms_per_1k_entities': ms_per_1k
+            },
+            'recent': records[-recent:]
+        }
+
+    def reset(self):
+        with self.lock:
+            self.history.clear()
+        self.slow_saves = 0
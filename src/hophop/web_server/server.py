@@ -2,32 +2,93 @@
 from gevent import monkey
 monkey.patch_all()
 
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
+import time
+IMPORT_STARTED = time.perf_counter()  # Import time is reported by /api/health
+
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, send_file
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import subprocess
 import threading
-import time
+import gevent
 import os
+import queue
+import secrets
+import sqlite3
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import socket
 from typing import Optional
 from .rcon_client import RustRCON
+from .rcon_scheduler import RconScheduler, INTERACTIVE, CONTROL, TELEMETRY
+from .rcon_hub import RconBackend, RconHub, server_room
+from .plugin_reload import PluginReloader, PluginWatcher
+from .plugin_profiler import PluginProfiler
+from .save_telemetry import SaveTelemetry
+from .player_state import PlayerState
+from .console_lines import parse_console_line
+from .log_store import ConsoleLogStore
+from .console_subscriptions import ConsoleFilter, ConsoleSubscriptions
+from .service_status import ServiceStatusProvider
+from .journal_stream import JournalStreamer
+from .fanout import ClientFanout
+from .compression import ResponseCompressor, websocket_deflate_available
+from .plugin_files import JsonPager, file_signature, iter_file, page_etag
+from .plugin_bundles import BundleError, PluginBundles
+from .config_service import ConfigService, LIVE_KEYS
+from .server_users import ServerUsers
+from .control_jobs import ControlJobQueue, ControlJobRejected
+from .server_lifecycle import ConsoleWatcher, ServerLifecycle
+from .memory import STAT_KEYS, MemoryMonitor, buffer_stats
+from .profiling import HubBlockMonitor, RequestProfiler, SamplingProfiler, collapsed
+from .production import OwnerElection, SharedState, SharedStateRelay, OwnerProxy, run_gunicorn
+from .services import ServiceRegistry
+from .job_scheduler import JobScheduler
 import json
 from functools import partial
 from pathlib import Path
 from dotenv import load_dotenv
-import psutil
-import signal
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 import shutil
 from werkzeug.utils import secure_filename
-import select
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import is_resource_modified
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'your-secret-key')
-socketio = SocketIO(app)
+# In production, workers share emits through a message queue (e.g. redis://127.0.0.1:6379/0)
+MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+socketio = SocketIO(app, message_queue=MESSAGE_QUEUE)
+
+# All server pushes go through per client bounded queues
+fanout = ClientFanout(socketio, max_queue=int(os.getenv('CLIENT_QUEUE_SIZE', '256')),
+                      max_clients=int(os.getenv('MAX_CLIENTS', '1000')))
+
+# Set by start_worker() when running as one of several gunicorn workers
+shared_state: Optional[SharedState] = None
+owner_election: Optional[OwnerElection] = None
+owner_proxy: Optional[OwnerProxy] = None
+
+# Events whose latest value other workers read from shared state instead of asking RCON
+SHARED_SNAPSHOTS = {
+    'screen_output': 'console',
+    'server_status': 'status',
+    'server_control_status': 'service_status'
+}
+
+def is_owner() -> bool:
+    """True if this process runs RCON, the journal and the other background services"""
+    return owner_election is None or owner_election.is_owner
+
+def broadcast(event, data):
+    """Send an event to every client, including those connected to other workers"""
+    fanout.emit(event, data)
+    if shared_state is None:
+        return
+    if event in SHARED_SNAPSHOTS:
+        shared_state.publish(SHARED_SNAPSHOTS[event], {'event': event, 'data': data})
+    elif MESSAGE_QUEUE:
+        # Local clients were served by the fanout above
+        socketio.emit(event, data, skip_sid=list(fanout.clients))
 
 # Add these variables at the top with other imports
 RCON_HOST = os.getenv('RCON_HOST', 'localhost')
@@ -37,6 +98,21 @@ RCON_PASSWORD = os.getenv('SERVER_RCON_PASS', 'avoid-unelected-thee')  # Use SER
 # Add this after app initialization
 rcon_client = RustRCON(RCON_HOST, RCON_PORT, RCON_PASSWORD)
 
+# Commands still waiting for a response are given up after this long, or once there are too many
+RCON_MAX_PENDING_CALLBACKS = int(os.getenv('RCON_MAX_PENDING_CALLBACKS', '1000'))
+RCON_CALLBACK_TIMEOUT = float(os.getenv('RCON_CALLBACK_TIMEOUT', '300'))  # Only for commands sent without their own timeout
+rcon_client.max_callbacks = RCON_MAX_PENDING_CALLBACKS
+rcon_client.callback_timeout = RCON_CALLBACK_TIMEOUT
+
+# Most Socket.IO clients each kind of console/journal subscription keeps state for
+MAX_SUBSCRIBERS = int(os.getenv('MAX_SUBSCRIBERS', '1000'))
+
+# Every command goes through the scheduler so polling can't crowd out admin commands
+rcon_scheduler = RconScheduler(rcon_client, max_queue=int(os.getenv('RCON_MAX_QUEUE', '1000')))
+interactive_rcon = rcon_scheduler.for_priority(INTERACTIVE)
+control_rcon = rcon_scheduler.for_priority(CONTROL)
+telemetry_rcon = rcon_scheduler.for_priority(TELEMETRY)
+
 # Get the project root directory - adjust to look in the main repo directory
 ROOT_DIR = Path(__file__).parent.parent.parent.parent  # Added one more .parent to go up one more level
 
@@ -47,11 +123,42 @@ print(f"Project root directory: {ROOT_DIR.absolute()}")  # Add this to see the a
 load_dotenv(ROOT_DIR / '.env')  # Load default values
 load_dotenv(ROOT_DIR / '.env.local', override=True)  # Override with local values
 
-# Add these at the top with other globals
-RUST_SERVER_SCRIPT = ROOT_DIR / 'hophop-rust-server'
-VENV_PATH = ROOT_DIR / 'venv'
-SERVER_PROCESS = None
-STARTUP_LOGS = []
+# gzip/brotli for HTTP responses; websocket frames are compressed by permessage-deflate
+compressor = ResponseCompressor(threshold=int(os.getenv('HTTP_COMPRESS_MIN_BYTES', '1024')))
+compressor.init_app(app)
+
+# Event loop stall detection and on-demand CPU profiles; any request can also be profiled
+# with ?_profile=pstats or ?_profile=collapsed
+hub_monitor = HubBlockMonitor(threshold=int(os.getenv('HUB_BLOCK_THRESHOLD_MS', '100')) / 1000)
+sampling_profiler = SamplingProfiler()
+request_profiler = RequestProfiler()
+request_profiler.init_app(app)
+
+# Cached systemd state of the rust server unit, refreshed with one `systemctl show`
+service_status = ServiceStatusProvider('hophop-rust-server')
+
+# Follows the rust server's journal and sends it to subscribed clients in batches
+journal_streamer = JournalStreamer('hophop-rust-server', history_size=int(os.getenv('JOURNAL_HISTORY_SIZE', '1000')),
+                                   max_clients=MAX_SUBSCRIBERS)
+journal_streamer.send = lambda sid, payload: fanout.emit('server_control_logs', payload, to=sid)
+
+# Console lines from the journal and RCON, for code waiting on a particular line (e.g. save complete)
+console_watcher = ConsoleWatcher()
+
+def handle_journal_entry(entry):
+    console_watcher.feed(entry['message'])
+    rcon_client.handle_console_line(entry['message'])  # RCON is down while booting, the journal isn't
+
+journal_streamer.on_entry = handle_journal_entry
+
+def rust_process_alive() -> Optional[bool]:
+    """Whether systemd has the rust server running, so RCON knows a refused port means booting rather than stopped"""
+    status = service_status.get(max_age=5)['status']
+    if status == 'unknown':
+        return None
+    return status in ('running', 'starting')
+
+rcon_client.process_alive = rust_process_alive
 
 # Add these paths to your existing paths
 SCRIPTS_DIR = os.path.join(ROOT_DIR, "src/hophop/rust_server/scripts")
@@ -74,34 +181,128 @@ except Exception as e:
     print(f"Error loading auto refresh settings: {e}")
     AUTO_REFRESH_PLUGINS = {}
 
-# File system event handler for auto-refreshing plugins
-class PluginFileHandler(FileSystemEventHandler):
-    def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith('.cs'):
-            plugin_file = os.path.basename(event.src_path)
-            plugin_name = plugin_file[:-3]  # Remove .cs extension
-            
-            # Check if this plugin has auto refresh enabled
-            if plugin_name in AUTO_REFRESH_PLUGINS and AUTO_REFRESH_PLUGINS[plugin_name]:
-                print(f"Auto refreshing plugin: {plugin_name}")
-                try:
-                    # Copy the updated plugin file to the active plugins directory
-                    source_path = os.path.join(SCRIPTS_DIR, plugin_file)
-                    target_path = os.path.join(PLUGINS_DIR, plugin_file)
-                    shutil.copy2(source_path, target_path)
-                    
-                    # Notify clients that plugin was refreshed
-                    socketio.emit('plugin_refreshed', {
-                        'name': plugin_name,
-                        'timestamp': datetime.now().isoformat()
-                    })
-                except Exception as e:
-                    print(f"Error auto-refreshing plugin {plugin_name}: {e}")
+# Debounced pipeline that deploys auto refreshed plugins in batches once their saves settle
+plugin_reloader = PluginReloader(SCRIPTS_DIR, PLUGINS_DIR)
+
+def handle_plugins_deployed(plugin_names):
+    """Notify clients that plugins were copied into the active plugins directory"""
+    for plugin_name in plugin_names:
+        broadcast('plugin_refreshed', {
+            'name': plugin_name,
+            'timestamp': datetime.now().isoformat()
+        })
 
-# Start the file system observer
-observer = Observer()
-observer.schedule(PluginFileHandler(), path=SCRIPTS_DIR, recursive=False)
-observer.start()
+def handle_plugin_reloaded(record):
+    """Notify clients once Carbon reports a deployed plugin as loaded (or failed)"""
+    broadcast('plugin_reloaded', record)
+
+plugin_reloader.on_deployed = handle_plugins_deployed
+plugin_reloader.on_reloaded = handle_plugin_reloaded
+
+# Bulk toggles and zip/tar bundles, whose activations are deployed together
+plugin_bundles = PluginBundles(SCRIPTS_DIR, os.path.dirname(PLUGINS_DIR), plugin_reloader,
+                               max_bytes=int(os.getenv('PLUGIN_BUNDLE_MAX_MB', '256')) * 1024 * 1024)
+
+def deploy_plugins(plugin_names):
+    """Deploy in the owner, which tracks reloads from the console, even when a bundle lands in another worker"""
+    if is_owner():
+        return plugin_reloader.deploy(plugin_names)
+    result = call_owner('/internal/plugins/deploy', {'names': list(plugin_names)})
+    return (result or {}).get('deployed', [])
+
+plugin_bundles.deploy = deploy_plugins
+
+# Per plugin compile/load timings parsed from Carbon's console output
+plugin_profiler = PluginProfiler(
+    profile_commands=[c.strip() for c in os.getenv('PLUGIN_PROFILE_COMMANDS', '').split(',') if c.strip()],
+    profile_interval=int(os.getenv('PLUGIN_PROFILE_INTERVAL', '60'))
+)
+
+# World save timings parsed from Rust's "Saved N ents" lines
+save_telemetry = SaveTelemetry(
+    history_size=int(os.getenv('SAVE_HISTORY_SIZE', '500')),
+    warn_ms=float(os.getenv('SAVE_WARN_MS', '1000'))
+)
+save_telemetry.on_slow_save = lambda record: broadcast('save_warning', record)
+
+# Online players by SteamID, updated from console events and pushed to clients as deltas
+player_state = PlayerState()
+player_state.on_delta = lambda delta: broadcast('player_delta', delta)
+
+# Every console line, parsed and kept on disk with a full-text index
+console_log_store = ConsoleLogStore(
+    Path(os.getenv('CONSOLE_LOG_DB', ROOT_DIR / 'logs' / 'console.db')),
+    retention_days=float(os.getenv('CONSOLE_LOG_RETENTION_DAYS', '30')),
+    max_buffer=int(os.getenv('CONSOLE_LOG_MAX_BUFFER', '10000'))
+)
+
+# Parsed console lines for clients that subscribed with a level/plugin/regex filter
+console_subscriptions = ConsoleSubscriptions(history_size=int(os.getenv('CONSOLE_HISTORY_SIZE', '1000')),
+                                             max_clients=MAX_SUBSCRIBERS)
+console_subscriptions.send = lambda sid, payload: fanout.emit('console_lines', payload, to=sid)
+
+# Every game server this web server talks to. The one above is the primary: it keeps its own
+# polling and plugin/lifecycle features and just feeds the hub; others are added through the API.
+RCON_SERVERS_FILE = os.path.join(ROOT_DIR, 'rcon_servers.json')
+SERVER_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+HUB_CONSOLE_SIZE = int(os.getenv('HUB_CONSOLE_SIZE', '500'))
+rcon_hub = RconHub()
+primary_backend = RconBackend(os.getenv('RCON_SERVER_NAME', 'main'), rcon_client, rcon_scheduler,
+                              console_size=HUB_CONSOLE_SIZE, managed=False)
+rcon_hub.add(primary_backend)
+rcon_hub.on_status = lambda backend: fanout.emit('hub_status', backend.snapshot(), room=server_room(backend.name))
+rcon_hub.on_console = lambda backend, lines: fanout.emit(
+    'hub_console', {'server': backend.name, 'lines': lines}, room=server_room(backend.name))
+
+def create_backend(name: str, host: str, port: int, password: str) -> RconBackend:
+    backend = RconBackend.create(name, host, port, password, console_size=HUB_CONSOLE_SIZE)
+    backend.rcon.max_callbacks = RCON_MAX_PENDING_CALLBACKS
+    backend.rcon.callback_timeout = RCON_CALLBACK_TIMEOUT
+    return backend
+
+def save_rcon_servers():
+    try:
+        servers = [{'name': backend.name, 'host': backend.rcon.host, 'port': backend.rcon.port,
+                    'password': backend.rcon.password} for backend in rcon_hub.list() if backend.managed]
+        with open(RCON_SERVERS_FILE, 'w') as f:
+            json.dump(servers, f, indent=2)
+    except Exception as e:
+        print(f"Error saving RCON servers: {e}")
+
+def load_rcon_servers():
+    try:
+        if os.path.exists(RCON_SERVERS_FILE):
+            with open(RCON_SERVERS_FILE, 'r') as f:
+                for server in json.load(f):
+                    rcon_hub.add(create_backend(server['name'], server['host'], int(server['port']),
+                                                server['password']))
+    except Exception as e:
+        print(f"Error loading RCON servers: {e}")
+
+load_rcon_servers()
+
+def handle_rcon_broadcast(data):
+    """Feed console lines broadcast over RCON into the log store, console subscriptions, console watcher, player state, save telemetry, plugin reload pipeline and profiler"""
+    message = data.get('Message')
+    if data.get('Type') == 'Chat':
+        player_state.handle_chat(message)
+        return
+    if isinstance(message, str):
+        for line in message.splitlines():
+            entry = parse_console_line(line, data.get('Type'))
+            console_log_store.append(entry)
+            primary_backend.feed(entry)
+            console_subscriptions.feed(entry)
+            console_watcher.feed(line)
+            player_state.handle_console_line(line)
+            save_telemetry.handle_console_line(line)
+            plugin_profiler.handle_console_line(line)
+            plugin_reloader.handle_console_line(line)
+
+rcon_client.add_message_listener(handle_rcon_broadcast)
+
+# Schedules auto refreshed plugins when their source changes, started with the other background services
+plugin_watcher = PluginWatcher(plugin_reloader, lambda plugin_name: bool(AUTO_REFRESH_PLUGINS.get(plugin_name)))
 
 def is_port_in_use(port: int) -> bool:
     """Check if a port is already in use"""
@@ -140,38 +341,33 @@ def print_server_info(host: str, port: int, workers: int):
     print("   • The console will auto-refresh every second")
     print("="*50 + "\n")
 
-def get_screen_output(screen_name):
-    """Get and emit screen output to connected clients"""
-    last_message = ""
-    check_interval = 1  # Check every second
-    
-    def handle_console(response):
-        nonlocal last_message
-        try:
-            if response:
-                messages = json.loads(response)
-                # Combine all messages into one string, preserving newlines
-                content = "\n".join(msg.get('Message', '') for msg in messages if msg.get('Message'))
-                if content and content != last_message:
-                    socketio.emit('screen_output', {'data': content})
-                    last_message = content
-        except Exception as e:
-            print(f"Error handling console output: {e}")
-    
-    while True:
-        try:
-            if rcon_client.connected:
-                # Use console.tail to get the last 128 lines of console output
-                rcon_client.send_command('console.tail 128', handle_console)
-            else:
-                message = 'Waiting for server to start...'
-                if message != last_message:
-                    socketio.emit('screen_output', {'data': message})
-                    last_message = message
-        except Exception as e:
-            print(f"Error in get_console_output: {e}")
-        
-        time.sleep(check_interval)
+# Last console tail sent to clients, so unchanged output isn't broadcast again
+last_console_output = ""
+
+def handle_console(response):
+    global last_console_output
+    try:
+        if response:
+            messages = json.loads(response)
+            # Combine all messages into one string, preserving newlines
+            content = "\n".join(msg.get('Message', '') for msg in messages if msg.get('Message'))
+            if content and content != last_console_output:
+                broadcast('screen_output', {'data': content})
+                last_console_output = content
+    except Exception as e:
+        print(f"Error handling console output: {e}")
+
+def poll_console():
+    """Fetch the console tail and emit it to connected clients if it changed"""
+    global last_console_output
+    if rcon_client.connected:
+        # Use console.tail to get the last 128 lines of console output
+        telemetry_rcon.send_command('console.tail 128', handle_console)
+    else:
+        message = 'Waiting for server to start...'
+        if message != last_console_output:
+            broadcast('screen_output', {'data': message})
+            last_console_output = message
 
 @app.route('/')
 def index():
@@ -181,15 +377,23 @@ def index():
 def handle_connect():
     """Handle client connection"""
     print('Client connected')
+    sid = request.sid
+    if not fanout.register(sid):
+        print(f'Refusing client, {fanout.max_clients} already connected')
+        return False
+    
+    if not is_owner():
+        send_shared_snapshots(sid)
+        return
     
     # Get initial console history
     if rcon_client.connected:
-        rcon_client.send_command('console.tail 128', lambda response: 
-            socketio.emit('screen_output', {'data': '\n'.join(
+        control_rcon.send_command('console.tail 128', lambda response: 
+            fanout.emit('screen_output', {'data': '\n'.join(
                 msg.get('Message', '') 
                 for msg in json.loads(response) 
                 if msg.get('Message')
-            )}) if response else None
+            )}, to=sid) if response else None
         )
     
     # Get initial status
@@ -198,9 +402,48 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    fanout.unregister(request.sid)
+    if is_owner():
+        journal_streamer.unsubscribe(request.sid)
+        console_subscriptions.unsubscribe(request.sid)
+    else:
+        call_owner('/internal/journal/unsubscribe', {'sid': request.sid})
+        call_owner('/internal/console/unsubscribe', {'sid': request.sid})
+
+def send_shared_snapshots(sid):
+    """Send a client connected to a non-owner worker the latest state published by the owner"""
+    for name in SHARED_SNAPSHOTS.values():
+        snapshot = shared_state.read(name)
+        if snapshot:
+            fanout.emit(snapshot['event'], snapshot['data'], to=sid)
+
+def call_owner(path, payload):
+    """Ask the owner process to do something on behalf of this worker"""
+    try:
+        return owner_proxy.call(path, payload)
+    except Exception as e:
+        print(f"Error calling owner {path}: {e}")
+        return None
+
+# Players online as of the last serverinfo response, None until one arrives
+online_players: Optional[int] = None
+
+def update_player_count(players):
+    global online_players
+    try:
+        online_players = int(players)
+    except (TypeError, ValueError):
+        online_players = None
 
 def update_server_status():
     """Update and emit server status"""
+    if not rcon_client.connected:
+        player_state.clear()
+        primary_backend.record_status(None)
+    else:
+        # Grant owner changes saved while RCON was down; removals only happen when someone asks for them
+        server_users.sync(control_rcon, removals=False)
+        primary_backend.record_status({})
     status_data = {
         'status': 'online' if rcon_client.connected else 'offline',
         'players': 'Unknown',
@@ -209,7 +452,7 @@ def update_server_status():
         'entities': 'Unknown',
         'raw': ''
     }
-    socketio.emit('server_status', {'data': status_data})
+    broadcast('server_status', {'data': status_data})
 
 def get_server_status():
     """Get server status via RCON"""
@@ -231,20 +474,26 @@ def get_server_status():
             if response:
                 data = json.loads(response)
                 status_data['players'] = data.get('Players', 'Unknown')
+                update_player_count(data.get('Players'))
                 status_data['max_players'] = data.get('MaxPlayers', 'Unknown')
                 status_data['fps'] = data.get('Framerate', 'Unknown')
+                rcon_scheduler.report_fps(data.get('Framerate'))
+                primary_backend.record_status(data)
                 status_data['entities'] = data.get('EntityCount', 'Unknown')
                 status_data['raw'] = json.dumps(data, indent=2)  # Pretty print the raw data
-            socketio.emit('server_status', {'data': status_data})
+            broadcast('server_status', {'data': status_data})
         except Exception as e:
             print(f"Error handling serverinfo: {e}")
-            socketio.emit('server_status', {'data': status_data})
+            broadcast('server_status', {'data': status_data})
     
-    rcon_client.send_command('serverinfo', handle_serverinfo)
+    telemetry_rcon.send_command('serverinfo', handle_serverinfo)
 
 @socketio.on('request_status')
 def handle_status_request():
     """Handle client requests for server status"""
+    if not is_owner():
+        send_shared_snapshots(request.sid)
+        return
     get_server_status()
 
 def init_rcon():
@@ -258,14 +507,242 @@ def init_rcon():
             print(f"Failed to connect to RCON: {e}")
             update_server_status()
     
+    rcon_client.should_reconnect = True
     thread = threading.Thread(target=rcon_thread, daemon=True)
     thread.start()
     return thread
 
+def poll_plugin_profile():
+    if rcon_client.connected:
+        plugin_profiler.run_profile_commands(telemetry_rcon)
+
+def poll_server_status():
+    if rcon_client.connected:
+        get_server_status()
+
+def get_player_count() -> Optional[int]:
+    """Players online from the player state, or the last serverinfo before it's reconciled; 0 while the server is down"""
+    if not rcon_client.connected:
+        return 0
+    count = player_state.count()
+    return count if count is not None else online_players
+
+def reconcile_players():
+    """Correct the player state against `playerlist` in case a join or leave line was missed"""
+    if rcon_client.connected:
+        telemetry_rcon.send_command('playerlist', player_state.reconcile)
+
+def internal_buffers() -> dict:
+    """Size, cap and evictions of every long-lived in-memory buffer in this process"""
+    buffers = {
+        'rcon.callbacks': buffer_stats(rcon_client.callbacks, rcon_client.max_callbacks, rcon_client.callbacks_evicted),
+        'rcon.port_to_connect_ms': buffer_stats(rcon_client.port_to_connect_ms),
+        'rcon.downtime_ms': buffer_stats(rcon_client.downtime_ms),
+        'rcon_scheduler.queue': buffer_stats(rcon_scheduler.queue, rcon_scheduler.max_queue, rcon_scheduler.dropped),
+        'fanout.clients': buffer_stats(fanout.clients, fanout.max_clients, fanout.rejected + fanout.disconnected_slow),
+        'fanout.queued': {'size': fanout.queued(), 'cap': fanout.max_queue * len(fanout.clients),
+                          'evicted': fanout.dropped},
+        'journal.history': buffer_stats(journal_streamer.history),
+        'journal.clients': buffer_stats(journal_streamer.clients, journal_streamer.max_clients,
+                                        journal_streamer.clients_evicted),
+        'console_subscriptions.history': buffer_stats(console_subscriptions.history),
+        'console_subscriptions.pending': buffer_stats(console_subscriptions.pending, console_subscriptions.history.maxlen,
+                                                      console_subscriptions.pending_dropped),
+        'console_subscriptions.clients': buffer_stats(console_subscriptions.clients, console_subscriptions.max_clients,
+                                                      console_subscriptions.clients_evicted),
+        'console_log_store.buffer': buffer_stats(console_log_store.buffer, evicted=console_log_store.dropped),
+        'console_watcher.expectations': buffer_stats(console_watcher.expectations),
+        'save_telemetry.history': buffer_stats(save_telemetry.history),
+        'server_lifecycle.history': buffer_stats(server_lifecycle.history),
+        'control_jobs': buffer_stats(control_jobs.jobs, control_jobs.history_size, control_jobs.evicted),
+        'player_state.players': buffer_stats(player_state.players),
+        'hub_monitor.recent': buffer_stats(hub_monitor.recent),
+        'hub_monitor.sites': buffer_stats(hub_monitor.sites, hub_monitor.max_sites),
+        'memory.history': buffer_stats(memory_monitor.history)
+    }
+    for backend in rcon_hub.list():
+        buffers[f'hub.{backend.name}.console'] = buffer_stats(backend.console)
+        buffers[f'hub.{backend.name}.pending'] = buffer_stats(backend.pending, backend.console.maxlen,
+                                                              backend.pending_dropped)
+        if backend.managed:
+            buffers[f'hub.{backend.name}.callbacks'] = buffer_stats(
+                backend.rcon.callbacks, backend.rcon.max_callbacks, backend.rcon.callbacks_evicted)
+    return buffers
+
+# RSS every MEMORY_SAMPLE_INTERVAL seconds (a day of them by default), buffer sizes and tracemalloc snapshots
+memory_monitor = MemoryMonitor(internal_buffers, history_size=int(os.getenv('MEMORY_HISTORY_SIZE', '1440')),
+                               trace_frames=int(os.getenv('TRACEMALLOC_FRAMES', '10')))
+
+# Every periodic job runs from one timer heap instead of a sleeping thread each
+job_scheduler = JobScheduler(player_count=get_player_count)
+job_scheduler.add_periodic('console_poll', poll_console, 1)
+job_scheduler.add_periodic('status_updater', poll_server_status, 30)
+# Watch the systemd unit so state changes are pushed without clients polling
+job_scheduler.add_periodic('service_status_watcher', service_status.poll, 5, blocking=True)
+job_scheduler.add_periodic('player_reconcile', reconcile_players, int(os.getenv('PLAYERLIST_INTERVAL', '60')))
+job_scheduler.add_periodic('console_log_flush', console_log_store.flush, 1, native=True)
+job_scheduler.add_periodic('console_log_prune', console_log_store.prune, 3600, native=True)
+job_scheduler.add_periodic('console_subscriptions_flush', console_subscriptions.flush, 0.25, jitter=0)
+job_scheduler.add_periodic('journal_flush', journal_streamer.flush, journal_streamer.batch_interval, jitter=0)
+job_scheduler.add_periodic('hub_sampler', rcon_hub.sample_all, int(os.getenv('HUB_SAMPLE_INTERVAL', '30')))
+job_scheduler.add_periodic('hub_console_flush', rcon_hub.flush, 0.25, jitter=0)
+job_scheduler.add_periodic('memory_sampler', memory_monitor.sample, int(os.getenv('MEMORY_SAMPLE_INTERVAL', '60')))
+if plugin_profiler.profile_commands:
+    job_scheduler.add_periodic('plugin_profiler', poll_plugin_profile, plugin_profiler.profile_interval)
+
+# Background work, started once per process by start_background_services()
+services = ServiceRegistry()
+rcon_connect_thread: Optional[threading.Thread] = None
+
+def start_rcon():
+    global rcon_connect_thread
+    rcon_connect_thread = init_rcon()
+
+services.register('rcon', start_rcon, rcon_client.disconnect,
+                  lambda: rcon_client.connected or rcon_connect_thread.is_alive())
+services.register('rcon_scheduler', rcon_scheduler.start, rcon_scheduler.stop, lambda: rcon_scheduler.running)
+services.register('rcon_hub', rcon_hub.start, rcon_hub.stop, lambda: rcon_hub.running)
+services.register('journal', lambda: journal_streamer.start(flush_in_background=False), journal_streamer.stop,
+                  lambda: journal_streamer.running)
+services.register('plugin_watcher', plugin_watcher.start, plugin_watcher.stop, plugin_watcher.is_alive)
+services.register('job_scheduler', job_scheduler.start, job_scheduler.stop, job_scheduler.healthy)
+services.register('hub_monitor', hub_monitor.start, hub_monitor.stop, lambda: hub_monitor.running)
+services.register('console_log_store', console_log_store.flush, console_log_store.close)
+
+def start_background_services():
+    """Start RCON, polling, the plugin watcher and the journal in this process"""
+    services.start_all()
+    print(f"Background services started in {services.boot_ms}ms")
+
+def stop_background_services():
+    services.stop_all()
+
+# Requests only the owner process can answer, forwarded to it by the other workers
+OWNER_ROUTES = ('/api/health', '/api/rcon', '/api/schedule', '/api/players', '/api/logs', '/api/console/',
+                '/api/plugins/profile', '/api/plugins/reload-timings', '/api/plugins/bulk', '/api/server/',
+                '/api/users', '/api/servers', '/api/debug/', '/api/memory')
+
+def start_worker():
+    """Set up a gunicorn worker: share state with the others and stand for owner election"""
+    global shared_state, owner_election, owner_proxy
+    
+    state_dir = Path(os.environ['HOPHOP_STATE_DIR'])
+    shared_state = SharedState(state_dir)
+    owner_proxy = OwnerProxy(shared_state, os.environ['HOPHOP_INTERNAL_TOKEN'])
+    owner_election = OwnerElection(state_dir / 'owner.lock')
+    fanout.remote = MESSAGE_QUEUE is not None
+    hub_monitor.start()  # Every worker serves clients, so watch each one's event loop
+    
+    relay = SharedStateRelay(shared_state, SHARED_SNAPSHOTS.values(), fanout.emit)
+    
+    def elect():
+        relay.start()
+        while not owner_election.try_acquire():
+            time.sleep(2)
+        relay.stop()
+        become_owner()
+    
+    threading.Thread(target=elect, daemon=True).start()
+
+def become_owner():
+    """Run the background services here and let other workers reach us over loopback"""
+    from gevent.pywsgi import WSGIServer
+    
+    internal_port = find_available_port(int(os.getenv('HOPHOP_INTERNAL_PORT', '5100')))
+    WSGIServer(('127.0.0.1', internal_port), app, log=None).start()
+    shared_state.publish('owner', {'pid': os.getpid(), 'port': internal_port})
+    print(f"Worker {os.getpid()} is the owner (internal port {internal_port})")
+    start_background_services()
+
+@app.before_request
+def forward_to_owner():
+    """Hand RCON and journal requests to the owner when running as another worker"""
+    if request.path.startswith('/internal/'):
+        token = os.getenv('HOPHOP_INTERNAL_TOKEN')
+        if not token or request.headers.get(OwnerProxy.TOKEN_HEADER) != token:
+            return jsonify({'error': 'Forbidden'}), 403
+        return None
+    
+    if is_owner():
+        return None
+    if not (request.path.startswith(OWNER_ROUTES) or (request.path == '/api/config' and request.method == 'POST')):
+        return None
+    
+    try:
+        upstream = owner_proxy.open(request.full_path.rstrip('?'), request.method,
+                                    request.get_data() or None, request.content_type,
+                                    request.headers.get('Accept-Encoding'))
+    except Exception as e:
+        return jsonify({'error': f'Owner process unavailable: {e}'}), 503
+    
+    def generate():
+        with upstream:
+            while True:
+                chunk = upstream.read1(8192)
+                if not chunk:
+                    break
+                yield chunk
+    
+    headers = {key: value for key, value in upstream.headers.items()
+               if key.lower() in ('content-type', 'cache-control', 'content-encoding', 'vary')}
+    return Response(generate(), status=upstream.status, headers=headers)
+
+@app.route('/internal/journal/subscribe', methods=['POST'])
+def internal_journal_subscribe():
+    data = request.get_json()
+    journal_streamer.subscribe(data['sid'], data.get('cursor'))
+    return jsonify({'status': 'success'})
+
+@app.route('/internal/journal/unsubscribe', methods=['POST'])
+def internal_journal_unsubscribe():
+    journal_streamer.unsubscribe(request.get_json()['sid'])
+    return jsonify({'status': 'success'})
+
+@app.route('/internal/console/subscribe', methods=['POST'])
+def internal_console_subscribe():
+    data = request.get_json()
+    console_subscriptions.subscribe(data['sid'], ConsoleFilter.from_dict(data), int(data.get('backlog', 100)))
+    return jsonify({'status': 'success'})
+
+@app.route('/internal/console/unsubscribe', methods=['POST'])
+def internal_console_unsubscribe():
+    console_subscriptions.unsubscribe(request.get_json()['sid'])
+    return jsonify({'status': 'success'})
+
+@app.route('/internal/hub/join', methods=['POST'])
+def internal_hub_join():
+    data = request.get_json()
+    send_hub_backlog(data['sid'], data['server'], int(data.get('backlog', 100)))
+    return jsonify({'status': 'success'})
+
+@app.route('/internal/plugins/deploy', methods=['POST'])
+def internal_plugins_deploy():
+    return jsonify({'deployed': plugin_reloader.deploy(request.get_json()['names'])})
+
+def run_production(host: str, port: int, workers: int, timeout: int):
+    """Serve with gunicorn gevent workers, one of which owns the background services"""
+    if workers > 1 and not MESSAGE_QUEUE:
+        print("SOCKETIO_MESSAGE_QUEUE is not set (e.g. redis://127.0.0.1:6379/0), running a single worker")
+        workers = 1
+    
+    state_dir = Path(os.getenv('HOPHOP_STATE_DIR', ROOT_DIR / 'run' / str(port)))
+    state_dir.mkdir(parents=True, exist_ok=True)
+    for stale in state_dir.glob('*.json'):
+        stale.unlink()
+    os.environ['HOPHOP_STATE_DIR'] = str(state_dir)
+    os.environ.setdefault('HOPHOP_INTERNAL_TOKEN', secrets.token_hex(16))
+    
+    run_gunicorn('hophop.web_server.server:app', f'{host}:{port}', workers, timeout)
+
 def run_server(bind: Optional[str] = "0.0.0.0:5000", 
               workers: int = 1,
-              timeout: int = 30):
+              timeout: int = 30,
+              production: Optional[bool] = None):
     """Main entry point for the web server"""
+    if production is None:
+        production = os.getenv('HOPHOP_WEB_MODE', 'development') == 'production'
+    workers = int(os.getenv('HOPHOP_WEB_WORKERS', workers))
+    
     host, port_str = bind.split(':')
     initial_port = int(port_str)
     
@@ -277,315 +754,321 @@ def run_server(bind: Optional[str] = "0.0.0.0:5000",
         print(f"Error: {e}")
         exit(1)
     
-    # Get server name and generate screen name the same way rust server does
-    server_name = os.getenv('SERVER_NAME', 'HopHop Build server | Main')
-    screen_name = server_name.lower().replace(" ", "_").replace("|", "").replace("\"", "").strip()
-    
-    # Start the console output monitoring thread (renamed from screen_thread)
-    console_thread = threading.Thread(target=get_screen_output, args=(screen_name,), daemon=True)
-    console_thread.start()
-    
-    # Initialize RCON in a separate thread
-    rcon_thread = init_rcon()
-    
-    # Start periodic status updates
-    def status_updater():
-        while True:
-            if rcon_client.connected:
-                get_server_status()
-            time.sleep(30)  # Update every 30 seconds
+    # Print server information
+    print_server_info(host, port, workers if production else 1)
     
-    status_thread = threading.Thread(target=status_updater, daemon=True)
-    status_thread.start()
+    if production:
+        run_production(host, port, workers, timeout)
+        return
     
-    # Print server information
-    print_server_info(host, port, workers)
+    # With the reloader on, this process only watches files and the child it spawns
+    # (WERKZEUG_RUN_MAIN=true) serves, so only the child runs the background services
+    use_reloader = os.getenv('HOPHOP_WEB_RELOAD', '1') == '1'
+    if not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
     
-    # Run with Flask-SocketIO's server instead of Gunicorn
-    socketio.run(app, host=host, port=port, debug=True, allow_unsafe_werkzeug=True)
+    # Development server with the reloader and debugger
+    try:
+        socketio.run(app, host=host, port=port, debug=True, use_reloader=use_reloader,
+                     allow_unsafe_werkzeug=True)
+    finally:
+        stop_background_services()
+
+# Parsed .env/.env.local, re-read only when the files change
+config_service = ConfigService(ROOT_DIR)
 
 @app.route('/api/config', methods=['GET'])
 def get_config():
-    print("Config endpoint called")
-    
-    # Read both .env files
-    default_config = {}
-    env_path = ROOT_DIR / '.env'
-    print(f"Looking for .env at: {env_path.absolute()}")  # Use absolute path in log
-    if env_path.exists():
-        print(".env file found")
-        with open(env_path, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    try:
-                        key, value = line.strip().split('=', 1)
-                        default_config[key.strip()] = value.strip()  # Added strip() to clean up values
-                    except ValueError:
-                        continue
-
-    current_config = {}
-    env_local_path = ROOT_DIR / '.env.local'
-    print(f"Looking for .env.local at: {env_local_path.absolute()}")  # Use absolute path in log
-    if env_local_path.exists():
-        print(".env.local file found")
-        with open(env_local_path, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    try:
-                        key, value = line.strip().split('=', 1)
-                        current_config[key.strip()] = value.strip()  # Added strip() to clean up values
-                    except ValueError:
-                        continue
-    else:
-        current_config = default_config.copy()
-
-    print(f"Default config: {default_config}")
-    print(f"Current config: {current_config}")
-    
-    response = {
-        'current': current_config,
-        'defaults': default_config
-    }
-    print(f"Sending response: {response}")
+    response = config_service.get()
+    response['live_keys'] = sorted(LIVE_KEYS)
     return jsonify(response)
 
 @app.route('/api/config', methods=['POST'])
 def update_config():
     try:
         new_config = request.json
-        env_local_path = ROOT_DIR / '.env.local'
+        changed, groups = config_service.update(new_config)
         
-        # Write to .env.local
-        with open(env_local_path, 'w') as f:
-            for key, value in new_config.items():
-                f.write(f"{key}={value}\n")
+        # Apply what the running server can take over RCON, the rest waits for a restart
+        applied = config_service.apply_live(changed, control_rcon)
+        restart_required = groups['restart'] + [key for key in groups['live'] if key not in applied]
         
-        # Reload environment variables
-        load_dotenv(ROOT_DIR / '.env')  # Load default values
-        load_dotenv(ROOT_DIR / '.env.local', override=True)  # Override with local values
-        
-        return jsonify({'status': 'success', 'message': 'Configuration updated successfully'})
+        if restart_required:
+            message = f"Configuration saved, restart the server to apply: {', '.join(restart_required)}"
+        else:
+            message = 'Configuration updated successfully'
+        return jsonify({
+            'status': 'success',
+            'message': message,
+            'applied': applied,
+            'restart_required': restart_required
+        })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# Owners and moderators, applied to the running server over RCON as they change
+server_users = ServerUsers(
+    Path(os.getenv('SERVER_USERS_FILE', ROOT_DIR / 'users.json')),
+    ROOT_DIR / 'rust_server' / 'server' / 'carbon' / 'cfg' / 'users.cfg',
+    ROOT_DIR / 'src' / 'hophop' / 'rust_server' / 'users.example.json'
+)
+
+@app.route('/api/users', methods=['GET'])
+def list_server_users():
+    return jsonify({'users': server_users.list(), 'invalid': server_users.invalid, 'error': server_users.load_error})
+
+@app.route('/api/users/<steamid>', methods=['PUT'])
+def put_server_user(steamid):
+    """Add an owner or moderator, or change their name or role: {"name", "role"}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        user = server_users.put(steamid, data.get('name'), data.get('role', 'owner'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'user': user, 'sync': server_users.sync(control_rcon)})
+
+@app.route('/api/users/<steamid>', methods=['DELETE'])
+def delete_server_user(steamid):
+    try:
+        if not server_users.remove(steamid):
+            return jsonify({'error': f'No owner or moderator {steamid}'}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'status': 'success', 'sync': server_users.sync(control_rcon)})
+
+@app.route('/api/users/sync', methods=['POST'])
+def sync_server_users():
+    """Re-send whatever differs between users.json and the server's users.cfg, re-reading users.json first"""
+    server_users.load()
+    result = server_users.sync(control_rcon)
+    return jsonify(result), 409 if 'error' in result else 200
+
+# Longest a batch or streamed command may run before giving up
+RCON_BATCH_TIMEOUT = 30.0
+RCON_STREAM_TIMEOUT = 300.0
+# Each stream holds one of the scheduler's in flight slots for as long as it runs, so fewer may run
+# at once than there are slots
+RCON_MAX_STREAMS = int(os.getenv('RCON_MAX_STREAMS', '2'))
+rcon_streams = threading.BoundedSemaphore(RCON_MAX_STREAMS)
+RCON_MAX_BATCH = 200  # Commands per /api/rcon/batch request
+
+def request_backlog(data: dict, default: int = 100, maximum: int = 1000) -> int:
+    """How many recent lines a subscribing client asked for; raises ValueError if it isn't a number"""
+    try:
+        return max(0, min(int(data.get('backlog', default)), maximum))
+    except (TypeError, ValueError):
+        raise ValueError('backlog must be a number of lines')
+
+def request_timeout(data: dict, default: float, maximum: float) -> float:
+    """The `timeout` of a request body in seconds, capped at maximum; raises ValueError if it isn't a positive number"""
+    try:
+        timeout = float(data.get('timeout', default))
+    except (TypeError, ValueError):
+        raise ValueError('timeout must be a number of seconds')
+    if not 0 < timeout < float('inf'):
+        raise ValueError('timeout must be a positive number of seconds')
+    return min(timeout, maximum)
+
 @app.route('/api/rcon', methods=['POST'])
 def rcon_command():
     try:
-        data = request.get_json()
-        command = data.get('command')
-        print(f"\nRCON command received: '{command}'")
-
-        if not command:
-            print("No command provided")
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not data.get('command'):
             return jsonify({'error': 'No command provided'}), 400
+        command = data['command']
+        try:
+            timeout = request_timeout(data, 5.0, RCON_BATCH_TIMEOUT)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         if not rcon_client.connected:
-            print("RCON not connected")
             return jsonify({'error': 'RCON not connected'}), 503
 
-        # Create an event to wait for the response
-        response_event = threading.Event()
-        response_data = {'response': None}
-
-        def handle_response(response):
-            print(f"Raw RCON response: {response}")
-            response_data['response'] = response
-            response_event.set()
-
-        # Send command and wait for response
-        print("Sending command to RCON client...")
-        rcon_client.send_command(command, handle_response)
-        
-        # Wait for response with timeout
-        if response_event.wait(timeout=5.0):
-            print(f"Final response to send: {response_data['response']}")
-            return jsonify({'response': response_data['response']})
-        else:
-            print("Command timed out")
-            return jsonify({'error': 'Command timed out'}), 504
+        # Waiting on the future yields to the gevent hub instead of blocking a worker
+        future = interactive_rcon.send_command_future(command, timeout)
+        try:
+            response = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            interactive_rcon.forget(future)
+            return jsonify({'error': 'Command timed out, use /api/rcon/stream for long running commands'}), 504
+        return jsonify({'response': response})
 
     except Exception as e:
         print(f"Error in RCON command: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def get_server_process():
-    """Get the current Rust server process if running"""
-    if SERVER_PROCESS and SERVER_PROCESS.poll() is None:
-        return SERVER_PROCESS
-    return None
+@app.route('/api/rcon/connection', methods=['GET'])
+def get_rcon_connection_stats():
+    """Get each server's reconnect phase, attempts and port open -> connected times"""
+    return jsonify({backend.name: backend.rcon.stats() for backend in rcon_hub.list()})
 
-def is_server_running():
-    """Check if the server process is running"""
-    process = get_server_process()
-    return process is not None
+@app.route('/api/rcon/scheduler', methods=['GET'])
+def get_rcon_scheduler_stats():
+    """Get RCON queue depths, in flight commands, latency and shedding counters"""
+    return jsonify(rcon_scheduler.stats())
 
-def start_server():
-    """Start the Rust server"""
-    global SERVER_PROCESS, STARTUP_LOGS
-    
-    if is_server_running():
-        return False, "Server is already running"
-    
-    STARTUP_LOGS = []
+@app.route('/api/rcon/batch', methods=['POST'])
+def rcon_batch():
+    """Send many commands over the RCON socket at once and return their results in order"""
     try:
-        # Unix-style command using bash
-        activate_cmd = str(VENV_PATH / 'bin' / 'activate')
-        cmd = ['/bin/bash', '-c', f'. "{activate_cmd}" && hophop-rust-server']
-        
-        # Start the server process
-        SERVER_PROCESS = subprocess.Popen(
-            cmd,
-            shell=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-        
-        # Start a thread to monitor the output
-        def monitor_output():
-            while SERVER_PROCESS and SERVER_PROCESS.poll() is None:
-                line = SERVER_PROCESS.stdout.readline()
-                if line:
-                    STARTUP_LOGS.append(line.strip())
-                    socketio.emit('server_control', {
-                        'status': 'starting',
-                        'message': line.strip()
-                    })
-            
-            # Process ended
-            if SERVER_PROCESS and SERVER_PROCESS.returncode != 0:
-                socketio.emit('server_control', {
-                    'status': 'error',
-                    'message': f'Server crashed with code {SERVER_PROCESS.returncode}'
-                })
-        
-        threading.Thread(target=monitor_output, daemon=True).start()
-        return True, "Server starting"
-        
-    except Exception as e:
-        return False, f"Failed to start server: {str(e)}"
+        data = request.get_json(silent=True)
+        commands = data.get('commands') if isinstance(data, dict) else None
+        if not commands or not isinstance(commands, list):
+            return jsonify({'error': 'No commands provided'}), 400
+        if len(commands) > RCON_MAX_BATCH:
+            return jsonify({'error': f'At most {RCON_MAX_BATCH} commands per batch'}), 400
+        try:
+            timeout = request_timeout(data, RCON_BATCH_TIMEOUT, RCON_BATCH_TIMEOUT)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-def stop_server():
-    """Stop the Rust server"""
-    if not is_server_running():
-        return False, "Server is not running"
-    
-    try:
-        # Try graceful shutdown first
-        if rcon_client.connected:
-            rcon_client.send_command('quit')
-            time.sleep(2)  # Give it a moment to shut down
-        
-        # Force kill if still running
-        process = get_server_process()
-        if process and process.poll() is None:
-            if os.name == 'nt':
-                process.terminate()
-            else:
-                process.send_signal(signal.SIGTERM)
-            
-            # Wait for process to end
+        if not rcon_client.connected:
+            return jsonify({'error': 'RCON not connected'}), 503
+
+        deadline = time.time() + timeout
+        futures = interactive_rcon.send_batch([str(command) for command in commands], timeout)
+
+        results = []
+        for command, future in zip(commands, futures):
             try:
-                process.wait(timeout=10)
-            except subprocess.TimeoutExpired:
-                process.kill()  # Force kill if it doesn't respond
-        
-        return True, "Server stopped"
+                response = future.result(timeout=max(0, deadline - time.time()))
+                results.append({'command': command, 'response': response})
+            except FutureTimeoutError:
+                interactive_rcon.forget(future)
+                results.append({'command': command, 'error': 'Command timed out'})
+        return jsonify({'results': results})
+
     except Exception as e:
-        return False, f"Failed to stop server: {str(e)}"
+        print(f"Error in RCON batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-def restart_server():
-    """Restart the Rust server"""
-    stop_success, stop_msg = stop_server()
-    if not stop_success:
-        return False, f"Failed to stop server: {stop_msg}"
-    
-    time.sleep(2)  # Give it a moment before starting again
+@app.route('/api/rcon/stream', methods=['POST'])
+def rcon_stream():
+    """Run a command and stream console output as Server-Sent Events until its response arrives"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('command'):
+        return jsonify({'error': 'No command provided'}), 400
+    command = data['command']
+    try:
+        timeout = request_timeout(data, RCON_STREAM_TIMEOUT, RCON_STREAM_TIMEOUT)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not rcon_client.connected:
+        return jsonify({'error': 'RCON not connected'}), 503
+
+    if not rcon_streams.acquire(blocking=False):
+        return jsonify({'error': f'{RCON_MAX_STREAMS} streamed commands are already running'}), 429
+
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def generate():
+        lines = queue.Queue()
+
+        def on_broadcast(message):
+            if isinstance(message.get('Message'), str):
+                lines.put(message['Message'])
+
+        rcon_client.add_message_listener(on_broadcast)
+        future = interactive_rcon.send_command_future(command, timeout)
+        deadline = time.time() + timeout
+        try:
+            while True:
+                try:
+                    yield sse('console', {'line': lines.get(timeout=0.25)})
+                except queue.Empty:
+                    pass
+                # Checked after every line too, so a busy console can't keep the stream open forever
+                if future.done():
+                    while not lines.empty():
+                        yield sse('console', {'line': lines.get_nowait()})
+                    if future.exception() is not None:
+                        yield sse('timeout', {'error': 'Command timed out'})
+                    else:
+                        yield sse('result', {'response': future.result()})
+                    break
+                if time.time() > deadline:
+                    yield sse('timeout', {'error': 'Command timed out'})
+                    break
+        finally:
+            rcon_client.remove_message_listener(on_broadcast)
+            interactive_rcon.forget(future)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(rcon_streams.release)  # Also runs if the client leaves before the stream starts
+    return response
+
+# Control actions run as jobs so requests return at once and progress is pushed to clients
+control_jobs = ControlJobQueue(max_workers=2)
+control_jobs.on_update = lambda job: broadcast('server_job', job)
+
+SERVICE_ACTIONS = ('start', 'stop', 'restart', 'update', 'enable', 'disable')
+
+def systemctl(action):
+    """Run a systemctl action on the rust server unit, raising RuntimeError if it fails"""
+    result = subprocess.run(
+        ['sudo', 'systemctl', action, 'hophop-rust-server'],
+        capture_output=True,
+        text=True
+    )
+    service_status.invalidate()
+    if result.returncode != 0:
+        raise RuntimeError(f"Service {action} failed: {result.stderr.strip()}")
+
+# Saves, quits and boots the server, waiting for its console to say each step is done
+server_lifecycle = ServerLifecycle(
+    service_status, systemctl, control_rcon, console_watcher,
+    save_timeout=int(os.getenv('SERVICE_SAVE_TIMEOUT', '300')),
+    stop_timeout=int(os.getenv('SERVICE_STOP_TIMEOUT', '120')),
+    start_timeout=int(os.getenv('SERVICE_START_TIMEOUT', '900')),
+    history_size=int(os.getenv('LIFECYCLE_HISTORY_SIZE', '20'))
+)
+
+def handle_server_ready():
+    """Tell clients the server is up once it reports startup complete"""
+    push_service_status(service_status.get(max_age=0))
+    get_server_status()
+
+server_lifecycle.on_ready = handle_server_ready
+
+def run_service_action(job):
+    """Carry out a control job one timed phase at a time"""
+    action = job.action
+    if action in ('enable', 'disable'):
+        with job.phase(f'systemctl {action}'):
+            systemctl(action)
+        return f"Auto-start on boot {action}d"
     
-    start_success, start_msg = start_server()
-    if not start_success:
-        return False, f"Failed to start server: {start_msg}"
+    if action == 'start':
+        if not server_lifecycle.boot(job):
+            return "Server already running"
+        server_lifecycle.record(job)
+        return "Server started"
     
-    return True, "Server restarting"
-
-def control_service(action):
-    """Control the rust server systemd service"""
-    try:
-        if action not in ['start', 'stop', 'restart', 'enable', 'disable']:
-            return False, "Invalid action"
-            
-        result = subprocess.run(
-            ['sudo', 'systemctl', action, 'hophop-rust-server'],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            return True, f"Service {action} command sent successfully"
-        else:
-            return False, f"Service {action} failed: {result.stderr}"
-    except Exception as e:
-        return False, f"Failed to {action} service: {str(e)}"
+    server_lifecycle.save(job)
+    server_lifecycle.shutdown(job)
+    if action == 'stop':
+        server_lifecycle.record(job)
+        return "Server stopped"
+    # The unit updates Rust and Carbon every time it starts, so an update is a restart
+    server_lifecycle.boot(job, 'boot (updating)' if action == 'update' else 'boot')
+    server_lifecycle.record(job)
+    return "Server updated" if action == 'update' else "Server restarted"
+
+def with_readiness(status):
+    """Report the unit as starting until the server has finished booting"""
+    if status['status'] == 'running' and server_lifecycle.booting:
+        status['status'] = 'starting'
+    return status
 
 def get_service_status():
     """Get detailed status of the rust server systemd service"""
-    try:
-        # Get service status
-        result = subprocess.run(
-            ['systemctl', 'status', 'hophop-rust-server'],
-            capture_output=True,
-            text=True
-        )
-        
-        # Get enabled status
-        enabled_result = subprocess.run(
-            ['systemctl', 'is-enabled', 'hophop-rust-server'],
-            capture_output=True,
-            text=True
-        )
-        is_enabled = enabled_result.returncode == 0
-        
-        # Parse status
-        status = 'stopped'
-        if 'Active: active (running)' in result.stdout:
-            status = 'running'
-        elif 'Active: activating' in result.stdout:
-            status = 'starting'
-        
-        # Get last 50 lines of logs
-        log_result = subprocess.run(
-            ['journalctl', '-u', 'hophop-rust-server', '-n', '50', '--no-pager'],
-            capture_output=True,
-            text=True
-        )
-        
-        return {
-            'status': status,
-            'logs': log_result.stdout.splitlines(),
-            'uptime': extract_uptime(result.stdout),
-            'enabled': is_enabled
-        }
-    except Exception as e:
-        print(f"Error getting service status: {e}")
-        return {
-            'status': 'unknown',
-            'logs': [],
-            'uptime': None,
-            'enabled': False
-        }
-
-def extract_uptime(status_output):
-    """Extract service uptime from systemctl status output"""
-    match = re.search(r'Active: active \(running\) since (.*?);', status_output)
-    if match:
-        try:
-            start_time = datetime.strptime(match.group(1), '%a %Y-%m-%d %H:%M:%S %Z')
-            return (datetime.now() - start_time).total_seconds()
-        except:
-            return None
-    return None
+    status = with_readiness(service_status.get())
+    status['logs'] = journal_streamer.recent(50)
+    return status
 
 @app.route('/api/server/control', methods=['POST'])
 def server_control():
@@ -594,8 +1077,13 @@ def server_control():
         data = request.get_json()
         action = data.get('action')
         
-        if action in ['start', 'stop', 'restart', 'enable', 'disable']:
-            success, message = control_service(action)
+        if action in SERVICE_ACTIONS:
+            try:
+                job, merged = control_jobs.submit(action, run_service_action)
+            except ControlJobRejected as e:
+                return jsonify({'error': str(e)}), 409
+            message = f"Server {action} already {job.state}" if merged else f"Server {action} queued"
+            return jsonify({'message': message, 'job': job.to_dict(), 'merged': merged}), 202
         elif action == 'status':
             status = get_service_status()
             return jsonify({
@@ -609,15 +1097,140 @@ def server_control():
             })
         else:
             return jsonify({'error': 'Invalid action'}), 400
-        
-        if success:
-            return jsonify({'message': message})
-        else:
-            return jsonify({'error': message}), 500
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/server/lifecycle', methods=['GET'])
+def get_lifecycle_stats():
+    """Get save, shutdown and boot durations of recent start/stop/restart jobs"""
+    return jsonify(server_lifecycle.stats())
+
+@app.route('/api/server/jobs', methods=['GET'])
+def list_control_jobs():
+    """Get recent control jobs, newest first"""
+    return jsonify({'jobs': control_jobs.list()})
+
+@app.route('/api/server/jobs/<job_id>', methods=['GET'])
+def get_control_job(job_id):
+    job = control_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+# Cron scheduled jobs created through the API, kept across restarts
+SCHEDULED_JOBS_FILE = os.path.join(ROOT_DIR, 'scheduled_jobs.json')
+SCHEDULED_JOBS = {}  # name -> job definition
+JOB_ACTIONS = ('rcon', 'save', 'restart', 'snapshot')
+SNAPSHOTS_DIR = ROOT_DIR / 'snapshots'
+SERVER_IDENTITY_DIR = ROOT_DIR / 'rust_server' / 'server' / 'carbon'
+
+def snapshot_world():
+    """Save the world and archive the server identity directory into snapshots/"""
+    if rcon_client.connected:
+        control_rcon.send_command_future('server.save', 120).result(timeout=120)
+    if not SERVER_IDENTITY_DIR.exists():
+        raise RuntimeError(f"{SERVER_IDENTITY_DIR} does not exist")
+    
+    SNAPSHOTS_DIR.mkdir(exist_ok=True)
+    name = datetime.now().strftime('carbon-%Y%m%d-%H%M%S')
+    shutil.make_archive(str(SNAPSHOTS_DIR / name), 'gztar', SERVER_IDENTITY_DIR)
+    
+    # Only keep the most recent snapshots
+    keep = int(os.getenv('SNAPSHOT_KEEP', '10'))
+    for old in sorted(SNAPSHOTS_DIR.glob('carbon-*.tar.gz'))[:-keep]:
+        old.unlink()
+
+def restart_job():
+    job, _ = control_jobs.submit('restart', run_service_action)
+    job.done.wait()
+    if job.state == 'failed':
+        raise RuntimeError(job.error)
+
+def make_job_action(job):
+    """Build the function a scheduled job runs from its definition"""
+    action = job['action']
+    if action == 'rcon':
+        return partial(control_rcon.send_command, job['command'])
+    if action == 'save':
+        return partial(control_rcon.send_command, 'server.save')
+    if action == 'restart':
+        return restart_job
+    return snapshot_world
+
+def add_scheduled_job(job):
+    """Validate a job definition and hand it to the scheduler, raising ValueError if it's invalid"""
+    if not isinstance(job, dict):
+        raise ValueError('A job must be an object')
+    if not job.get('name') or not isinstance(job['name'], str):
+        raise ValueError('Job name is required')
+    if not isinstance(job.get('cron'), str):
+        raise ValueError('cron must be a string like "0 4 * * *"')
+    if job.get('action') not in JOB_ACTIONS:
+        raise ValueError(f"Action must be one of {', '.join(JOB_ACTIONS)}")
+    if job['action'] == 'rcon' and (not job.get('command') or not isinstance(job['command'], str)):
+        raise ValueError('An rcon job needs a command')
+    try:
+        max_wait = float(job['max_wait']) if job.get('max_wait') else None
+    except (TypeError, ValueError):
+        raise ValueError('max_wait must be a number of seconds')
+    
+    job_scheduler.add_cron(
+        f"user:{job['name']}",
+        job['cron'],
+        make_job_action(job),
+        wait_for_empty=bool(job.get('wait_for_empty')),
+        max_wait=max_wait,
+        native=job['action'] == 'snapshot',  # Archiving the world blocks in zlib and file I/O
+        spec=job
+    )
+    SCHEDULED_JOBS[job['name']] = job
+
+def save_scheduled_jobs():
+    """Save scheduled jobs to file"""
+    try:
+        with open(SCHEDULED_JOBS_FILE, 'w') as f:
+            json.dump(list(SCHEDULED_JOBS.values()), f, indent=2)
+    except Exception as e:
+        print(f"Error saving scheduled jobs: {e}")
+
+# Load scheduled jobs from file if it exists
+try:
+    if os.path.exists(SCHEDULED_JOBS_FILE):
+        with open(SCHEDULED_JOBS_FILE, 'r') as f:
+            for job in json.load(f):
+                try:
+                    add_scheduled_job(job)
+                except ValueError as e:
+                    print(f"Skipping scheduled job {job.get('name')}: {e}")
+except Exception as e:
+    print(f"Error loading scheduled jobs: {e}")
+
+@app.route('/api/schedule', methods=['GET'])
+def get_schedule():
+    """Get every periodic and scheduled job with its run statistics"""
+    return jsonify({'jobs': job_scheduler.stats(), 'actions': list(JOB_ACTIONS)})
+
+@app.route('/api/schedule', methods=['POST'])
+def create_scheduled_job():
+    """Create or replace a cron scheduled job"""
+    job = request.get_json(silent=True) or {}
+    try:
+        add_scheduled_job(job)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    save_scheduled_jobs()
+    return jsonify({'message': f"Scheduled {job['name']}"})
+
+@app.route('/api/schedule/<name>', methods=['DELETE'])
+def delete_scheduled_job(name):
+    if name not in SCHEDULED_JOBS:
+        return jsonify({'error': 'Job not found'}), 404
+    job_scheduler.remove(f'user:{name}')
+    del SCHEDULED_JOBS[name]
+    save_scheduled_jobs()
+    return jsonify({'message': f'Removed {name}'})
+
 def get_plugin_status(plugin_name):
     """Check if a plugin is active (exists in plugins directory)"""
     return os.path.exists(os.path.join(PLUGINS_DIR, plugin_name))
@@ -640,17 +1253,30 @@ def list_plugins():
         data_dir = os.path.join(base_path, 'rust_server/carbon/data')
         lang_dir = os.path.join(base_path, 'rust_server/carbon/lang/en')
 
+        def file_size(path):
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return None
+
         plugins = []
         for file in os.listdir(scripts_dir):
             if file.endswith('.cs'):
                 plugin_name = file[:-3]  # Remove .cs extension
+                sizes = {
+                    'code': file_size(os.path.join(scripts_dir, file)),
+                    'config': file_size(os.path.join(config_dir, f'{plugin_name}.json')),
+                    'data': file_size(os.path.join(data_dir, f'{plugin_name}.json')),
+                    'lang': file_size(os.path.join(lang_dir, f'{plugin_name}.json'))
+                }
                 plugins.append({
                     'name': plugin_name,
                     'active': get_plugin_status(file),
                     'autoRefresh': AUTO_REFRESH_PLUGINS.get(plugin_name, False),
-                    'hasConfig': os.path.exists(os.path.join(config_dir, f'{plugin_name}.json')),
-                    'hasData': os.path.exists(os.path.join(data_dir, f'{plugin_name}.json')),
-                    'hasLang': os.path.exists(os.path.join(lang_dir, f'{plugin_name}.json'))
+                    'hasConfig': sizes['config'] is not None,
+                    'hasData': sizes['data'] is not None,
+                    'hasLang': sizes['lang'] is not None,
+                    'sizes': sizes
                 })
         return jsonify({'plugins': plugins})
     except Exception as e:
@@ -756,78 +1382,504 @@ def upload_plugin():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/plugins/bulk', methods=['POST'])
+def bulk_plugins():
+    """Activate, deactivate or delete several plugins at once: {"actions": [{"name", "action"}]}"""
+    data = request.get_json(silent=True) or {}
+    actions = data.get('actions')
+    if not isinstance(actions, list) or not actions:
+        return jsonify({'error': 'A list of actions is required'}), 400
+    try:
+        return jsonify(plugin_bundles.apply(actions))
+    except BundleError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/plugins/bundle', methods=['POST'])
+def upload_plugin_bundle():
+    """Install a zip or tar bundle sent as the body or as the multipart `file`"""
+    activate = request.args.get('activate', 'manifest')
+    if activate not in ('manifest', 'all', 'none'):
+        return jsonify({'error': 'activate must be manifest, all or none'}), 400
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        stream = request.files['file'].stream
+    else:
+        stream = request.stream
+    try:
+        return jsonify(plugin_bundles.install(stream, activate))
+    except BundleError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/plugins/bundle', methods=['GET'])
+def export_plugin_bundle():
+    """Stream a bundle of ?name=A&name=B (every plugin by default) as zip, or tar.gz with ?format=tar.gz"""
+    names = request.args.getlist('name')
+    if any(secure_filename(name) != name for name in names):
+        return jsonify({'error': 'Invalid plugin name'}), 400
+    if not names:
+        names = sorted(f[:-3] for f in os.listdir(SCRIPTS_DIR) if f.endswith('.cs'))
+    include_data = request.args.get('data', '1') != '0'
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    if request.args.get('format') == 'tar.gz':
+        body = plugin_bundles.export_tar(names, include_data)
+        mimetype, extension = 'application/gzip', 'tar.gz'
+    else:
+        body = plugin_bundles.export_zip(names, include_data)
+        mimetype, extension = 'application/zip', 'zip'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="plugins-{stamp}.{extension}"'
+    return response
+
+# Remembers where pages of large plugin data files start, per file version
+json_pager = JsonPager()
+
+def plugin_file_path(plugin_name: str, file_type: str) -> Optional[str]:
+    """Path of a plugin's code, config, data or lang file, or None for an unknown type or unsafe name"""
+    if secure_filename(plugin_name) != plugin_name:
+        return None
+    base_path = os.path.join(os.path.expanduser('~'), 'HopHopBuildServer')
+    file_paths = {
+        'code': os.path.join(base_path, 'src/hophop/rust_server/scripts', f'{plugin_name}.cs'),
+        'config': os.path.join(base_path, 'rust_server/carbon/configs', f'{plugin_name}.json'),
+        'data': os.path.join(base_path, 'rust_server/carbon/data', f'{plugin_name}.json'),
+        'lang': os.path.join(base_path, 'rust_server/carbon/lang/en', f'{plugin_name}.json')
+    }
+    return file_paths.get(file_type)
+
 @app.route('/api/plugins/<plugin_name>/<file_type>')
 def get_plugin_content(plugin_name, file_type):
-    """Get content of a specific plugin file"""
-    try:
-        base_path = os.path.join(os.path.expanduser('~'), 'HopHopBuildServer')
-        file_paths = {
-            'code': os.path.join(base_path, 'src/hophop/rust_server/scripts', f'{plugin_name}.cs'),
-            'config': os.path.join(base_path, 'rust_server/carbon/configs', f'{plugin_name}.json'),
-            'data': os.path.join(base_path, 'rust_server/carbon/data', f'{plugin_name}.json'),
-            'lang': os.path.join(base_path, 'rust_server/carbon/lang/en', f'{plugin_name}.json')
-        }
+    """Stream a plugin file, answering repeat requests with 304 and supporting Range and gzip"""
+    file_path = plugin_file_path(plugin_name, file_type)
+    if file_path is None:
+        return jsonify({'error': 'Invalid file type'}), 400
+    mimetype = 'text/plain' if file_type == 'code' else 'application/json'
 
-        if file_type not in file_paths:
-            return jsonify({'error': 'Invalid file type'}), 400
+    try:
+        mtime_ns, size = file_signature(file_path)
+    except FileNotFoundError:
+        # Empty content if the file doesn't exist
+        return Response('' if file_type == 'code' else '{}\n', mimetype=mimetype)
 
-        file_path = file_paths[file_type]
-        try:
-            with open(file_path, 'r') as f:
-                content = f.read()
-            return jsonify({'content': content})
-        except FileNotFoundError:
-            # Return empty content if file doesn't exist
-            if file_type in ['config', 'data', 'lang']:
-                return jsonify({'content': '{}\n'})  # Default JSON content
-            return jsonify({'content': ''})  # Empty content for code files
+    try:
+        gzip_body = ('Range' not in request.headers and size >= compressor.threshold
+                     and compressor.accepts(request.headers.get('Accept-Encoding'), 'gzip'))
+        etag = f'{mtime_ns:x}-{size:x}' + ('-gzip' if gzip_body else '')
+        modified = datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc)
+        # Checked before building the response so a 304 doesn't read the file
+        if not is_resource_modified(request.environ, etag, last_modified=modified):
+            response = Response(status=304)
+        elif gzip_body:
+            response = Response(compressor.gzip_stream(iter_file(file_path)), mimetype=mimetype)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = send_file(file_path, mimetype=mimetype, conditional=True, etag=etag)  # Handles Range
+        response.set_etag(etag)
+        response.last_modified = modified
+        response.vary.add('Accept-Encoding')
+        response.cache_control.no_cache = True  # Cache, but check the ETag every time
+        return response
+    except HTTPException:
+        raise  # e.g. 416 for an unsatisfiable Range
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/plugins/<plugin_name>/<file_type>/entries')
+def get_plugin_entries(plugin_name, file_type):
+    """Page through the entries of a JSON plugin file (or of the object or array at ?key=a&key=b) without loading all of it"""
+    file_path = plugin_file_path(plugin_name, file_type)
+    if file_path is None or file_type == 'code':
+        return jsonify({'error': 'Invalid file type'}), 400
+    keys = tuple(request.args.getlist('key'))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+
+    try:
+        etag = page_etag(file_signature(file_path), offset, limit, keys)
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+
+    # The client sends back the tag it got, which has a coding suffix if the page was compressed
+    cached_etag = compressor.matching_etag(etag)
+    if cached_etag:
+        response = Response(status=304)
+        etag = cached_etag
+    else:
+        try:
+            response = jsonify(json_pager.page(file_path, offset, limit, keys))
+        except KeyError as e:
+            return jsonify({'error': f'No entry {e} in {plugin_name}'}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
 @socketio.on('server_control_status')
 def handle_server_status():
     """Send server control status updates through WebSocket"""
     try:
-        status = get_server_status()  # Your existing status fetching logic
-        socketio.emit('server_control_status', status)
+        emit('server_control_status', get_service_status())
     except Exception as e:
-        socketio.emit('server_control_status', {'error': str(e)})
+        emit('server_control_status', {'error': str(e)})
+
+def push_service_status(status):
+    """Push the service status to clients when it changes state"""
+    broadcast('server_control_status', with_readiness(status))
+
+service_status.on_change = push_service_status
+
+@socketio.on('server_control_logs_subscribe')
+def handle_logs_subscribe(data=None):
+    """Start streaming journal lines to this client, resuming after its last cursor"""
+    cursor = data.get('cursor') if isinstance(data, dict) else None
+    if not isinstance(cursor, str):
+        cursor = None  # Start from the recent history instead of resuming
+    if is_owner():
+        journal_streamer.subscribe(request.sid, cursor)
+    else:
+        call_owner('/internal/journal/subscribe', {'sid': request.sid, 'cursor': cursor})
 
-def emit_server_log(log_line):
-    """Emit server log updates in real-time"""
-    try:
-        socketio.emit('server_control_logs', {'logs': log_line})
-    except Exception as e:
-        socketio.emit('server_control_status', {'error': str(e)})
+@socketio.on('server_control_logs_unsubscribe')
+def handle_logs_unsubscribe():
+    if is_owner():
+        journal_streamer.unsubscribe(request.sid)
+    else:
+        call_owner('/internal/journal/unsubscribe', {'sid': request.sid})
 
-def monitor_journal():
-    """Monitor systemd journal in real-time and emit updates"""
+@socketio.on('console_subscribe')
+def handle_console_subscribe(data=None):
+    """Send this client parsed console lines matching {level, plugin, regex} instead of the full console tail"""
+    data = data if isinstance(data, dict) else {}
     try:
-        # Start journalctl in follow mode
-        process = subprocess.Popen(
-            ['journalctl', '-u', 'hophop-rust-server', '-f', '-n', '0', '--no-pager'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
-
-        while True:
-            # Use select to check for new output without blocking
-            if select.select([process.stdout], [], [], 1)[0]:
-                line = process.stdout.readline()
-                if line:
-                    emit_server_log(line.strip())
-            
-            # Check if process is still alive
-            if process.poll() is not None:
-                break
-
-    except Exception as e:
-        print(f"Error monitoring journal: {e}")
+        console_filter = ConsoleFilter.from_dict(data)
+        backlog = request_backlog(data)
+    except ValueError as e:
+        emit('console_subscription', {'error': str(e)})
+        return
+    if is_owner():
+        console_subscriptions.subscribe(request.sid, console_filter, backlog)
+    else:
+        call_owner('/internal/console/subscribe', dict(console_filter.to_dict(), sid=request.sid, backlog=backlog))
+    fanout.mute(request.sid, 'screen_output')
+    emit('console_subscription', {'filter': console_filter.to_dict()})
+
+@socketio.on('console_unsubscribe')
+def handle_console_unsubscribe():
+    """Go back to the full console tail"""
+    if is_owner():
+        console_subscriptions.unsubscribe(request.sid)
+    else:
+        call_owner('/internal/console/unsubscribe', {'sid': request.sid})
+    fanout.unmute(request.sid, 'screen_output')
+    emit('console_subscription', {'filter': None})
+
+def send_hub_backlog(sid, name, backlog):
+    """Send a client that just joined a server's room its status and recent console lines"""
+    backend = rcon_hub.get(name)
+    if backend is None:
+        return
+    fanout.emit('hub_status', backend.snapshot(), to=sid)
+    lines = backend.recent(backlog)
+    if lines:
+        fanout.emit('hub_console', {'server': name, 'lines': lines}, to=sid)
+
+@socketio.on('server_join')
+def handle_server_join(data=None):
+    """Watch one game server: its status and console arrive as hub_status and hub_console"""
+    data = data if isinstance(data, dict) else {}
+    name = data.get('server')
+    if not isinstance(name, str) or not SERVER_NAME_PATTERN.match(name):
+        emit('server_joined', {'error': 'Invalid server name'})
+        return
+    try:
+        backlog = request_backlog(data)
+    except ValueError as e:
+        emit('server_joined', {'error': str(e)})
+        return
+    # One server at a time
+    for room in fanout.rooms(request.sid):
+        if room.startswith('server:'):
+            fanout.leave(request.sid, room)
+            leave_room(room)
+    fanout.join(request.sid, server_room(name))
+    join_room(server_room(name))  # Reached through the message queue when the owner is another worker
+    if is_owner():
+        send_hub_backlog(request.sid, name, backlog)
+    else:
+        call_owner('/internal/hub/join', {'sid': request.sid, 'server': name, 'backlog': backlog})
+    emit('server_joined', {'server': name})
+
+@socketio.on('server_leave')
+def handle_server_leave():
+    for room in fanout.rooms(request.sid):
+        if room.startswith('server:'):
+            fanout.leave(request.sid, room)
+            leave_room(room)
+    emit('server_joined', {'server': None})
+
+@app.route('/api/servers', methods=['GET'])
+def list_rcon_servers():
+    return jsonify({'servers': [backend.snapshot() for backend in rcon_hub.list()]})
+
+@app.route('/api/servers', methods=['POST'])
+def add_rcon_server():
+    """Connect to another game server: {"name", "host", "port", "password"}"""
+    data = request.get_json(silent=True) or {}
+    name, host, password = data.get('name'), data.get('host'), data.get('password')
+    if not isinstance(name, str) or not SERVER_NAME_PATTERN.match(name):
+        return jsonify({'error': 'Name must be 1-32 letters, digits, _ or -'}), 400
+    if not host or not password:
+        return jsonify({'error': 'host and password are required'}), 400
+    try:
+        backend = create_backend(name, host, int(data.get('port', 28017)), password)
+        rcon_hub.add(backend)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    save_rcon_servers()
+    return jsonify(backend.snapshot()), 201
+
+@app.route('/api/servers/<name>', methods=['DELETE'])
+def remove_rcon_server(name):
+    backend = rcon_hub.get(name)
+    if backend is None:
+        return jsonify({'error': f'No server {name}'}), 404
+    if not backend.managed:
+        return jsonify({'error': 'The primary server can\'t be removed'}), 400
+    rcon_hub.remove(name)
+    save_rcon_servers()
+    return jsonify({'status': 'success'})
+
+@app.route('/api/servers/<name>/console', methods=['GET'])
+def get_rcon_server_console(name):
+    backend = rcon_hub.get(name)
+    if backend is None:
+        return jsonify({'error': f'No server {name}'}), 404
+    limit = max(1, min(request.args.get('limit', 100, type=int), backend.console.maxlen))
+    return jsonify({'server': name, 'lines': backend.recent(limit)})
+
+@app.route('/api/servers/rcon', methods=['POST'])
+def rcon_fanout():
+    """Run one command on every server (or {"servers": [...]}) at once; servers that miss the deadline are reported as timed out"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('command'):
+        return jsonify({'error': 'No command provided'}), 400
+    command = data['command']
+    names = data.get('servers')
+    if names is not None:
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            return jsonify({'error': 'servers must be a list of server names'}), 400
+        unknown = [name for name in names if rcon_hub.get(name) is None]
+        if unknown:
+            return jsonify({'error': f"Unknown servers: {', '.join(unknown)}"}), 404
+    try:
+        timeout = request_timeout(data, rcon_hub.command_timeout, RCON_BATCH_TIMEOUT)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(rcon_hub.run_all(str(command), names, timeout))
+
+@app.route('/api/servers/<name>/rcon', methods=['POST'])
+def rcon_server_command(name):
+    if rcon_hub.get(name) is None:
+        return jsonify({'error': f'No server {name}'}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('command'):
+        return jsonify({'error': 'No command provided'}), 400
+    command = data['command']
+    try:
+        timeout = request_timeout(data, rcon_hub.command_timeout, RCON_BATCH_TIMEOUT)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    result = rcon_hub.run_all(str(command), [name], timeout)['results'][name]
+    if 'error' in result:
+        status = {'RCON not connected': 503, 'No such server': 404, 'Command timed out': 504}.get(result['error'], 502)
+        return jsonify(result), status
+    return jsonify(result)
+
+@app.route('/api/clients', methods=['GET'])
+def get_client_stats():
+    """Get outbound queue depth and drop counters for each connected client"""
+    return jsonify(fanout.stats())
+
+@app.route('/api/compression', methods=['GET'])
+def get_compression_stats():
+    """Get bytes before and after compression for HTTP responses, and Socket.IO bytes sent"""
+    return jsonify({
+        'http': compressor.stats(),
+        'socketio': {
+            'bytes_sent': fanout.bytes_sent,
+            'websocket_deflate': websocket_deflate_available()
+        }
+    })
+
+@app.route('/api/debug/blocking', methods=['GET'])
+def get_hub_blocking():
+    """Get event loop stalls over the threshold and the stacks they happened in, or ?format=collapsed"""
+    if request.args.get('format') == 'collapsed':
+        return Response(hub_monitor.collapsed(), mimetype='text/plain')
+    return jsonify(hub_monitor.stats(int(request.args.get('top', 20))))
+
+@app.route('/api/debug/profile', methods=['GET', 'POST'])
+def run_cpu_profile():
+    """Sample the event loop's stack for a few seconds and return folded stacks for a flame graph"""
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    if interval < 0.001:
+        return jsonify({'error': 'interval_ms must be at least 1'}), 400
 
-# Start the journal monitor in a separate thread
-journal_thread = threading.Thread(target=monitor_journal, daemon=True)
-journal_thread.start()
+    try:
+        result = sampling_profiler.profile(seconds, interval, request.args.get('threads') == 'all')
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    if request.args.get('format') == 'json':
+        top = sorted(result['counts'].items(), key=lambda item: item[1], reverse=True)
+        return jsonify(dict(result, counts=dict(top[:int(request.args.get('top', 50))])))
+    response = Response(collapsed(result['counts']), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(result['samples'])
+    return response
+
+@app.route('/api/memory', methods=['GET'])
+def get_memory_stats():
+    """Get RSS and its history, internal buffer sizes with caps and evictions, and tracemalloc state"""
+    return jsonify(memory_monitor.stats())
+
+@app.route('/api/memory/snapshots', methods=['POST'])
+def take_memory_snapshot():
+    """Snapshot traced allocations, starting tracemalloc first if it isn't running"""
+    key = request.args.get('key', 'lineno')
+    if key not in STAT_KEYS:
+        return jsonify({'error': f"key must be one of {', '.join(STAT_KEYS)}"}), 400
+    result = memory_monitor.snapshot(request.args.get('frames', type=int))
+    result['top'] = memory_monitor.top(result['id'], key, request.args.get('top', 25, type=int))
+    return jsonify(result), 201
+
+@app.route('/api/memory/snapshots/<int:snapshot_id>', methods=['GET'])
+def get_memory_snapshot(snapshot_id):
+    """Get the largest allocation sites in a snapshot, by ?key=lineno, filename or traceback"""
+    try:
+        return jsonify({'id': snapshot_id, 'top': memory_monitor.top(
+            snapshot_id, request.args.get('key', 'lineno'), request.args.get('top', 25, type=int))})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError:
+        return jsonify({'error': 'Snapshot not found'}), 404
+
+@app.route('/api/memory/diff', methods=['GET'])
+def diff_memory_snapshots():
+    """Get the allocation sites that grew between snapshot ?from= and ?to= (default: now)"""
+    from_id = request.args.get('from', type=int)
+    if from_id is None:
+        return jsonify({'error': 'from is required'}), 400
+    try:
+        return jsonify(memory_monitor.diff(from_id, request.args.get('to', type=int),
+                                           request.args.get('key', 'lineno'), request.args.get('top', 25, type=int)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError:
+        return jsonify({'error': 'Snapshot not found'}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/api/memory/snapshots', methods=['DELETE'])
+def stop_memory_tracing():
+    """Drop every snapshot and stop tracing allocations"""
+    memory_monitor.stop_tracing()
+    return jsonify({'message': 'Stopped tracing memory allocations'})
+
+@app.route('/api/console/subscriptions', methods=['GET'])
+def get_console_subscriptions():
+    """Get each client's console filter and how many lines it has been sent"""
+    return jsonify(console_subscriptions.stats())
+
+@app.route('/api/health', methods=['GET'])
+def get_health():
+    """Get the state, health and startup time of each background service"""
+    health = services.health()
+    health['pid'] = os.getpid()
+    health['import_ms'] = IMPORT_MS
+    return jsonify(health), 200 if health['healthy'] else 503
+
+@app.route('/api/server/journal', methods=['GET'])
+def get_journal_stats():
+    """Get journal streamer state and per client drop counters"""
+    return jsonify(journal_streamer.stats())
+
+@app.route('/api/plugins/reload-timings', methods=['GET'])
+def get_plugin_reload_timings():
+    """Get the last save-to-loaded timing of each auto refreshed plugin"""
+    return jsonify({
+        'timings': list(plugin_reloader.timings.values()),
+        'pending': sorted(plugin_reloader.pending.keys()),
+        'awaiting': sorted(plugin_reloader.awaiting.keys())
+    })
+
+@app.route('/api/plugins/profile', methods=['GET'])
+def get_plugin_profile():
+    """Get per plugin compile/load statistics, sorted by the requested column"""
+    sort = request.args.get('sort', 'last_compile_ms')
+    descending = request.args.get('order', 'desc') != 'asc'
+    return jsonify({
+        'plugins': plugin_profiler.table(sort, descending),
+        'profile_output': plugin_profiler.profile_output
+    })
+
+@app.route('/api/logs/search', methods=['GET'])
+def search_logs():
+    """Search stored console lines by words, minimum level, plugin and time range (unix seconds)"""
+    args = request.args
+    try:
+        # SQLite doesn't yield to gevent, so the flush and query run on a native thread
+        result = gevent.get_hub().threadpool.apply(console_log_store.search, kwds=dict(
+            terms=args.get('q'),
+            level=args.get('level'),
+            plugin=args.get('plugin'),
+            since=args.get('since', type=float),
+            until=args.get('until', type=float),
+            before_id=args.get('before_id', type=int),
+            limit=args.get('limit', 100, type=int)
+        ))
+    except sqlite3.Error as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/api/logs', methods=['GET'])
+def get_log_store_stats():
+    return jsonify(gevent.get_hub().threadpool.apply(console_log_store.stats))
+
+@app.route('/api/players', methods=['GET'])
+def get_players():
+    """Get online players; player_delta events carry changes after `version`"""
+    return jsonify(player_state.snapshot())
+
+@app.route('/api/players/<steamid>', methods=['GET'])
+def get_player(steamid):
+    player = player_state.get(steamid)
+    if not player:
+        return jsonify({'error': 'Player not online'}), 404
+    return jsonify(player)
+
+@app.route('/api/server/saves', methods=['GET'])
+def get_save_stats():
+    """Get world save duration percentiles and how they track entity count"""
+    return jsonify(save_telemetry.stats(request.args.get('recent', 50, type=int)))
+
+@app.route('/api/server/saves/reset', methods=['POST'])
+def reset_save_stats():
+    save_telemetry.reset()
+    return jsonify({'message': 'Save history cleared'})
+
+@app.route('/api/plugins/profile/reset', methods=['POST'])
+def reset_plugin_profile():
+    """Clear collected plugin statistics"""
+    plugin_profiler.reset()
+    return jsonify({'status': 'success'})
 
 @app.route('/api/plugins/toggle-auto-refresh', methods=['POST'])
 def toggle_auto_refresh():
@@ -859,5 +1911,7 @@ def toggle_auto_refresh():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+IMPORT_MS = round((time.perf_counter() - IMPORT_STARTED) * 1000, 2)
+
 if __name__ == "__main__":
     run_server() 
\ No newline at end of file
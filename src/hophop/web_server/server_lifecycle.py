@@ -0,0 +1,152 @@
+import re
+import threading
+import time
+from typing import Callable, List, Optional
+from .save_telemetry import SAVE_PATTERN
+from .memory import CappedDeque
+
+# Printed by Rust once a save has been written
+SAVE_COMPLETE_PATTERN = SAVE_PATTERN
+# Printed by Rust once the server accepts players
+STARTUP_COMPLETE_PATTERN = re.compile(r'Server startup complete')
+
+class Expectation:
+    """A console line some thread is waiting for"""
+
+    def __init__(self, pattern: re.Pattern, watcher: 'ConsoleWatcher'):
+        self.pattern = pattern
+        self.watcher = watcher
+        self.event = threading.Event()
+        self.line: Optional[str] = None
+
+    def wait(self, timeout: float, check: Optional[Callable[[], None]] = None) -> str:
+        """Wait for the line, calling `check` every second so the caller can bail out early"""
+        deadline = time.monotonic() + timeout
+        try:
+            while not self.event.wait(timeout=min(1.0, max(deadline - time.monotonic(), 0))):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"No console line matching '{self.pattern.pattern}' after {timeout:.0f}s")
+                if check:
+                    check()
+            return self.line
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        self.watcher.discard(self)
+
+class ConsoleWatcher:
+    """Matches incoming console lines against the expectations threads are waiting on"""
+
+    def __init__(self):
+        self.expectations: List[Expectation] = []
+        self.lock = threading.Lock()
+
+    def expect(self, pattern: re.Pattern) -> Expectation:
+        """Start watching for a line; call this before sending the command that produces it"""
+        expectation = Expectation(pattern, self)
+        with self.lock:
+            self.expectations.append(expectation)
+        return expectation
+
+    def discard(self, expectation: Expectation):
+        with self.lock:
+            if expectation in self.expectations:
+                self.expectations.remove(expectation)
+
+    def feed(self, line: str):
+        if not self.expectations:
+            return
+        with self.lock:
+            matched = [e for e in self.expectations if e.pattern.search(line)]
+            for expectation in matched:
+                self.expectations.remove(expectation)
+        for expectation in matched:
+            expectation.line = line
+            expectation.event.set()
+
+class ServerLifecycle:
+    """Saves, stops and starts the rust server, waiting on what the server reports instead of sleeping"""
+
+    def __init__(self, status_provider, systemctl: Callable[[str], None], rcon_client,
+                 console: ConsoleWatcher,
+                 save_timeout: float = 300.0,
+                 stop_timeout: float = 120.0,
+                 start_timeout: float = 900.0,
+                 history_size: int = 20):
+        self.status = status_provider
+        self.systemctl = systemctl  # systemctl(action), raises if it fails
+        self.rcon = rcon_client
+        self.console = console
+        self.save_timeout = save_timeout
+        self.stop_timeout = stop_timeout  # How long the server gets to exit after quit
+        self.start_timeout = start_timeout  # Includes the Rust and Carbon update run on every start
+        self.history = CappedDeque(maxlen=history_size)  # Durations of recent operations
+        self.booting = False  # True from starting the unit until the startup complete marker
+        self.on_ready: Optional[Callable[[], None]] = None  # Called at the startup complete marker
+
+    def save(self, job):
+        """Save the world and wait for Rust to report the save as written"""
+        if not self.rcon.connected:
+            job.progress('RCON is not connected, skipping the save')
+            return
+        with job.phase('save'):
+            expectation = self.console.expect(SAVE_COMPLETE_PATTERN)
+            self.rcon.send_command('server.save')
+            job.progress(expectation.wait(self.save_timeout))
+
+    def shutdown(self, job):
+        """Quit the server and wait for the process to exit, stopping the unit if it doesn't"""
+        with job.phase('shutdown'):
+            if self.rcon.connected:
+                self.rcon.send_command('quit')
+                try:
+                    self.status.wait_for(('stopped',), self.stop_timeout)
+                    return
+                except TimeoutError:
+                    job.progress(f'Server still running {self.stop_timeout:.0f}s after quit, stopping the unit')
+            self.systemctl('stop')
+            self.status.wait_for(('stopped',), self.stop_timeout)
+
+    def boot(self, job, phase: str = 'boot') -> bool:
+        """Start the unit and wait for the startup complete marker; False if it was already up.
+
+        `systemctl start` on an active unit does nothing, so the marker would never come.
+        """
+        current = self.status.get(max_age=0)['status']
+        if current in ('running', 'starting'):
+            job.progress(f'Server is already {current}, not starting it again')
+            return False
+
+        def check_still_running():
+            if self.status.get()['status'] == 'stopped':
+                raise RuntimeError('Server exited before startup completed')
+
+        with job.phase(phase):
+            expectation = self.console.expect(STARTUP_COMPLETE_PATTERN)
+            self.booting = True
+            try:
+                self.systemctl('start')
+                expectation.wait(self.start_timeout, check_still_running)
+            finally:
+                expectation.cancel()
+                self.booting = False
+        if self.on_ready:
+            self.on_ready()
+        return True
+
+    def record(self, job):
+        """Keep the phase durations of a finished start/stop/restart"""
+        self.history.append({
+            'action': job.action,
+            'finished_at': time.time(),
+            'phases': {phase['name']: phase['duration_ms'] for phase in job.phases},
+            'total_ms': round(sum(phase['duration_ms'] for phase in job.phases), 1)
+        })
+
+    def stats(self) -> dict:
+        history = list(self.history)
+        return {
+            'history': history,
+            'last': history[-1] if history else None
+        }
@@ -0,0 +1,188 @@
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .config_service import rcon_quote
+
+# Role -> (command that grants it, command that takes it away)
+ROLE_COMMANDS = {
+    'owner': ('ownerid', 'removeowner'),
+    'moderator': ('moderatorid', 'removemoderator')
+}
+STEAM_ID_PATTERN = re.compile(r'^7656\d{13}$')
+USERS_CFG_PATTERN = re.compile(r'^\s*(ownerid|moderatorid)\s+(\d+)(?:\s+"((?:[^"\\]|\\.)*)")?')
+
+def validate_user(steamid: str, name: Optional[str], role: str) -> dict:
+    steamid = str(steamid).strip()
+    if not STEAM_ID_PATTERN.match(steamid):
+        raise ValueError(f"Invalid Steam ID '{steamid}'")
+    if role not in ROLE_COMMANDS:
+        raise ValueError(f"Unknown role '{role}', expected one of {', '.join(ROLE_COMMANDS)}")
+    name = (name or '').strip()
+    if '\n' in name or '\r' in name:
+        raise ValueError('Name must be a single line')
+    return {'steamid': steamid, 'name': name, 'role': role}
+
+def parse_users_cfg(path: Path) -> Dict[str, dict]:
+    """Owners and moderators in a users.cfg, as the server last wrote it (steamid -> user)"""
+    users = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = USERS_CFG_PATTERN.match(line)
+            if match:
+                command, steamid, name = match.groups()
+                role = 'owner' if command == 'ownerid' else 'moderator'
+                users[steamid] = {'steamid': steamid, 'name': re.sub(r'\\(.)', r'\1', name or ''), 'role': role}
+    return users
+
+def grant_command(user: dict) -> str:
+    return f"{ROLE_COMMANDS[user['role']][0]} {user['steamid']} {rcon_quote(user['name'])}"
+
+def diff_users(current: Dict[str, dict], desired: Dict[str, dict], removals: bool = True) -> List[str]:
+    """RCON commands that turn the current owners and moderators into the desired ones.
+
+    With removals=False only grants and renames are returned, never a removeowner/removemoderator.
+    """
+    commands = []
+    for steamid, user in current.items():
+        wanted = desired.get(steamid)
+        if removals and (wanted is None or wanted['role'] != user['role']):
+            commands.append(f"{ROLE_COMMANDS[user['role']][1]} {steamid}")
+    for steamid, user in desired.items():
+        if current.get(steamid) != user and (removals or steamid not in current or
+                                             current[steamid]['role'] == user['role']):
+            commands.append(grant_command(user))  # Also renames someone who already has the role
+    return commands
+
+class ServerUsers:
+    """Owner and moderator list kept in a JSON file and applied to the running server as deltas over RCON.
+
+    hophop-rust-server writes the same file to users.cfg at startup, so changes made while the
+    server is down take effect on the next start.
+    """
+
+    def __init__(self, users_file: Path, cfg_path: Path, example_file: Optional[Path] = None):
+        self.users_file = Path(users_file)
+        self.cfg_path = Path(cfg_path)
+        if example_file and not self.users_file.exists() and Path(example_file).exists():
+            # The live list isn't tracked by git, so API edits don't dirty the checkout
+            shutil.copyfile(example_file, self.users_file)
+            print(f"Created {self.users_file} from {Path(example_file).name}")
+        self.users: Dict[str, dict] = {}
+        self.invalid: List[str] = []  # Why each skipped entry of the file was rejected
+        self.load_error: Optional[str] = None  # Set while the file can't be read; nothing is synced or saved
+        # What was last sent, trusted over users.cfg until server.writecfg rewrites the file
+        self.applied: Optional[Dict[str, dict]] = None
+        self.applied_signature: Optional[Tuple[int, int]] = None
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read the file, skipping entries that don't validate; if it can't be read at all, keep the last good list"""
+        try:
+            with open(self.users_file, 'r') as f:
+                entries = json.load(f).get('users', [])
+            if not isinstance(entries, list):
+                raise ValueError("'users' must be a list")
+        except FileNotFoundError:
+            self.users, self.invalid, self.load_error = {}, [], None
+            return
+        except Exception as e:
+            self.load_error = f"Can't read {self.users_file.name}: {e}"
+            print(f"Error loading server users, keeping the previous list and not syncing: {e}")
+            return
+
+        users, invalid = {}, []
+        for index, entry in enumerate(entries):
+            try:
+                user = validate_user(entry['steamid'], entry.get('name'), entry.get('role', 'owner'))
+                users[user['steamid']] = user
+            except (KeyError, TypeError, AttributeError, ValueError) as e:
+                invalid.append(f"Entry {index}: {e}")
+                print(f"Skipping server user entry {index}: {e}")
+        self.users, self.invalid, self.load_error = users, invalid, None
+
+    def _save(self, users: Dict[str, dict]):
+        """Write a new list; callers only adopt it once this succeeded, so memory and file agree"""
+        if self.load_error:
+            raise RuntimeError(f"{self.load_error}; fix the file before changing users")
+        tmp_path = self.users_file.with_name(f'.{self.users_file.name}.tmp')
+        users = sorted(users.values(), key=lambda user: (user['role'], user['name'].lower()))
+        with open(tmp_path, 'w') as f:
+            json.dump({'users': users}, f, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, self.users_file)
+
+    def list(self) -> List[dict]:
+        with self.lock:
+            return sorted(self.users.values(), key=lambda user: (user['role'], user['name'].lower()))
+
+    def put(self, steamid: str, name: Optional[str], role: str) -> dict:
+        user = validate_user(steamid, name, role)
+        with self.lock:
+            users = dict(self.users)
+            users[user['steamid']] = user
+            self._save(users)
+            self.users = users
+        return user
+
+    def remove(self, steamid: str) -> bool:
+        with self.lock:
+            if steamid not in self.users:
+                return False
+            users = {key: user for key, user in self.users.items() if key != steamid}
+            self._save(users)
+            self.users = users
+        return True
+
+    def _cfg_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.cfg_path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def current(self) -> Dict[str, dict]:
+        """Owners and moderators the running server has, as far as we know"""
+        signature = self._cfg_signature()
+        if self.applied is not None and signature == self.applied_signature:
+            return self.applied
+        return parse_users_cfg(self.cfg_path) if signature else {}
+
+    def sync(self, rcon_client, removals: bool = True) -> dict:
+        """Send only the changes between the server's list and ours, then have the server save users.cfg.
+
+        Nothing is sent while the file can't be read, and nobody is removed while it has invalid
+        entries (a typo'd Steam ID would otherwise take away that person's role).
+        """
+        with self.lock:
+            if self.load_error:
+                return {'commands': [], 'applied': False, 'error': self.load_error}
+            desired = dict(self.users)
+            current = self.current()
+            removals = removals and not self.invalid
+            commands = diff_users(current, desired, removals)
+            withheld = [c for c in diff_users(current, desired) if c not in commands] if not removals else []
+            result = {'commands': commands, 'applied': True}
+            if withheld:
+                result['withheld'] = withheld
+            if self.invalid:
+                result['invalid'] = list(self.invalid)
+            if not commands:
+                return result
+            if not rcon_client.connected:
+                return dict(result, applied=False)
+            for command in commands:
+                rcon_client.send_command(command)
+            rcon_client.send_command('server.writecfg')
+            # What the server has once these commands ran; withheld removals are still there
+            applied = {steamid: user for steamid, user in current.items()
+                       if f"{ROLE_COMMANDS[user['role']][1]} {steamid}" not in commands}
+            applied.update({steamid: user for steamid, user in desired.items() if grant_command(user) in commands})
+            self.applied = applied
+            self.applied_signature = self._cfg_signature()
+        print(f"Applied {len(commands)} owner/moderator change(s) over RCON")
+        return result
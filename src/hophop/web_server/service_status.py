@@ -0,0 +1,174 @@
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Unit properties needed to describe the service, fetched in a single `systemctl show`
+SERVICE_PROPERTIES = [
+    'ActiveState',
+    'SubState',
+    'UnitFileState',
+    'MainPID',
+    'ActiveEnterTimestampMonotonic'
+]
+
+# UnitFileState values for which `systemctl is-enabled` exits 0
+ENABLED_STATES = {'enabled', 'enabled-runtime', 'static', 'alias', 'indirect', 'generated', 'transient'}
+
+class SystemdClient:
+    """Reads unit properties with `systemctl show`"""
+
+    def show(self, unit: str, properties: List[str]) -> Dict[str, str]:
+        result = subprocess.run(
+            ['systemctl', 'show', unit, f"--property={','.join(properties)}", '--no-pager'],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"systemctl show exited with {result.returncode}")
+
+        values = {}
+        for line in result.stdout.splitlines():
+            if '=' in line:
+                key, value = line.split('=', 1)
+                values[key] = value
+        return values
+
+    def monotonic(self) -> float:
+        """Seconds on the clock systemd's *Monotonic timestamps are based on"""
+        return time.monotonic()
+
+class FakeSystemd:
+    """Stand-in for SystemdClient that serves properties from memory"""
+
+    def __init__(self, properties: Optional[Dict[str, str]] = None, now: float = 1000.0):
+        self.properties = {
+            'ActiveState': 'inactive',
+            'SubState': 'dead',
+            'UnitFileState': 'disabled',
+            'MainPID': '0',
+            'ActiveEnterTimestampMonotonic': '0'
+        }
+        self.properties.update(properties or {})
+        self.now = now
+        self.calls = 0
+
+    def show(self, unit: str, properties: List[str]) -> Dict[str, str]:
+        self.calls += 1
+        return {key: self.properties.get(key, '') for key in properties}
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def set_running(self, started_at: Optional[float] = None):
+        """Pretend the unit entered the running state at `started_at`"""
+        self.properties.update({
+            'ActiveState': 'active',
+            'SubState': 'running',
+            'MainPID': '4242',
+            'ActiveEnterTimestampMonotonic': str(int((started_at or self.now) * 1_000_000))
+        })
+
+    def set_stopped(self):
+        self.properties.update({
+            'ActiveState': 'inactive',
+            'SubState': 'dead',
+            'MainPID': '0',
+            'ActiveEnterTimestampMonotonic': '0'
+        })
+
+def parse_service_status(properties: Dict[str, str], now: float) -> dict:
+    """Turn raw unit properties into the status dict the control page expects"""
+    active_state = properties.get('ActiveState', '')
+    if active_state == 'active':
+        status = 'running'
+    elif active_state in ('activating', 'reloading'):
+        status = 'starting'
+    elif active_state == 'deactivating':
+        status = 'stopping'
+    elif active_state:
+        status = 'stopped'
+    else:
+        status = 'unknown'
+
+    uptime = None
+    if status == 'running':
+        try:
+            entered = int(properties.get('ActiveEnterTimestampMonotonic', '0')) / 1_000_000
+            if entered > 0:
+                uptime = max(0.0, now - entered)
+        except ValueError:
+            pass
+
+    try:
+        pid = int(properties.get('MainPID', '0')) or None
+    except ValueError:
+        pid = None
+
+    return {
+        'status': status,
+        'uptime': uptime,
+        'enabled': properties.get('UnitFileState', '') in ENABLED_STATES,
+        'pid': pid
+    }
+
+class ServiceStatusProvider:
+    """Caches the state of a systemd unit and reports transitions"""
+
+    def __init__(self, unit: str, systemd=None, ttl: float = 2.0):
+        self.unit = unit
+        self.systemd = systemd or SystemdClient()
+        self.ttl = ttl  # Seconds a fetched status is served from cache
+        self.cached: Optional[dict] = None
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+        self.on_change: Optional[Callable[[dict], None]] = None
+        self.last_state = None  # (status, enabled) last reported through on_change
+
+    def get(self, max_age: Optional[float] = None) -> dict:
+        """Return the unit status, querying systemd only when the cache is stale"""
+        max_age = self.ttl if max_age is None else max_age
+        with self.lock:
+            if self.cached and time.monotonic() - self.fetched_at < max_age:
+                return dict(self.cached)
+
+            try:
+                properties = self.systemd.show(self.unit, SERVICE_PROPERTIES)
+                status = parse_service_status(properties, self.systemd.monotonic())
+            except Exception as e:
+                print(f"Error getting service status: {e}")
+                status = {'status': 'unknown', 'uptime': None, 'enabled': False, 'pid': None}
+
+            self.cached = status
+            self.fetched_at = time.monotonic()
+
+        self._check_transition(status)
+        return dict(status)
+
+    def invalidate(self):
+        """Force the next get() to query systemd, e.g. after a control action"""
+        with self.lock:
+            self.cached = None
+
+    def poll(self) -> dict:
+        """Refresh the status, firing on_change if it moved to a new state"""
+        return self.get(max_age=0)
+
+    def wait_for(self, statuses, timeout: float, interval: float = 0.5) -> dict:
+        """Poll until the unit reaches one of `statuses`, raising TimeoutError after `timeout` seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.poll()
+            if status['status'] in statuses:
+                return status
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{self.unit} is {status['status']} after {timeout:.0f}s")
+            time.sleep(interval)
+
+    def _check_transition(self, status: dict):
+        state = (status['status'], status['enabled'])
+        if state == self.last_state:
+            return
+        self.last_state = state
+        if self.on_change:
+            self.on_change(dict(status))
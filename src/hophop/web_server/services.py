@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+class BackgroundService:
+    """A named piece of background work with explicit start/stop and a health check"""
+
+    def __init__(self, name: str, start: Callable[[], None],
+                 stop: Optional[Callable[[], None]] = None,
+                 health: Optional[Callable[[], bool]] = None,
+                 enabled: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self._start = start
+        self._stop = stop
+        self._health = health
+        self._enabled = enabled  # Checked at start time, so config can switch a service off
+        self.state = 'stopped'  # stopped, starting, running, failed, disabled
+        self.pid: Optional[int] = None  # Process the service was started in
+        self.started_at: Optional[float] = None
+        self.startup_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def running_here(self) -> bool:
+        """True if started in this process (threads don't survive a fork)"""
+        return self.state == 'running' and self.pid == os.getpid()
+
+    def start(self):
+        if self.running_here():
+            return
+        if self._enabled and not self._enabled():
+            self.state = 'disabled'
+            return
+
+        self.state = 'starting'
+        self.error = None
+        began = time.perf_counter()
+        try:
+            self._start()
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            print(f"Failed to start {self.name}: {e}")
+            return
+        self.startup_ms = round((time.perf_counter() - began) * 1000, 2)
+        self.started_at = time.time()
+        self.pid = os.getpid()
+        self.state = 'running'
+
+    def stop(self):
+        if not self.running_here():
+            return
+        try:
+            if self._stop:
+                self._stop()
+        except Exception as e:
+            print(f"Error stopping {self.name}: {e}")
+        self.state = 'stopped'
+
+    def healthy(self) -> Optional[bool]:
+        if not self.running_here():
+            return False if self.state in ('running', 'failed') else None
+        if not self._health:
+            return True
+        try:
+            return bool(self._health())
+        except Exception:
+            return False
+
+    def status(self) -> dict:
+        return {
+            'state': self.state if self.pid in (None, os.getpid()) else 'stopped',
+            'healthy': self.healthy(),
+            'startup_ms': self.startup_ms,
+            'uptime': round(time.time() - self.started_at, 1) if self.running_here() else None,
+            'error': self.error
+        }
+
+class ServiceRegistry:
+    """Starts each background service once per process and records how long that took"""
+
+    def __init__(self):
+        self.services: Dict[str, BackgroundService] = {}
+        self.order: List[str] = []
+        self.lock = threading.Lock()
+        self.boot_ms: Optional[float] = None
+
+    def register(self, name: str, start: Callable[[], None],
+                 stop: Optional[Callable[[], None]] = None,
+                 health: Optional[Callable[[], bool]] = None,
+                 enabled: Optional[Callable[[], bool]] = None) -> BackgroundService:
+        service = BackgroundService(name, start, stop, health, enabled)
+        with self.lock:
+            if name not in self.services:
+                self.order.append(name)
+            self.services[name] = service
+        return service
+
+    def start(self, name: str):
+        with self.lock:
+            self.services[name].start()
+
+    def start_all(self):
+        """Start every registered service that isn't already running in this process"""
+        began = time.perf_counter()
+        with self.lock:
+            pending = [name for name in self.order if not self.services[name].running_here()]
+            for name in pending:
+                self.services[name].start()
+        if pending:
+            self.boot_ms = round((time.perf_counter() - began) * 1000, 2)
+
+    def stop_all(self):
+        with self.lock:
+            for name in reversed(self.order):
+                self.services[name].stop()
+
+    def health(self) -> dict:
+        services = {name: self.services[name].status() for name in self.order}
+        return {
+            'healthy': all(status['healthy'] is not False for status in services.values()),
+            'boot_ms': self.boot_ms,
+            'services': services
+        }
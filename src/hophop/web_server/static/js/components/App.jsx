@@ -1,3 +1,6 @@
+// Filtered console lines kept on screen
+const MAX_FILTERED_LINES = 500;
+
 const App = () => {
     const [serverStatus, setServerStatus] = React.useState({
         status: 'unknown',
@@ -10,15 +13,23 @@ const App = () => {
     });
     const [connectionState, setConnectionState] = React.useState('disconnected');
     const [currentPage, setCurrentPage] = React.useState('status');
+    const [toast, setToast] = React.useState(null);
+    const socketRef = React.useRef(null);
+    // Console filter sent to the server, null for the full console tail
+    const consoleFilterRef = React.useRef(null);
 
     React.useEffect(() => {
         const socket = io({
             transports: ['websocket'],
             upgrade: false
         });
+        socketRef.current = socket;
 
         socket.on('connect', () => {
             setConnectionState('connected');
+            if (consoleFilterRef.current) {
+                socket.emit('console_subscribe', { ...consoleFilterRef.current, backlog: 0 });
+            }
         });
 
         socket.on('disconnect', () => {
@@ -37,7 +48,7 @@ const App = () => {
         });
 
         socket.on('screen_output', (msg) => {
-            if (msg && msg.data) {
+            if (msg && msg.data && !consoleFilterRef.current) {
                 setServerStatus(prev => ({
                     ...prev,
                     console: prev.console ? `${prev.console}\n${msg.data}` : msg.data
@@ -45,11 +56,47 @@ const App = () => {
             }
         });
 
+        // Filtered console lines, sent instead of screen_output once subscribed
+        socket.on('console_lines', (msg) => {
+            if (!msg || !msg.lines) return;
+            const text = msg.lines.map(line => line.text).join('\n');
+            setServerStatus(prev => {
+                const lines = (prev.console ? `${prev.console}\n${text}` : text).split('\n');
+                return { ...prev, console: lines.slice(-MAX_FILTERED_LINES).join('\n') };
+            });
+        });
+
+        socket.on('console_subscription', (msg) => {
+            if (msg && msg.error) {
+                consoleFilterRef.current = null;
+                setToast({ message: msg.error, type: 'error' });
+            }
+        });
+
+        // A world save took longer than SAVE_WARN_MS
+        socket.on('save_warning', (record) => {
+            setToast({
+                message: `Slow world save: ${(record.total_ms / 1000).toFixed(2)}s for ${record.entities.toLocaleString()} entities`,
+                type: 'error'
+            });
+        });
+
         socket.emit('request_status');
 
         return () => socket.disconnect();
     }, []);
 
+    const handleConsoleFilter = (filter) => {
+        consoleFilterRef.current = filter;
+        setServerStatus(prev => ({ ...prev, console: '' }));
+        if (!socketRef.current) return;
+        if (filter) {
+            socketRef.current.emit('console_subscribe', filter);
+        } else {
+            socketRef.current.emit('console_unsubscribe');
+        }
+    };
+
     const getStatusMessage = () => {
         switch (connectionState) {
             case 'connected': return 'Connected to WebSocket';
@@ -70,7 +117,7 @@ const App = () => {
                         </div>
                         <div className="flex-1 min-h-0">
                             <div className="bg-surface-light rounded-lg p-4 h-full flex flex-col">
-                                <ServerStatus status={serverStatus} />
+                                <ServerStatus status={serverStatus} onConsoleFilter={handleConsoleFilter} />
                             </div>
                         </div>
                     </div>
@@ -89,6 +136,13 @@ const App = () => {
     return (
         <Layout currentPage={currentPage} onPageChange={setCurrentPage}>
             {renderPage()}
+            {toast && (
+                <Toast
+                    message={toast.message}
+                    type={toast.type}
+                    onClose={() => setToast(null)}
+                />
+            )}
         </Layout>
     );
 }; 
\ No newline at end of file
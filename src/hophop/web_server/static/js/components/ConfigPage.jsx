@@ -250,7 +250,8 @@ const ConfigPage = () => {
             
             if (!response.ok) throw new Error('Failed to save configuration');
             
-            showToast('Configuration saved successfully', 'success');
+            const result = await response.json();
+            showToast(result.message || 'Configuration saved successfully', 'success');
             await fetchConfig();
         } catch (err) {
             showToast('Failed to save configuration', 'error');
@@ -1,4 +1,4 @@
-const ConsoleOutput = ({ output }) => {
+const ConsoleOutput = ({ output, onFilterChange }) => {
     const [rconCommand, setRconCommand] = React.useState('');
     const [isLoading, setIsLoading] = React.useState(false);
     const [showSuggestions, setShowSuggestions] = React.useState(false);
@@ -8,6 +8,23 @@ const ConsoleOutput = ({ output }) => {
     const consoleRef = React.useRef(null);
     const [isConnected, setIsConnected] = React.useState(false);
     const [autoScroll, setAutoScroll] = React.useState(true);
+    const [filter, setFilter] = React.useState({ level: '', plugin: '', regex: '' });
+    const [filterActive, setFilterActive] = React.useState(false);
+
+    const applyFilter = (e) => {
+        e.preventDefault();
+        if (!onFilterChange) return;
+        const active = Object.fromEntries(Object.entries(filter).filter(([, value]) => value));
+        const hasFilter = Object.keys(active).length > 0;
+        setFilterActive(hasFilter);
+        onFilterChange(hasFilter ? active : null);
+    };
+
+    const clearFilter = () => {
+        setFilter({ level: '', plugin: '', regex: '' });
+        setFilterActive(false);
+        if (onFilterChange) onFilterChange(null);
+    };
 
     const RCON_COMMANDS = [
         { command: 'admin.mutevoice', args: '"player"', desc: 'Prevent a player from speaking in-game' },
@@ -250,6 +267,41 @@ const ConsoleOutput = ({ output }) => {
 
     return (
         <div className="h-full flex flex-col">
+            {/* Console Filter, evaluated on the server */}
+            {onFilterChange && (
+                <form onSubmit={applyFilter} className="flex gap-2 pb-2 text-sm">
+                    <select
+                        value={filter.level}
+                        onChange={(e) => setFilter({ ...filter, level: e.target.value })}
+                        className="bg-neutral-800 p-2 rounded text-white"
+                    >
+                        <option value="">All levels</option>
+                        <option value="warning">Warnings and errors</option>
+                        <option value="error">Errors only</option>
+                    </select>
+                    <input
+                        type="text"
+                        value={filter.plugin}
+                        onChange={(e) => setFilter({ ...filter, plugin: e.target.value })}
+                        placeholder="Plugin"
+                        className="w-40 bg-neutral-800 p-2 rounded text-white placeholder-neutral-400"
+                    />
+                    <input
+                        type="text"
+                        value={filter.regex}
+                        onChange={(e) => setFilter({ ...filter, regex: e.target.value })}
+                        placeholder="Regex"
+                        className="flex-1 bg-neutral-800 p-2 rounded text-white placeholder-neutral-400 font-mono"
+                    />
+                    <button type="submit" className="px-3 py-2 rounded bg-blue-500 hover:bg-blue-600 text-white">Filter</button>
+                    {filterActive && (
+                        <button type="button" onClick={clearFilter} className="px-3 py-2 rounded bg-neutral-700 hover:bg-neutral-600 text-white">
+                            Clear
+                        </button>
+                    )}
+                </form>
+            )}
+
             {/* Console Output */}
             <div className="flex-1 min-h-0 bg-surface border border-surface-lighter">
                 <div 
@@ -0,0 +1,72 @@
+const PlayerList = () => {
+    const [players, setPlayers] = React.useState({});
+    const versionRef = React.useRef(0);
+
+    const fetchPlayers = async () => {
+        try {
+            const response = await fetch('/api/players');
+            const data = await response.json();
+            const bySteamId = {};
+            data.players.forEach(player => { bySteamId[player.steamid] = player; });
+            versionRef.current = data.version;
+            setPlayers(bySteamId);
+        } catch (error) {
+            console.error('Error fetching players:', error);
+        }
+    };
+
+    React.useEffect(() => {
+        fetchPlayers();
+
+        const socket = io({
+            transports: ['websocket'],
+            upgrade: false
+        });
+
+        // Apply join/leave/update deltas, reloading the list if we missed one
+        socket.on('player_delta', (delta) => {
+            if (delta.version <= versionRef.current) return;
+            if (delta.version !== versionRef.current + 1) {
+                fetchPlayers();
+                return;
+            }
+            versionRef.current = delta.version;
+            setPlayers(prev => {
+                const next = { ...prev };
+                if (delta.op === 'leave') {
+                    delete next[delta.steamid];
+                } else if (delta.op === 'join') {
+                    next[delta.steamid] = delta.player;
+                } else if (next[delta.steamid]) {
+                    next[delta.steamid] = { ...next[delta.steamid], ...delta.fields };
+                }
+                return next;
+            });
+        });
+
+        socket.on('connect', fetchPlayers);
+
+        return () => socket.disconnect();
+    }, []);
+
+    const list = Object.values(players).sort((a, b) => a.name.localeCompare(b.name));
+    if (!list.length) return null;
+
+    return (
+        <div className="bg-surface p-4 border border-surface-lighter rounded-lg">
+            <span className="text-neutral-400 text-sm">Online players</span>
+            <div className="mt-2 flex flex-wrap gap-2">
+                {list.map(player => (
+                    <span key={player.steamid}
+                        className="px-2 py-1 rounded bg-surface-light text-sm text-neutral-700"
+                        title={`${player.steamid}${player.ping != null ? ` · ${player.ping}ms` : ''} · ${player.kills} kills / ${player.deaths} deaths`}
+                    >
+                        {player.name}
+                    </span>
+                ))}
+            </div>
+        </div>
+    );
+};
+
+window.PlayerList = PlayerList;
@@ -1,3 +1,14 @@
+// Bigger files open as a read-only paged view instead of in the editor
+const MAX_EDITOR_BYTES = 2 * 1024 * 1024;
+const ENTRIES_PAGE_SIZE = 100;
+const BUNDLE_EXTENSIONS = ['.zip', '.tar', '.tar.gz', '.tgz'];
+
+const formatBytes = (bytes) => {
+    if (bytes >= 1024 * 1024) return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+    if (bytes >= 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+    return `${bytes} B`;
+};
+
 const PluginsPage = () => {
     const [plugins, setPlugins] = React.useState([]);
     const [isLoading, setIsLoading] = React.useState(false);
@@ -10,6 +21,9 @@ const PluginsPage = () => {
     const containerRef = React.useRef(null);
     const [view, setView] = React.useState(null);
     const [selectedFile, setSelectedFile] = React.useState(null);
+    // Entries loaded so far when a large file is open as a paged view
+    const [pagedView, setPagedView] = React.useState(null);
+    const [pagedPath, setPagedPath] = React.useState('');
 
     React.useEffect(() => {
         fetchPlugins();
@@ -17,9 +31,11 @@ const PluginsPage = () => {
         // Listen for plugin refresh events
         const socket = window.socket || window.io();
         socket.on('plugin_refreshed', handlePluginRefreshed);
+        socket.on('plugin_reloaded', handlePluginReloaded);
         
         return () => {
             socket.off('plugin_refreshed', handlePluginRefreshed);
+            socket.off('plugin_reloaded', handlePluginReloaded);
         };
     }, []);
     
@@ -29,6 +45,14 @@ const PluginsPage = () => {
         fetchPlugins();
     };
 
+    const handlePluginReloaded = (data) => {
+        if (data.status === 'loaded') {
+            showToast(`Plugin ${data.name} loaded ${data.save_to_loaded_ms}ms after save`, 'success');
+        } else {
+            showToast(`Plugin ${data.name} reload ${data.status}`, 'error');
+        }
+    };
+
     const fetchPlugins = async () => {
         try {
             const response = await fetch('/api/plugins');
@@ -40,13 +64,58 @@ const PluginsPage = () => {
         }
     };
 
+    const pluginFileUrl = (plugin, fileType) => `/api/plugins/${encodeURIComponent(plugin.name)}/${fileType}`;
+
     const fetchPluginContent = async (plugin, fileType = 'code') => {
+        const size = plugin.sizes && plugin.sizes[fileType];
+        if (fileType !== 'code' && size > MAX_EDITOR_BYTES) {
+            setPagedPath('');
+            await fetchEntries(plugin, fileType, [], 0, null);
+            return;
+        }
         try {
-            const response = await fetch(`/api/plugins/${encodeURIComponent(plugin.name)}/${fileType}`);
+            // Revalidated with the file's ETag, so reopening an unchanged file is a 304
+            const response = await fetch(pluginFileUrl(plugin, fileType), { cache: 'no-cache' });
+            if (!response.ok) {
+                const data = await response.json();
+                throw new Error(data.error || 'Failed to load file');
+            }
+            const content = await response.text();
+            setPagedView(null);
+            setEditorContent(content);
+            setOriginalContent(content);
+            setSelectedPlugin(plugin);
+            setSelectedFileType(fileType);
+        } catch (error) {
+            showToast(error.message, 'error');
+        }
+    };
+
+    const formatEntries = (view) => {
+        const describe = (entry) => entry.truncated
+            ? `<${entry.type}, ${formatBytes(entry.bytes)}: open it by its path>`
+            : entry.value;
+        const value = view.type === 'object'
+            ? Object.fromEntries(view.entries.map(entry => [entry.key, describe(entry)]))
+            : view.entries.map(describe);
+        return JSON.stringify(value, null, 2);
+    };
+
+    const fetchEntries = async (plugin, fileType, keys, offset, previous) => {
+        try {
+            const params = new URLSearchParams({ offset, limit: ENTRIES_PAGE_SIZE });
+            keys.forEach(key => params.append('key', key));
+            const response = await fetch(`${pluginFileUrl(plugin, fileType)}/entries?${params}`, { cache: 'no-cache' });
             const data = await response.json();
             if (data.error) throw new Error(data.error);
-            setEditorContent(data.content);
-            setOriginalContent(data.content);
+            const view = {
+                ...data,
+                entries: previous ? [...previous.entries, ...data.entries] : data.entries
+            };
+            const content = formatEntries(view);
+            setPagedView(view);
+            setEditorContent(content);
+            setOriginalContent(content);
             setSelectedPlugin(plugin);
             setSelectedFileType(fileType);
         } catch (error) {
@@ -54,6 +123,12 @@ const PluginsPage = () => {
         }
     };
 
+    const openPagedPath = (e) => {
+        e.preventDefault();
+        const keys = pagedPath.split('.').map(key => key.trim()).filter(Boolean);
+        fetchEntries(selectedPlugin, selectedFileType, keys, 0, null);
+    };
+
     const savePluginContent = async () => {
         if (!selectedPlugin) return;
         
@@ -79,12 +154,14 @@ const PluginsPage = () => {
         }
     };
 
+    const isBundle = (file) => BUNDLE_EXTENSIONS.some(ext => file.name.endsWith(ext));
+
     const handleFileChange = (event) => {
         const file = event.target.files[0];
-        if (file && file.name.endsWith('.cs')) {
+        if (file && (file.name.endsWith('.cs') || isBundle(file))) {
             setSelectedFile(file);
         } else {
-            showToast('Please select a valid C# (.cs) file', 'error');
+            showToast('Please select a C# (.cs) file or a plugin bundle (.zip, .tar.gz)', 'error');
             event.target.value = null;
         }
     };
@@ -97,7 +174,9 @@ const PluginsPage = () => {
 
         setIsLoading(true);
         try {
-            const response = await fetch('/api/plugins/upload', {
+            // Bundles are installed in one go and their active plugins deployed together
+            const bundle = isBundle(selectedFile);
+            const response = await fetch(bundle ? '/api/plugins/bundle' : '/api/plugins/upload', {
                 method: 'POST',
                 body: formData
             });
@@ -105,7 +184,9 @@ const PluginsPage = () => {
             
             if (data.error) throw new Error(data.error);
             
-            showToast('Plugin uploaded successfully', 'success');
+            showToast(bundle
+                ? `Installed ${data.plugins.length} plugin(s), deployed ${data.deployed.length}`
+                : 'Plugin uploaded successfully', 'success');
             setSelectedFile(null);
             if (fileInputRef.current) {
                 fileInputRef.current.value = null;
@@ -226,6 +307,16 @@ const PluginsPage = () => {
     };
 
     const handleDownload = () => {
+        if (pagedView) {
+            // Only part of the file is loaded, let the browser fetch all of it
+            const link = document.createElement('a');
+            link.href = pluginFileUrl(selectedPlugin, selectedFileType);
+            link.download = `${selectedPlugin.name}.json`;
+            document.body.appendChild(link);
+            link.click();
+            document.body.removeChild(link);
+            return;
+        }
         try {
             const extension = selectedFileType === 'code' ? '.cs' : '.json';
             const filename = `${selectedPlugin.name}${extension}`;
@@ -361,6 +452,7 @@ const PluginsPage = () => {
             theme: 'dracula',
             lineNumbers: true,
             autofocus: true,
+            readOnly: !!pagedView,
             tabSize: 4,
             indentUnit: 4,
             lineWrapping: true,
@@ -394,7 +486,7 @@ const PluginsPage = () => {
             window.removeEventListener('resize', resizeEditor);
             container.innerHTML = '';
         };
-    }, [selectedPlugin, selectedFileType]);
+    }, [selectedPlugin, selectedFileType, pagedView]);
 
     return (
         <div className="h-full flex flex-col">
@@ -412,7 +504,7 @@ const PluginsPage = () => {
                                 ref={fileInputRef}
                                 onChange={handleFileChange}
                                 className="hidden"
-                                accept=".cs"
+                                accept={['.cs', ...BUNDLE_EXTENSIONS].join(',')}
                             />
                             <button
                                 onClick={() => fileInputRef.current.click()}
@@ -433,6 +525,15 @@ const PluginsPage = () => {
                             >
                                 Upload
                             </button>
+                            <a
+                                href="/api/plugins/bundle"
+                                className="px-4 py-2 bg-neutral-700 hover:bg-neutral-600 text-white rounded 
+                                    transition-colors flex items-center gap-2"
+                                title="Download every plugin with its config, data and lang files"
+                            >
+                                <i className="fas fa-file-archive"></i>
+                                Export All
+                            </a>
                         </div>
                     </div>
 
@@ -578,6 +679,35 @@ const PluginsPage = () => {
                                 </button>
                             </div>
                         </div>
+                        {pagedView && (
+                            <form onSubmit={openPagedPath} className="flex flex-wrap items-center gap-2 px-4 pt-4 text-sm">
+                                <span className="text-neutral-400">
+                                    {formatBytes(pagedView.size)}, read only. Showing {pagedView.entries.length}
+                                    {pagedView.total !== null ? ` of ${pagedView.total}` : ''} entries
+                                    {pagedView.keys.length ? ` of ${pagedView.keys.join('.')}` : ''}
+                                </span>
+                                <input
+                                    type="text"
+                                    value={pagedPath}
+                                    onChange={(e) => setPagedPath(e.target.value)}
+                                    placeholder="Path, e.g. players"
+                                    className="flex-1 min-w-[10rem] bg-neutral-800 p-2 rounded text-white placeholder-neutral-400 font-mono"
+                                />
+                                <button type="submit" className="px-3 py-2 rounded bg-neutral-600 hover:bg-neutral-700 text-white">
+                                    Open
+                                </button>
+                                {pagedView.next_offset !== null && (
+                                    <button
+                                        type="button"
+                                        onClick={() => fetchEntries(selectedPlugin, selectedFileType, pagedView.keys,
+                                                                    pagedView.next_offset, pagedView)}
+                                        className="px-3 py-2 rounded bg-neutral-600 hover:bg-neutral-700 text-white"
+                                    >
+                                        Load more
+                                    </button>
+                                )}
+                            </form>
+                        )}
                         <div className="flex-1 p-2 sm:p-4 overflow-hidden">
                             <div className="h-full flex rounded bg-neutral-800">
                                 <div className="w-full overflow-auto scrollbar-thin scrollbar-thumb-neutral-600 
@@ -5,7 +5,9 @@ const ServerControl = () => {
     const [uptime, setUptime] = React.useState(null);
     const [isEnabled, setIsEnabled] = React.useState(false);
     const [toast, setToast] = React.useState(null);
+    const [job, setJob] = React.useState(null);
     const logsRef = React.useRef(null);
+    const logCursorRef = React.useRef(null);
 
     const formatUptime = (seconds) => {
         if (!seconds) return 'Unknown';
@@ -43,10 +45,34 @@ const ServerControl = () => {
             }
         });
 
+        // Progress of start/stop/restart jobs, from whichever client started them
+        socket.on('server_job', (data) => {
+            setJob(data);
+            if (data.state === 'succeeded') {
+                showToast(data.message, 'success');
+                fetchStatus();
+            } else if (data.state === 'failed') {
+                showToast(data.error, 'error');
+                fetchStatus();
+            }
+        });
+
+        // Subscribe to journal batches, resuming after the last line we saw on reconnect
+        socket.on('connect', () => {
+            socket.emit('server_control_logs_subscribe', { cursor: logCursorRef.current });
+        });
+
         // Add listener for log updates
         socket.on('server_control_logs', (data) => {
-            if (data.logs) {
-                setLogs(prevLogs => [...prevLogs, data.logs]);
+            if (data.cursor) {
+                logCursorRef.current = data.cursor;
+            }
+            const lines = Array.isArray(data.logs) ? data.logs : (data.logs ? [data.logs] : []);
+            if (data.dropped) {
+                lines.unshift(`... ${data.dropped} log lines skipped ...`);
+            }
+            if (lines.length) {
+                setLogs(prevLogs => [...prevLogs, ...lines].slice(-1000));
             }
         });
 
@@ -71,7 +97,6 @@ const ServerControl = () => {
             if (data.error) throw new Error(data.error);
             
             setStatus(data.message.status);
-            setLogs(data.message.startup_logs || []);
             setUptime(data.message.uptime);
             setIsEnabled(data.message.enabled);
         } catch (error) {
@@ -92,10 +117,9 @@ const ServerControl = () => {
             if (data.error) {
                 showToast(data.error, 'error');
             } else {
-                showToast(data.message, 'success');
-                if (action === 'start') setStatus('starting');
-                else if (action === 'stop') setStatus('stopped');
-                else if (action === 'restart') setStatus('restarting');
+                // The job runs in the background, its progress arrives as server_job events
+                setJob(data.job);
+                showToast(data.message, 'info');
             }
         } catch (error) {
             showToast(error.message, 'error');
@@ -108,6 +132,16 @@ const ServerControl = () => {
         setToast({ message, type });
     };
 
+    const jobActive = job && (job.state === 'queued' || job.state === 'running');
+
+    const describeJob = (job) => {
+        const action = job.action.charAt(0).toUpperCase() + job.action.slice(1);
+        if (job.state === 'queued') return `${action} queued`;
+        if (job.state === 'running') return `${action}: ${job.phase || 'starting'}`;
+        const phases = job.phases.map(p => `${p.name} ${(p.duration_ms / 1000).toFixed(1)}s`).join(', ');
+        return `${action} ${job.state}${phases ? ` (${phases})` : ''}`;
+    };
+
     return (
         <div className="h-full flex flex-col">
             <div className="flex-1 min-h-0">
@@ -121,6 +155,7 @@ const ServerControl = () => {
                                         ${status === 'running' ? 'text-green-500' : ''}
                                         ${status === 'stopped' ? 'text-red-500' : ''}
                                         ${status === 'starting' ? 'text-yellow-500' : ''}
+                                        ${status === 'stopping' ? 'text-yellow-500' : ''}
                                         ${status === 'error' ? 'text-red-500' : ''}
                                     `}>
                                         {status.charAt(0).toUpperCase() + status.slice(1)}
@@ -130,12 +165,17 @@ const ServerControl = () => {
                                             Uptime: {formatUptime(uptime)}
                                         </span>
                                     )}
+                                    {job && (
+                                        <span className="text-sm text-neutral-400">
+                                            {describeJob(job)}
+                                        </span>
+                                    )}
                                 </div>
                             </div>
                             <div className="flex flex-wrap gap-2">
                                 <button
                                     onClick={() => handleControl('start')}
-                                    disabled={isLoading || status === 'running' || status === 'starting'}
+                                    disabled={isLoading || jobActive || status === 'running' || status === 'starting'}
                                     className="px-4 py-2 rounded bg-green-500 hover:bg-green-600 
                                         text-white disabled:opacity-50 transition-colors"
                                 >
@@ -143,7 +183,7 @@ const ServerControl = () => {
                                 </button>
                                 <button
                                     onClick={() => handleControl('stop')}
-                                    disabled={isLoading || status === 'stopped'}
+                                    disabled={isLoading || jobActive || status === 'stopped'}
                                     className="px-4 py-2 rounded bg-red-500 hover:bg-red-600 
                                         text-white disabled:opacity-50 transition-colors"
                                 >
@@ -151,7 +191,7 @@ const ServerControl = () => {
                                 </button>
                                 <button
                                     onClick={() => handleControl('restart')}
-                                    disabled={isLoading || status === 'stopped'}
+                                    disabled={isLoading || jobActive || status === 'stopped'}
                                     className="px-4 py-2 rounded bg-yellow-500 hover:bg-yellow-600 
                                         text-white disabled:opacity-50 transition-colors"
                                 >
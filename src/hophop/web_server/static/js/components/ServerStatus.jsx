@@ -1,4 +1,4 @@
-const ServerStatus = ({ status }) => {
+const ServerStatus = ({ status, onConsoleFilter }) => {
     const statusColor = status.status === 'online' ? 'text-status-success' : 
                        status.status === 'offline' ? 'text-status-error' : 'text-status-unknown';
 
@@ -7,6 +7,7 @@ const ServerStatus = ({ status }) => {
 
     // Make sure ConsoleOutput is available
     const ConsoleOutput = window.ConsoleOutput;
+    const PlayerList = window.PlayerList;
 
     return (
         <div className="h-full flex flex-col space-y-3">
@@ -49,9 +50,11 @@ const ServerStatus = ({ status }) => {
                 </div>
             </div>
 
+            {PlayerList && <PlayerList />}
+
             {/* Console Output with RCON */}
             <div className="flex-1 min-h-0">
-                {ConsoleOutput && <ConsoleOutput output={status.console || ''} />}
+                {ConsoleOutput && <ConsoleOutput output={status.console || ''} onFilterChange={onConsoleFilter} />}
             </div>
         </div>
     );